@@ -20,7 +20,9 @@ from django.utils.encoding import force_bytes
 from django.contrib.auth.tokens import default_token_generator
 from django.contrib.sites.shortcuts import get_current_site
 from django.http import HttpResponseRedirect
-from dashboard.models import StudentProfile
+from django.db.models import Exists, OuterRef
+from dashboard.models import StudentProfile, Notice
+from dashboard.services.student_setup import initialize_student
 
 # ==================== BASIC VIEWS ====================
 
@@ -210,6 +212,10 @@ def register(request):
                 profile.company_id = company_id
                 profile.save()
             
+            # Create progress rows once so the progress page never has to
+            if profile.user_type == 'student':
+                initialize_student(user)
+            
             # Link user to EmailOTP
             email_otp_obj.user = user
             email_otp_obj.save()
@@ -312,8 +318,12 @@ def dashboard(request):
     
     # ADD THESE 3 LINES HERE ↓↓↓
     # Get student's notices
-    student_notices = profile.get_mentor_notices()
-    unread_notices_count = len(student_notices)
+    read_by_user = Notice.read_by.through.objects.filter(
+        notice_id=OuterRef('pk'),
+        user_id=request.user.id
+    )
+    student_notices = profile.get_mentor_notices().annotate(is_read=Exists(read_by_user))
+    unread_notices_count = profile.get_unread_notices_count()
     
     # Get active PYQ PDFs
     from dashboard.models import PYQPDF
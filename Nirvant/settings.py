@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
 import os
+import tempfile
 from pathlib import Path
 # Add this line after the existing imports
 from dotenv import load_dotenv
@@ -58,6 +59,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    "dashboard.profiling.ViewProfilingMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",  # ADD THIS LINE
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -65,6 +67,7 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "dashboard.diagnostics.DebugSamplingMiddleware",
 ]
 
 ROOT_URLCONF = "Nirvant.urls"
@@ -116,6 +119,38 @@ else:
         }
     }
 
+# Cache (calendar pages, etc.)
+# Redis when REDIS_URL is set, otherwise a file cache in CACHE_DIR (a temp
+# directory by default). Cached calendars and reports are invalidated by
+# deleting keys, so every gunicorn worker must see the same cache: never
+# fall back to per-process local memory. Deployments with more than one
+# instance need REDIS_URL.
+#
+# The file cache holds about (students + mentors) x (1 version key + one
+# bucket per calendar week viewed) plus cohort and file-delivery keys. Once
+# it is full it culls entries at random, including calendar version keys,
+# which empties those calendars, so CACHE_MAX_ENTRIES must exceed that
+# total. Every set() also lists CACHE_DIR, so beyond a few thousand
+# students use REDIS_URL.
+
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.environ['REDIS_URL'],
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": os.environ.get('CACHE_DIR', os.path.join(tempfile.gettempdir(), 'nirvant-cache')),
+            "OPTIONS": {
+                "MAX_ENTRIES": int(os.environ.get('CACHE_MAX_ENTRIES', 20000)),
+            },
+        }
+    }
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -162,6 +197,16 @@ STATICFILES_DIRS = [
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Protected file delivery (PYQ PDFs): "", "x-sendfile" or "x-accel-redirect".
+# For nginx, map FILE_DELIVERY_ACCEL_PREFIX to MEDIA_ROOT as an internal location.
+FILE_DELIVERY_OFFLOAD = os.environ.get('FILE_DELIVERY_OFFLOAD', '')
+FILE_DELIVERY_ACCEL_PREFIX = os.environ.get('FILE_DELIVERY_ACCEL_PREFIX', '/protected-media/')
+
+# Uploaded PYQ PDFs are processed by `manage.py run_ingestion_worker` when
+# PDF_INGESTION_WORKER=1. The worker must see MEDIA_ROOT. Without a worker,
+# each web process handles uploads on a background thread once they commit.
+PDF_INGESTION_WORKER = os.environ.get('PDF_INGESTION_WORKER', '') == '1'
+
 # Optional: For production deployment (you'll need this later)
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 
@@ -193,4 +238,43 @@ SERVER_EMAIL = 'server@nirvant.com'
 
 # For better email tracking
 EMAIL_USE_SSL = False
-EMAIL_TIMEOUT = 30
\ No newline at end of file
+EMAIL_TIMEOUT = 30
+
+# ==================== LOGGING ====================
+# Dashboard/scheduler logs go through a non-blocking queue handler.
+# DEBUG records are only emitted for sampled requests (see dashboard/diagnostics.py).
+DIAGNOSTICS_DEBUG_USERS = [u for u in os.environ.get('DIAGNOSTICS_DEBUG_USERS', '').split(',') if u]
+DIAGNOSTICS_DEBUG_SAMPLE_RATE = float(os.environ.get('DIAGNOSTICS_DEBUG_SAMPLE_RATE', 0.0))
+
+# Per-view query count / DB / template / latency metrics (see dashboard/profiling.py),
+# shown to staff at /admin/view-metrics/ (?format=prometheus for scraping)
+VIEW_PROFILING = os.environ.get('VIEW_PROFILING', '') == '1'
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'filters': {
+        'debug_sample': {
+            '()': 'dashboard.diagnostics.DebugSampleFilter',
+        },
+    },
+    'handlers': {
+        'queue': {
+            'class': 'dashboard.diagnostics.QueueLogHandler',
+            'level': 'DEBUG',
+            'filters': ['debug_sample'],
+        },
+    },
+    'loggers': {
+        'dashboard': {
+            'handlers': ['queue'],
+            'level': 'DEBUG',
+            'propagate': False,
+        },
+        'scheduler': {
+            'handlers': ['queue'],
+            'level': 'DEBUG',
+            'propagate': False,
+        },
+    },
+}
@@ -52,6 +52,7 @@ from team.views import team_view
 
 urlpatterns = [
     # ==================== MAIN SITE URLS ====================
+    path("admin/view-metrics/", dashboard_views.view_metrics, name="view_metrics"),
     path("admin/", admin.site.urls),
     path("", home_view, name="home"),
     path("courses/", courses_view, name="courses"),
@@ -76,6 +77,8 @@ urlpatterns = [
     path('dashboard/send-message/', dashboard_views.student_send_message, name='student_send_message'),
     path('dashboard/delete-message/<int:message_id>/', dashboard_views.delete_student_message, name='delete_student_message'),
     path('dashboard/mentor-messages/', dashboard_views.mentor_messages, name='mentor_messages'),
+    path('dashboard/notices/<int:notice_id>/read/', dashboard_views.mark_notice_read, name='mark_notice_read'),
+    path('dashboard/notices/read-all/', dashboard_views.mark_all_notices_read, name='mark_all_notices_read'),
     path('dashboard/delete-message/<int:message_id>/', dashboard_views.delete_message, name='delete_message'),
     path('dashboard/delete-reply/<int:reply_id>/', dashboard_views.delete_reply, name='delete_reply'),
     
@@ -86,6 +89,7 @@ urlpatterns = [
     path('dashboard/upload-pyqs/', upload_pyqs, name='upload_pyqs'),
     path('dashboard/send-notices/', send_notices, name='send_notices'),
     path('my-students/', my_students, name='my_students'),
+    path('dashboard/cohort-analytics/', dashboard_views.mentor_cohort_analytics, name='mentor_cohort_analytics'),
     path('dashboard/student-profile/<int:student_id>/', dashboard_views.view_student_profile, name='view_student_profile'),
     # In urls.py, add this line:
     path('dashboard/view-student-message/<int:message_id>/', dashboard_views.view_student_message, name='view_student_message'),
@@ -99,6 +103,8 @@ urlpatterns = [
     # ==================== PDF VIEWING URLS ====================
     path('view-pdf/<int:pdf_id>/', view_pdf, name='view_pdf'),
     path('download-pdf/<int:pdf_id>/', download_pdf, name='download_pdf'),
+    path('pyq-questions/search/', dashboard_views.search_pyq_questions, name='search_pyq_questions'),
+    path('dashboard/practice-test/', dashboard_views.practice_test_view, name='practice_test'),
     
 
     path("join/<int:call_id>/", join_call, name="join_call"),
@@ -132,6 +138,7 @@ urlpatterns = [
     # ==================== CALL MANAGEMENT URLS ====================
     path("dashboard/students/calls/", dashboard_views.student_calls_view, name="student_calls"),
     path("dashboard/mentor/calls/", dashboard_views.mentor_calls_view, name="mentor_calls"),
+    path("calendar/<str:token>.ics", dashboard_views.calendar_feed, name="calendar_feed"),
 ]
 
 # Serve media files (for local/dev and simple deployments)
@@ -0,0 +1,87 @@
+# dashboard/diagnostics.py
+"""
+Logging helpers for the dashboard and scheduler apps.
+
+Records are handed to a background thread through a queue, so a request
+never waits on disk or stderr. DEBUG records are dropped unless debug
+sampling is switched on for the current request (per user, per request
+or by random sampling), which keeps diagnostics free when disabled.
+"""
+import atexit
+import contextvars
+import logging
+import queue
+import random
+from logging.handlers import QueueHandler, QueueListener
+
+from django.conf import settings
+
+_debug_sampled = contextvars.ContextVar('debug_sampled', default=False)
+
+
+def is_debug_sampled():
+    """True if DEBUG diagnostics are enabled for the current request"""
+    return _debug_sampled.get()
+
+
+class QueueLogHandler(QueueHandler):
+    """
+    Non-blocking handler: records go into an in-memory queue and a
+    QueueListener thread writes them to the real handler.
+    """
+
+    def __init__(self, maxsize=10000):
+        super().__init__(queue.Queue(maxsize=maxsize))
+        target = logging.StreamHandler()
+        target.setFormatter(logging.Formatter(
+            '%(asctime)s %(levelname)s %(name)s [%(process)d] %(message)s'
+        ))
+        self.listener = QueueListener(self.queue, target, respect_handler_level=True)
+        self.listener.start()
+        atexit.register(self.listener.stop)
+
+    def enqueue(self, record):
+        # Never block the request thread; drop the record if the queue is full
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            pass
+
+
+class DebugSampleFilter(logging.Filter):
+    """Drop DEBUG records unless the current request is sampled"""
+
+    def filter(self, record):
+        return record.levelno > logging.DEBUG or _debug_sampled.get()
+
+
+class DebugSamplingMiddleware:
+    """
+    Enable DEBUG logging for a request when:
+      - the user is listed in DIAGNOSTICS_DEBUG_USERS,
+      - a staff user passes ?debug=1 (or the X-Debug-Sample header), or
+      - the request is picked by DIAGNOSTICS_DEBUG_SAMPLE_RATE (0.0 - 1.0).
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.debug_users = set(getattr(settings, 'DIAGNOSTICS_DEBUG_USERS', []))
+        self.sample_rate = float(getattr(settings, 'DIAGNOSTICS_DEBUG_SAMPLE_RATE', 0.0))
+
+    def should_sample(self, request):
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            if user.get_username() in self.debug_users:
+                return True
+            if user.is_staff and (
+                request.GET.get('debug') == '1' or request.headers.get('X-Debug-Sample') == '1'
+            ):
+                return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def __call__(self, request):
+        token = _debug_sampled.set(self.should_sample(request))
+        try:
+            return self.get_response(request)
+        finally:
+            _debug_sampled.reset(token)
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from dashboard.models import StudentProfile, StudentProgress
+
+
+class Command(BaseCommand):
+    help = "Rebuild StudentProgress aggregates from study logs, test scores and subject progress"
+
+    def handle(self, *args, **options):
+        # Accounts created before registration initialized them
+        missing = StudentProfile.objects.filter(user_type='student').exclude(
+            user__progress__isnull=False
+        ).values_list('user_id', flat=True)
+        created = StudentProgress.objects.bulk_create(
+            [StudentProgress(student_id=user_id) for user_id in missing], batch_size=1000
+        )
+
+        updated = StudentProgress.recompute()
+        self.stdout.write(self.style.SUCCESS(
+            f"Recomputed {updated} progress rows ({len(created)} created)."
+        ))
@@ -0,0 +1,42 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from dashboard.services.pdf_ingestion import claim_job, default_worker_name, requeue_stale_jobs, run_job
+
+
+class Command(BaseCommand):
+    help = "Process queued PYQ PDF ingestion jobs (page count, thumbnail, linearized copy)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Drain the queue once and exit")
+        parser.add_argument("--poll-interval", type=float, default=2.0, help="Seconds to sleep when idle")
+        parser.add_argument("--worker-name", default=None)
+
+    def handle(self, *args, **options):
+        worker = options["worker_name"] or default_worker_name()
+        self.stdout.write(f"Ingestion worker {worker} started.")
+
+        processed = failed = 0
+        try:
+            while True:
+                requeue_stale_jobs()
+                job = claim_job(worker)
+                if job is None:
+                    if options["once"]:
+                        break
+                    time.sleep(options["poll_interval"])
+                    continue
+
+                started = time.perf_counter()
+                ok = run_job(job)
+                processed += 1
+                failed += not ok
+                self.stdout.write(
+                    f"PDF {job.pdf_id}: {job.status} in {time.perf_counter() - started:.2f}s"
+                    + (f" ({job.last_error})" if not ok else "")
+                )
+        except KeyboardInterrupt:
+            pass
+
+        self.stdout.write(self.style.SUCCESS(f"Processed {processed} job(s), {failed} failed."))
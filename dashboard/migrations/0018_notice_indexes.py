@@ -0,0 +1,23 @@
+# Generated by Django 5.2.9 on 2026-10-18 10:37
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0017_messagereply'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='notice',
+            index=models.Index(fields=['mentor', 'is_active', '-created_at'], name='notice_mentor_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notice',
+            index=models.Index(fields=['specific_student', 'is_active'], name='notice_student_active_idx'),
+        ),
+    ]
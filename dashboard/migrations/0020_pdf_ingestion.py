@@ -0,0 +1,54 @@
+# Generated by Django 5.2.9 on 2026-10-18 11:04
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0019_noticeunreadcounter'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pyqpdf',
+            name='content_hash',
+            field=models.CharField(blank=True, db_index=True, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='pyqpdf',
+            name='linearized_file',
+            field=models.FileField(blank=True, upload_to='pyq_pdfs/linearized/'),
+        ),
+        migrations.AddField(
+            model_name='pyqpdf',
+            name='processing_status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('ready', 'Ready'), ('failed', 'Failed')], default='ready', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='pyqpdf',
+            name='thumbnail',
+            field=models.ImageField(blank=True, upload_to='pyq_thumbnails/'),
+        ),
+        migrations.CreateModel(
+            name='PDFIngestionJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='queued', max_length=20)),
+                ('attempts', models.IntegerField(default=0)),
+                ('run_after', models.DateTimeField(default=django.utils.timezone.now)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('worker', models.CharField(blank=True, max_length=100)),
+                ('last_error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('pdf', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ingestion_jobs', to='dashboard.pyqpdf')),
+            ],
+            options={
+                'ordering': ['created_at'],
+                'indexes': [models.Index(fields=['status', 'run_after'], name='ingestion_job_queue_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 5.2.9 on 2026-10-18 11:06
+
+from collections import Counter
+
+import dashboard.storage
+from django.db import migrations, models
+
+BLOB_FIELDS = [
+    ('PYQPDF', 'pdf_file'),
+    ('StudentMessage', 'attachment'),
+    ('MessageReply', 'attachment'),
+]
+
+
+def count_existing_references(apps, schema_editor):
+    """Existing files keep their paths but are reference-counted from now on"""
+    counts = Counter()
+    for model_name, field in BLOB_FIELDS:
+        model = apps.get_model('dashboard', model_name)
+        names = model.objects.exclude(**{field: ''}).exclude(**{f'{field}__isnull': True})
+        counts.update(names.values_list(field, flat=True).iterator())
+
+    StoredBlob = apps.get_model('dashboard', 'StoredBlob')
+    StoredBlob.objects.bulk_create(
+        [StoredBlob(name=name, refcount=refcount) for name, refcount in counts.items()],
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0020_pdf_ingestion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoredBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('refcount', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='messagereply',
+            name='attachment',
+            field=models.FileField(blank=True, null=True, storage=dashboard.storage.blob_storage, upload_to='message_replies/'),
+        ),
+        migrations.AlterField(
+            model_name='pyqpdf',
+            name='pdf_file',
+            field=models.FileField(storage=dashboard.storage.blob_storage, upload_to='pyq_pdfs/'),
+        ),
+        migrations.AlterField(
+            model_name='studentmessage',
+            name='attachment',
+            field=models.FileField(blank=True, null=True, storage=dashboard.storage.blob_storage, upload_to='message_attachments/'),
+        ),
+        migrations.RunPython(count_existing_references, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,111 @@
+from django.db import migrations
+
+# Full-text index over PYQQuestion (see dashboard/services/pyq_search.py).
+#
+# PostgreSQL: a weighted tsvector column kept current by a trigger, with a
+# GIN index. SQLite: an external-content FTS5 table kept current by
+# triggers. Django recreates SQLite tables on most ALTERs, which drops
+# triggers, so a later migration that alters dashboard_pyqquestion must run
+# add_search_index again.
+
+POSTGRES_FORWARD = [
+    "ALTER TABLE dashboard_pyqquestion ADD COLUMN search_vector tsvector",
+    """
+    CREATE FUNCTION dashboard_pyqquestion_search_update() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector :=
+            setweight(to_tsvector('english', coalesce(NEW.question_text, '')), 'A') ||
+            setweight(to_tsvector('english',
+                coalesce(NEW.option_a, '') || ' ' || coalesce(NEW.option_b, '') || ' ' ||
+                coalesce(NEW.option_c, '') || ' ' || coalesce(NEW.option_d, '')), 'B') ||
+            setweight(to_tsvector('english', coalesce(NEW.explanation, '')), 'C');
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER dashboard_pyqquestion_search_trigger
+    BEFORE INSERT OR UPDATE OF question_text, option_a, option_b, option_c, option_d, explanation
+    ON dashboard_pyqquestion
+    FOR EACH ROW EXECUTE FUNCTION dashboard_pyqquestion_search_update()
+    """,
+    "UPDATE dashboard_pyqquestion SET question_text = question_text",
+    "CREATE INDEX pyqquestion_search_gin ON dashboard_pyqquestion USING gin (search_vector)",
+]
+
+POSTGRES_BACKWARD = [
+    "DROP TRIGGER IF EXISTS dashboard_pyqquestion_search_trigger ON dashboard_pyqquestion",
+    "DROP FUNCTION IF EXISTS dashboard_pyqquestion_search_update()",
+    "ALTER TABLE dashboard_pyqquestion DROP COLUMN IF EXISTS search_vector",
+]
+
+FTS_COLUMNS = "question_text, option_a, option_b, option_c, option_d, explanation"
+FTS_NEW = "new.question_text, new.option_a, new.option_b, new.option_c, new.option_d, new.explanation"
+FTS_OLD = "old.question_text, old.option_a, old.option_b, old.option_c, old.option_d, old.explanation"
+
+SQLITE_FORWARD = [
+    f"""
+    CREATE VIRTUAL TABLE dashboard_pyqquestion_fts USING fts5(
+        {FTS_COLUMNS},
+        content='dashboard_pyqquestion', content_rowid='id', tokenize='porter unicode61'
+    )
+    """,
+    f"""
+    CREATE TRIGGER dashboard_pyqquestion_fts_insert AFTER INSERT ON dashboard_pyqquestion BEGIN
+        INSERT INTO dashboard_pyqquestion_fts(rowid, {FTS_COLUMNS}) VALUES (new.id, {FTS_NEW});
+    END
+    """,
+    f"""
+    CREATE TRIGGER dashboard_pyqquestion_fts_delete AFTER DELETE ON dashboard_pyqquestion BEGIN
+        INSERT INTO dashboard_pyqquestion_fts(dashboard_pyqquestion_fts, rowid, {FTS_COLUMNS})
+        VALUES ('delete', old.id, {FTS_OLD});
+    END
+    """,
+    f"""
+    CREATE TRIGGER dashboard_pyqquestion_fts_update AFTER UPDATE ON dashboard_pyqquestion BEGIN
+        INSERT INTO dashboard_pyqquestion_fts(dashboard_pyqquestion_fts, rowid, {FTS_COLUMNS})
+        VALUES ('delete', old.id, {FTS_OLD});
+        INSERT INTO dashboard_pyqquestion_fts(rowid, {FTS_COLUMNS}) VALUES (new.id, {FTS_NEW});
+    END
+    """,
+    "INSERT INTO dashboard_pyqquestion_fts(dashboard_pyqquestion_fts) VALUES ('rebuild')",
+]
+
+SQLITE_BACKWARD = [
+    "DROP TRIGGER IF EXISTS dashboard_pyqquestion_fts_insert",
+    "DROP TRIGGER IF EXISTS dashboard_pyqquestion_fts_delete",
+    "DROP TRIGGER IF EXISTS dashboard_pyqquestion_fts_update",
+    "DROP TABLE IF EXISTS dashboard_pyqquestion_fts",
+]
+
+
+def _run(schema_editor, statements):
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def add_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        _run(schema_editor, POSTGRES_FORWARD)
+    elif vendor == "sqlite":
+        _run(schema_editor, SQLITE_FORWARD)
+
+
+def remove_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        _run(schema_editor, POSTGRES_BACKWARD)
+    elif vendor == "sqlite":
+        _run(schema_editor, SQLITE_BACKWARD)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("dashboard", "0021_content_addressed_blobs"),
+    ]
+
+    operations = [
+        migrations.RunPython(add_search_index, remove_search_index),
+    ]
@@ -0,0 +1,50 @@
+from django.db import migrations, models
+from django.db.models import Avg, Count, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Cast, Coalesce, Round
+
+
+def _per_student(queryset, aggregate):
+    return Subquery(
+        queryset.filter(student=OuterRef('student')).order_by().values('student').annotate(
+            value=aggregate
+        ).values('value')[:1]
+    )
+
+
+def rebuild_progress(apps, schema_editor):
+    # Hand-maintained counters drifted and overall_preparation was seeded
+    # with placeholder values; derive them from the source tables once.
+    StudentProgress = apps.get_model('dashboard', 'StudentProgress')
+    StudyLog = apps.get_model('dashboard', 'StudyLog')
+    TestScore = apps.get_model('dashboard', 'TestScore')
+    SubjectProgress = apps.get_model('dashboard', 'SubjectProgress')
+
+    subjects = _per_student(SubjectProgress.objects.all(), Avg('progress_percentage'))
+    tests = _per_student(TestScore.objects.all(), Avg('percentage'))
+    StudentProgress.objects.update(
+        total_study_hours=Coalesce(_per_student(StudyLog.objects.all(), Sum('study_hours')), Value(0.0)),
+        total_tests_taken=Coalesce(_per_student(TestScore.objects.all(), Count('id')), Value(0)),
+        overall_preparation=Cast(
+            Round(Coalesce(
+                (subjects + tests) / Value(2.0), subjects, tests, Value(0.0),
+                output_field=models.FloatField()
+            )),
+            models.IntegerField()
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0022_pyqquestion_search'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='studentprogress',
+            name='total_study_hours',
+            field=models.FloatField(default=0),
+        ),
+        migrations.RunPython(rebuild_progress, migrations.RunPython.noop),
+    ]
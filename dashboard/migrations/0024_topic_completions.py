@@ -0,0 +1,113 @@
+# Generated by Django 5.2.9 on 2026-10-18 11:18
+
+import json
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+BATCH_SIZE = 1000
+
+
+def _parse_topics(value):
+    """Stored JSON list; tolerate legacy comma-separated or malformed values"""
+    if not value:
+        return []
+    try:
+        topics = json.loads(value)
+    except ValueError:
+        topics = value.split(',')
+    if not isinstance(topics, list):
+        topics = [topics]
+    cleaned = (str(topic).strip()[:200] for topic in topics if topic is not None)
+    return list(dict.fromkeys(topic for topic in cleaned if topic))
+
+
+def backfill_topics(apps, schema_editor):
+    StudyLog = apps.get_model('dashboard', 'StudyLog')
+    SubjectProgress = apps.get_model('dashboard', 'SubjectProgress')
+    TopicCompletion = apps.get_model('dashboard', 'TopicCompletion')
+
+    batch = []
+
+    def flush():
+        TopicCompletion.objects.bulk_create(batch, ignore_conflicts=True)
+        batch.clear()
+
+    logs = StudyLog.objects.exclude(topics_completed__isnull=True).exclude(topics_completed__in=['', '[]'])
+    for log_id, student_id, date, value in logs.values_list(
+        'id', 'student_id', 'date', 'topics_completed'
+    ).iterator(chunk_size=BATCH_SIZE):
+        for topic in _parse_topics(value):
+            batch.append(TopicCompletion(student_id=student_id, topic=topic, completed_on=date, study_log_id=log_id))
+        if len(batch) >= BATCH_SIZE:
+            flush()
+
+    subjects = SubjectProgress.objects.exclude(completed_topics__isnull=True).exclude(completed_topics__in=['', '[]'])
+    for progress_id, student_id, subject, value in subjects.values_list(
+        'id', 'student_id', 'subject', 'completed_topics'
+    ).iterator(chunk_size=BATCH_SIZE):
+        for topic in _parse_topics(value):
+            batch.append(TopicCompletion(
+                student_id=student_id, topic=topic, subject=subject, subject_progress_id=progress_id
+            ))
+        if len(batch) >= BATCH_SIZE:
+            flush()
+    flush()
+
+
+def restore_topics(apps, schema_editor):
+    StudyLog = apps.get_model('dashboard', 'StudyLog')
+    SubjectProgress = apps.get_model('dashboard', 'SubjectProgress')
+    TopicCompletion = apps.get_model('dashboard', 'TopicCompletion')
+
+    for model, field, fk in (
+        (StudyLog, 'topics_completed', 'study_log_id'),
+        (SubjectProgress, 'completed_topics', 'subject_progress_id'),
+    ):
+        topics = {}
+        for owner_id, topic in TopicCompletion.objects.filter(
+            **{f'{fk}__isnull': False}
+        ).order_by('id').values_list(fk, 'topic').iterator(chunk_size=BATCH_SIZE):
+            topics.setdefault(owner_id, []).append(topic)
+        rows = [model(id=owner_id, **{field: json.dumps(names)}) for owner_id, names in topics.items()]
+        model.objects.bulk_update(rows, [field], batch_size=BATCH_SIZE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0023_student_progress_aggregates'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TopicCompletion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('topic', models.CharField(max_length=200)),
+                ('subject', models.CharField(blank=True, max_length=50)),
+                ('completed_on', models.DateField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='topic_completions', to=settings.AUTH_USER_MODEL)),
+                ('study_log', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='topic_completions', to='dashboard.studylog')),
+                ('subject_progress', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='topic_completions', to='dashboard.subjectprogress')),
+            ],
+            options={
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['topic', 'completed_on'], name='topic_completion_topic_idx'), models.Index(fields=['student', 'completed_on'], name='topic_completion_student_idx')],
+                'constraints': [models.UniqueConstraint(fields=('study_log', 'topic'), name='topic_completion_log_unique'), models.UniqueConstraint(fields=('subject_progress', 'topic'), name='topic_completion_subject_unique')],
+            },
+        ),
+        migrations.RunPython(backfill_topics, restore_topics),
+        migrations.RemoveField(
+            model_name='studylog',
+            name='topics_completed',
+        ),
+        migrations.RemoveField(
+            model_name='subjectprogress',
+            name='completed_topics',
+        ),
+    ]
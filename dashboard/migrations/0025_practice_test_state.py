@@ -0,0 +1,36 @@
+# Generated by Django 5.2.9 on 2026-10-18 11:35
+
+from importlib import import_module
+
+from django.db import migrations, models
+
+search = import_module("dashboard.migrations.0022_pyqquestion_search")
+
+
+def reinstall_sqlite_search(apps, schema_editor):
+    # SQLite recreates dashboard_pyqquestion for these AddFields, which drops
+    # the FTS5 sync triggers (see 0022_pyqquestion_search)
+    if schema_editor.connection.vendor == "sqlite":
+        search._run(schema_editor, search.SQLITE_BACKWARD + search.SQLITE_FORWARD)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0024_topic_completions'),
+    ]
+
+    operations = [
+        migrations.RunPython(migrations.RunPython.noop, reinstall_sqlite_search),
+        migrations.AddField(
+            model_name='pyqquestion',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='testscore',
+            name='practice_nonce',
+            field=models.CharField(blank=True, editable=False, max_length=32, null=True, unique=True),
+        ),
+        migrations.RunPython(reinstall_sqlite_search, migrations.RunPython.noop),
+    ]
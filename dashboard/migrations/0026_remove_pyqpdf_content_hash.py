@@ -0,0 +1,17 @@
+# Generated by Django 5.2.9 on 2026-10-18 11:47
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0025_practice_test_state'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='pyqpdf',
+            name='content_hash',
+        ),
+    ]
@@ -1,7 +1,11 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Avg, Count, F, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Cast, Coalesce, Round
 from django.contrib.auth.models import User
 from django.utils import timezone
 
+from .storage import blob_storage
+
 class Mentor(models.Model):
     name = models.CharField(max_length=100)
     photo = models.ImageField(upload_to='mentor_photos/', blank=True, null=True)
@@ -50,31 +54,58 @@ class StudentProfile(models.Model):
         days_left = (self.neet_exam_date - today).days
         return max(days_left, 0)
 
-    def get_mentor_notices(self):
-        """Get all notices from student's mentor"""
+    def notice_targeting(self):
+        """Q object matching notices addressed to this student"""
+        targeting = Q(recipient_type='all') | Q(recipient_type='student', specific_student=self.user)
+        if self.batch_enrolled:
+            targeting |= Q(recipient_type='batch', specific_batch__batch_name=self.batch_enrolled)
+        return targeting
+
+    def get_notices(self):
+        """Get all active notices for this student (lazy queryset)"""
         from .models import Notice
         
-        if not self.mentor:
-            return []
-            
-        notices = Notice.objects.filter(
-            mentor=self.mentor,
+        return Notice.objects.filter(
+            self.notice_targeting(),
             is_active=True
-        ).order_by('-created_at')
+        ).select_related('mentor', 'specific_batch', 'specific_student').order_by('-created_at')
+
+    def get_mentor_notices(self):
+        """Get all notices from student's mentor (lazy queryset, filtered in SQL)"""
+        from .models import Notice
         
-        relevant_notices = []
-        for notice in notices:
-            if notice.recipient_type == 'all':
-                relevant_notices.append(notice)
-            elif notice.recipient_type == 'batch':
-                if notice.specific_batch and self.batch_enrolled:
-                    if notice.specific_batch.batch_name == self.batch_enrolled:
-                        relevant_notices.append(notice)
-            elif notice.recipient_type == 'student':
-                if notice.specific_student == self.user:
-                    relevant_notices.append(notice)
+        if not self.mentor_id:
+            return Notice.objects.none()
+            
+        return self.get_notices().filter(mentor_id=self.mentor_id)
+
+    def get_unread_notices_count(self):
+        """Unread notices from the student's mentor, read from the denormalized counter"""
+        if not self.mentor_id:
+            return 0
+        return NoticeUnreadCounter.get_count(self)
+
+    def mark_all_notices_read(self):
+        """Mark every notice from the student's mentor as read with one INSERT"""
+        if not self.mentor_id:
+            return 0
         
-        return relevant_notices
+        ReadBy = Notice.read_by.through
+        with transaction.atomic():
+            NoticeUnreadCounter.lock_mentor(self.mentor_id)
+            unread_ids = list(
+                self.get_mentor_notices().exclude(read_by=self.user).values_list('id', flat=True)
+            )
+            ReadBy.objects.bulk_create(
+                [ReadBy(notice_id=notice_id, user_id=self.user_id) for notice_id in unread_ids],
+                ignore_conflicts=True
+            )
+            NoticeUnreadCounter.objects.update_or_create(
+                user_id=self.user_id,
+                mentor_id=self.mentor_id,
+                defaults={'unread_count': 0}
+            )
+        return len(unread_ids)
     
     def __str__(self):
         return f"{self.user.username}'s Profile"
@@ -82,9 +113,18 @@ class StudentProfile(models.Model):
     # Add these models to your existing models.py
 
 class StudentProgress(models.Model):
+    """
+    Materialized per-student aggregates of StudyLog, TestScore and
+    SubjectProgress.
+
+    The signals in dashboard/signals.py apply deltas as logs and scores
+    change; recompute() rebuilds rows from the source tables in a single
+    UPDATE and is run periodically (recompute_student_progress) to repair
+    anything written with bulk operations.
+    """
     student = models.ForeignKey(User, on_delete=models.CASCADE, related_name='progress')
     overall_preparation = models.IntegerField(default=0)
-    total_study_hours = models.IntegerField(default=0)
+    total_study_hours = models.FloatField(default=0)
     total_tests_taken = models.IntegerField(default=0)
     mentorship_streak = models.IntegerField(default=0)
     last_updated = models.DateTimeField(auto_now=True)
@@ -95,6 +135,69 @@ class StudentProgress(models.Model):
     def __str__(self):
         return f"{self.student.username} - {self.overall_preparation}%"
 
+    @staticmethod
+    def _per_student(queryset, aggregate):
+        return Subquery(
+            queryset.filter(student=OuterRef('student')).order_by().values('student').annotate(
+                value=aggregate
+            ).values('value')[:1]
+        )
+
+    @classmethod
+    def overall_preparation_expression(cls):
+        """Mean of subject progress and average test percentage (either alone if the other is missing)"""
+        subjects = cls._per_student(SubjectProgress.objects.all(), Avg('progress_percentage'))
+        tests = cls._per_student(TestScore.objects.all(), Avg('percentage'))
+        return Cast(
+            Round(Coalesce(
+                (subjects + tests) / Value(2.0), subjects, tests, Value(0.0),
+                output_field=models.FloatField()
+            )),
+            models.IntegerField()
+        )
+
+    @classmethod
+    def recompute(cls, student_ids=None):
+        """Rebuild every aggregate from the source tables in one UPDATE"""
+        rows = cls.objects.all()
+        if student_ids is not None:
+            rows = rows.filter(student_id__in=student_ids)
+        return rows.update(
+            total_study_hours=Coalesce(
+                cls._per_student(StudyLog.objects.all(), Sum('study_hours')), Value(0.0)
+            ),
+            total_tests_taken=Coalesce(
+                cls._per_student(TestScore.objects.all(), Count('id')), Value(0)
+            ),
+            overall_preparation=cls.overall_preparation_expression(),
+            last_updated=timezone.now(),
+        )
+
+    @classmethod
+    def refresh_preparation(cls, student_id):
+        cls.objects.filter(student_id=student_id).update(
+            overall_preparation=cls.overall_preparation_expression(), last_updated=timezone.now()
+        )
+
+    @classmethod
+    def adjust(cls, student_id, hours=0, tests=0):
+        """Add deltas to the student's row in a single UPDATE"""
+        return cls.objects.filter(student_id=student_id).update(
+            total_study_hours=F('total_study_hours') + hours,
+            total_tests_taken=F('total_tests_taken') + tests,
+            last_updated=timezone.now(),
+        )
+
+    @classmethod
+    def for_student(cls, user):
+        """The student's row, built from their history the first time"""
+        progress = cls.objects.filter(student=user).order_by('-last_updated').first()
+        if progress is None:
+            progress = cls.objects.create(student=user)
+            cls.recompute([user.id])
+            progress.refresh_from_db()
+        return progress
+
 class SubjectProgress(models.Model):
     SUBJECT_CHOICES = [
         ('Physics', 'Physics'),
@@ -107,7 +210,6 @@ class SubjectProgress(models.Model):
     progress_percentage = models.IntegerField(default=0)
     needs_attention = models.TextField(blank=True, null=True)
     weekly_target = models.IntegerField(default=0)
-    completed_topics = models.TextField(blank=True, null=True)  # JSON stored as text
     
     class Meta:
         unique_together = ['student', 'subject']
@@ -123,6 +225,8 @@ class TestScore(models.Model):
     max_marks = models.IntegerField()
     date_taken = models.DateField()
     percentage = models.FloatField()
+    # Set for practice tests; unique so a test token is graded once
+    practice_nonce = models.CharField(max_length=32, unique=True, null=True, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     
     class Meta:
@@ -135,7 +239,6 @@ class StudyLog(models.Model):
     student = models.ForeignKey(User, on_delete=models.CASCADE, related_name='study_logs')
     date = models.DateField()
     study_hours = models.FloatField(default=0)
-    topics_completed = models.TextField(blank=True, null=True)  # JSON stored as text
     created_at = models.DateTimeField(auto_now_add=True)
     
     class Meta:
@@ -145,6 +248,68 @@ class StudyLog(models.Model):
     def __str__(self):
         return f"{self.student.username} - {self.date}: {self.study_hours} hours"
 
+    @property
+    def topics(self):
+        """Topic names in the order they were added"""
+        if self.pk is None:
+            return []
+        return [completion.topic for completion in self.topic_completions.all()]
+
+class TopicCompletion(models.Model):
+    """
+    One completed topic, either logged on a day (study_log) or marked done
+    for a subject (subject_progress). Replaces the JSON lists that used to
+    live in StudyLog.topics_completed and SubjectProgress.completed_topics.
+    """
+    student = models.ForeignKey(User, on_delete=models.CASCADE, related_name='topic_completions')
+    topic = models.CharField(max_length=200)
+    subject = models.CharField(max_length=50, blank=True)
+    completed_on = models.DateField(null=True, blank=True)
+    study_log = models.ForeignKey(
+        StudyLog, on_delete=models.CASCADE, null=True, blank=True, related_name='topic_completions'
+    )
+    subject_progress = models.ForeignKey(
+        SubjectProgress, on_delete=models.CASCADE, null=True, blank=True, related_name='topic_completions'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['id']
+        constraints = [
+            models.UniqueConstraint(fields=['study_log', 'topic'], name='topic_completion_log_unique'),
+            models.UniqueConstraint(fields=['subject_progress', 'topic'], name='topic_completion_subject_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['topic', 'completed_on'], name='topic_completion_topic_idx'),
+            models.Index(fields=['student', 'completed_on'], name='topic_completion_student_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.student.username} - {self.topic}"
+
+    @classmethod
+    def add_to_log(cls, study_log, topics):
+        """Record topics for a study log in one INSERT; returns the number newly added"""
+        existing = set(study_log.topic_completions.values_list('topic', flat=True))
+        new_topics = list(dict.fromkeys(topic for topic in topics if topic and topic not in existing))
+        cls.objects.bulk_create([
+            cls(student_id=study_log.student_id, topic=topic, completed_on=study_log.date, study_log=study_log)
+            for topic in new_topics
+        ], ignore_conflicts=True)
+        return len(new_topics)
+
+    @classmethod
+    def students_per_topic(cls, since, until=None, **filters):
+        """{topic: number of distinct students who completed it} in [since, until]"""
+        completions = cls.objects.filter(completed_on__gte=since, **filters)
+        if until is not None:
+            completions = completions.filter(completed_on__lte=until)
+        return dict(
+            completions.order_by().values('topic').annotate(
+                students=Count('student', distinct=True)
+            ).values_list('topic', 'students')
+        )
+
 class StudentGoal(models.Model):
     student = models.ForeignKey(User, on_delete=models.CASCADE, related_name='goals')
     goal_text = models.TextField()
@@ -219,6 +384,7 @@ class PYQQuestion(models.Model):
     ], default='Medium')
     added_by = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True)
     added_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         ordering = ['-year', 'subject', 'question_number']
@@ -236,17 +402,28 @@ class PYQPDF(models.Model):
     
     YEAR_CHOICES = [(str(year), str(year)) for year in range(2014, 2026)]
     
+    PROCESSING_CHOICES = [
+        ('pending', 'Pending'),
+        ('ready', 'Ready'),
+        ('failed', 'Failed'),
+    ]
+    
     subject = models.CharField(max_length=50, choices=SUBJECT_CHOICES)
     year = models.CharField(max_length=4, choices=YEAR_CHOICES)
     title = models.CharField(max_length=200)
     description = models.TextField(blank=True)
-    pdf_file = models.FileField(upload_to='pyq_pdfs/')
+    pdf_file = models.FileField(upload_to='pyq_pdfs/', storage=blob_storage)
     pages = models.IntegerField(default=1)
     questions_count = models.IntegerField(default=0)
     uploaded_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='uploaded_pdfs')
     uploaded_at = models.DateTimeField(auto_now_add=True)
     is_active = models.BooleanField(default=True)
     
+    # Filled in by PDF ingestion (services/pdf_ingestion.py)
+    processing_status = models.CharField(max_length=20, choices=PROCESSING_CHOICES, default='ready')
+    thumbnail = models.ImageField(upload_to='pyq_thumbnails/', blank=True)
+    linearized_file = models.FileField(upload_to='pyq_pdfs/linearized/', blank=True)
+    
     class Meta:
         ordering = ['-year', 'subject']
         verbose_name = "PYQ PDF"
@@ -265,6 +442,38 @@ class PYQPDF(models.Model):
             else:
                 return f"{size_bytes/(1024*1024):.1f} MB"
         return "0 B"
+
+
+class PDFIngestionJob(models.Model):
+    """
+    Queue entry for background processing of an uploaded PYQPDF. Consumed
+    by `manage.py run_ingestion_worker`.
+    """
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+    
+    pdf = models.ForeignKey(PYQPDF, on_delete=models.CASCADE, related_name='ingestion_jobs')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    attempts = models.IntegerField(default=0)
+    run_after = models.DateTimeField(default=timezone.now)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    worker = models.CharField(max_length=100, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['status', 'run_after'], name='ingestion_job_queue_idx'),
+        ]
+    
+    def __str__(self):
+        return f"Ingestion of PDF {self.pdf_id} ({self.status})"
     
 class Batch(models.Model):
     batch_name = models.CharField(max_length=200)
@@ -362,41 +571,149 @@ class Notice(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['mentor', 'is_active', '-created_at'], name='notice_mentor_active_idx'),
+            models.Index(fields=['specific_student', 'is_active'], name='notice_student_active_idx'),
+        ]
     
     def __str__(self):
         return f"{self.title} - {self.mentor.name}"
+
+    def save(self, *args, **kwargs):
+        # Unread counters are adjusted by post_save; commit them with the notice
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            return super().delete(*args, **kwargs)
     
     def mark_as_read(self, user):
-        """Mark notice as read by a user"""
-        if user not in self.read_by.all():
-            self.read_by.add(user)
+        """Mark notice as read by a user (add() skips rows that already exist)"""
+        self.read_by.add(user)
     
     def is_read_by(self, user):
         """Check if notice is read by user"""
         return self.read_by.filter(id=user.id).exists()
-def get_notices(self):
-    """Get all notices for this student"""
-    from .models import Notice
-    
-    notices = Notice.objects.filter(is_active=True)
-    student_notices = []
-    
-    for notice in notices:
-        if notice.recipient_type == 'all':
-            student_notices.append(notice)
-        elif notice.recipient_type == 'batch' and self.batch_enrolled:
-            # Check if student is in the batch
-            if notice.specific_batch and self.batch_enrolled == notice.specific_batch.batch_name:
-                student_notices.append(notice)
-        elif notice.recipient_type == 'student':
-            if notice.specific_student == self.user:
-                student_notices.append(notice)
-    
-    return student_notices
-
-def get_unread_notices_count(self):
-    """Count unread notices"""
-    return len([n for n in self.get_notices() if not n.is_read_by(self.user)])
+
+    def recipient_profiles(self):
+        """StudentProfiles this notice is addressed to"""
+        profiles = StudentProfile.objects.filter(mentor_id=self.mentor_id)
+        if self.recipient_type == 'batch':
+            if not self.specific_batch_id:
+                return profiles.none()
+            return profiles.filter(batch_enrolled=self.specific_batch.batch_name)
+        if self.recipient_type == 'student':
+            return profiles.filter(user_id=self.specific_student_id)
+        return profiles
+
+
+class NoticeUnreadCounter(models.Model):
+    """
+    Denormalized unread-notice count per (student, mentor).
+
+    Rows are created lazily from a full count the first time they are read
+    and kept current by the signals in dashboard/signals.py. Deleting a row
+    is always safe: it is rebuilt on the next read.
+
+    Rebuilds and deltas both lock the mentor row first, inside the
+    transaction of the notice or read they belong to. A notice that is
+    created while a counter is being rebuilt is therefore either seen by
+    the count or applied as a delta to the new row, never lost.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='notice_counters')
+    mentor = models.ForeignKey(Mentor, on_delete=models.CASCADE, related_name='notice_counters')
+    unread_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ['user', 'mentor']
+
+    def __str__(self):
+        return f"{self.user.username} - {self.mentor.name}: {self.unread_count} unread"
+
+    @staticmethod
+    def lock_mentor(mentor_id):
+        """Serialize counter rebuilds and deltas of one mentor until the transaction ends"""
+        # NO KEY UPDATE does not conflict with the key-share locks of notice inserts
+        list(Mentor.objects.select_for_update(no_key=True).filter(pk=mentor_id).values_list('pk', flat=True))
+
+    @classmethod
+    def get_count(cls, profile):
+        count = cls.objects.filter(
+            user_id=profile.user_id,
+            mentor_id=profile.mentor_id
+        ).values_list('unread_count', flat=True).first()
+        
+        if count is None:
+            with transaction.atomic():
+                cls.lock_mentor(profile.mentor_id)
+                count = profile.get_mentor_notices().exclude(read_by=profile.user_id).count()
+                cls.objects.update_or_create(
+                    user_id=profile.user_id, mentor_id=profile.mentor_id, defaults={'unread_count': count}
+                )
+        return count
+
+    @classmethod
+    def adjust(cls, mentor_id, user_ids, delta):
+        """Add delta to existing counters of the given users in a single UPDATE"""
+        with transaction.atomic():
+            cls.lock_mentor(mentor_id)
+            counters = cls.objects.filter(mentor_id=mentor_id, user_id__in=user_ids)
+            if delta < 0:
+                counters = counters.filter(unread_count__gte=-delta)
+            return counters.update(unread_count=F('unread_count') + delta)
+
+    @classmethod
+    def invalidate(cls, **filters):
+        """Drop counters so they are rebuilt on next read"""
+        cls.objects.filter(**filters).delete()
+
+class StoredBlob(models.Model):
+    """
+    Reference count of a file in content-addressed storage (storage.py).
+    Rows are kept current by the signals in dashboard/signals.py; the file
+    is deleted when the last reference goes away.
+
+    A row at refcount 0 is a file waiting for deletion. The deletion and
+    every acquire take the row lock, so a concurrent upload of the same
+    content either keeps the file alive or writes it again.
+    """
+    name = models.CharField(max_length=255, unique=True)
+    refcount = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.refcount} refs)"
+
+    @classmethod
+    def acquire(cls, name):
+        with transaction.atomic():
+            while True:
+                cls.objects.bulk_create([cls(name=name)], ignore_conflicts=True)
+                # 0 rows if a pending deletion removed the row while we waited for its lock
+                if cls.objects.filter(name=name).update(refcount=F('refcount') + 1):
+                    return
+
+    @classmethod
+    def release(cls, name, storage):
+        with transaction.atomic():
+            blob = cls.objects.select_for_update().filter(name=name).first()
+            if blob is None or blob.refcount == 0:
+                return
+            cls.objects.filter(pk=blob.pk).update(refcount=F('refcount') - 1)
+            if blob.refcount > 1:
+                return
+
+        def delete_file():
+            with transaction.atomic():
+                # Re-checked under the lock: an upload may have acquired it since
+                blob = cls.objects.select_for_update().filter(name=name, refcount=0).first()
+                if blob is not None:
+                    storage.delete(name)
+                    blob.delete()
+
+        transaction.on_commit(delete_file)
 
 class MentorProfile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='mentor_profile')
@@ -440,7 +757,7 @@ class StudentMessage(models.Model):
     mentor = models.ForeignKey(Mentor, on_delete=models.CASCADE, related_name='received_messages')
     subject = models.CharField(max_length=200)
     message = models.TextField()
-    attachment = models.FileField(upload_to='message_attachments/', blank=True, null=True)
+    attachment = models.FileField(upload_to='message_attachments/', storage=blob_storage, blank=True, null=True)
     priority = models.CharField(max_length=20, choices=PRIORITY_CHOICES, default='medium')
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
     is_urgent = models.BooleanField(default=False)
@@ -467,7 +784,7 @@ class MessageReply(models.Model):
     original_message = models.ForeignKey(StudentMessage, on_delete=models.CASCADE, related_name='replies')
     replied_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='mentor_replies')
     reply_text = models.TextField()
-    attachment = models.FileField(upload_to='message_replies/', blank=True, null=True)
+    attachment = models.FileField(upload_to='message_replies/', storage=blob_storage, blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
     
     class Meta:
@@ -0,0 +1,205 @@
+# dashboard/profiling.py
+"""
+Per-view performance instrumentation.
+
+ViewProfilingMiddleware records, for every request, under the URL name of
+the view: SQL query count, DB time, template render time, total latency
+and the SQL statements that ran more than once (N+1 candidates).
+It is switched on with the VIEW_PROFILING setting and removes itself from
+the middleware chain otherwise, so it costs nothing when disabled.
+
+Measurements go to prometheus_client histograms and to a small rolling
+window per view kept in process memory. view_metrics (a staff-only page
+under /admin/view-metrics/) shows the window and serves the histograms
+in Prometheus text format with ?format=prometheus. When gunicorn runs
+several workers, set PROMETHEUS_MULTIPROC_DIR so the exported histograms
+cover all of them; the rolling window is always per process.
+"""
+import contextvars
+import os
+import re
+import statistics
+import threading
+from collections import Counter, defaultdict, deque
+from contextlib import ExitStack
+from time import perf_counter
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from prometheus_client import CollectorRegistry, Counter as PromCounter, Histogram, generate_latest
+from prometheus_client import multiprocess
+
+WINDOW_SIZE = 500
+TOP_DUPLICATES = 10
+# Repeated statements kept per view between reports; the rest are dropped
+DUPLICATES_KEPT = TOP_DUPLICATES * 5
+UNRESOLVED = '<unresolved>'
+
+# "IN (%s, %s, ...)" of any length is one statement shape
+PLACEHOLDER_LIST = re.compile(r'\((?:%s|\?)(?:\s*,\s*(?:%s|\?))*\)')
+
+REGISTRY = CollectorRegistry()
+LATENCY = Histogram(
+    'view_latency_seconds', 'Total request latency by view', ['view'], registry=REGISTRY,
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+DB_TIME = Histogram(
+    'view_db_seconds', 'Time spent in SQL by view', ['view'], registry=REGISTRY,
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+TEMPLATE_TIME = Histogram(
+    'view_template_seconds', 'Template render time by view (includes lazy queries)', ['view'],
+    registry=REGISTRY, buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1),
+)
+QUERIES = Histogram(
+    'view_db_queries', 'SQL queries per request by view', ['view'], registry=REGISTRY,
+    buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500),
+)
+DUPLICATE_QUERIES = PromCounter(
+    'view_duplicate_queries', 'Repeated executions of an identical SQL statement by view', ['view'],
+    registry=REGISTRY,
+)
+
+_current = contextvars.ContextVar('view_profile', default=None)
+_lock = threading.Lock()
+_recent = defaultdict(lambda: deque(maxlen=WINDOW_SIZE))
+_duplicates = defaultdict(Counter)
+
+
+class RequestProfile:
+    __slots__ = ('queries', 'db_time', 'template_time', 'rendering', 'statements')
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.rendering = False
+        self.statements = Counter()
+
+
+def normalize_sql(sql):
+    return PLACEHOLDER_LIST.sub('(...)', sql)
+
+
+def _record_query(execute, sql, params, many, context):
+    profile = _current.get()
+    if profile is None:
+        return execute(sql, params, many, context)
+    start = perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        profile.db_time += perf_counter() - start
+        profile.queries += 1
+        # Parameters are separate, so equal SQL means the same statement shape
+        profile.statements[normalize_sql(sql)] += 1
+
+
+def _instrument_templates():
+    """Time top-level Django template renders (nested includes are part of them)"""
+    from django.template.base import Template
+
+    if getattr(Template.render, 'profiled', False):
+        return
+    original = Template.render
+
+    def render(self, context):
+        profile = _current.get()
+        if profile is None or profile.rendering:
+            return original(self, context)
+        profile.rendering = True
+        start = perf_counter()
+        try:
+            return original(self, context)
+        finally:
+            profile.template_time += perf_counter() - start
+            profile.rendering = False
+
+    render.profiled = True
+    Template.render = render
+
+
+def _record_request(view, profile, latency):
+    LATENCY.labels(view).observe(latency)
+    DB_TIME.labels(view).observe(profile.db_time)
+    TEMPLATE_TIME.labels(view).observe(profile.template_time)
+    QUERIES.labels(view).observe(profile.queries)
+
+    repeated = {sql: count for sql, count in profile.statements.items() if count > 1}
+    if repeated:
+        DUPLICATE_QUERIES.labels(view).inc(sum(count - 1 for count in repeated.values()))
+    with _lock:
+        _recent[view].append((latency, profile.queries, profile.db_time, profile.template_time))
+        if repeated:
+            duplicates = _duplicates[view]
+            duplicates.update({sql: count - 1 for sql, count in repeated.items()})
+            if len(duplicates) > DUPLICATES_KEPT:
+                _duplicates[view] = Counter(dict(duplicates.most_common(DUPLICATES_KEPT)))
+
+
+class ViewProfilingMiddleware:
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'VIEW_PROFILING', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        _instrument_templates()
+
+    def __call__(self, request):
+        profile = RequestProfile()
+        token = _current.set(profile)
+        start = perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(_record_query))
+                return self.get_response(request)
+        finally:
+            _current.reset(token)
+            match = getattr(request, 'resolver_match', None)
+            _record_request(match.view_name if match else UNRESOLVED, profile, perf_counter() - start)
+
+
+# ==================== REPORTING ====================
+
+def prometheus_text():
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
+
+
+def _percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+def view_stats():
+    """Rolling-window summary per view, slowest p95 first"""
+    with _lock:
+        windows = {view: list(samples) for view, samples in _recent.items() if samples}
+        duplicates = {view: counts.most_common(TOP_DUPLICATES) for view, counts in _duplicates.items()}
+
+    stats = []
+    for view, samples in windows.items():
+        latencies = [sample[0] * 1000 for sample in samples]
+        stats.append({
+            'view': view,
+            'requests': len(samples),
+            'p50_ms': round(_percentile(latencies, 0.5), 1),
+            'p95_ms': round(_percentile(latencies, 0.95), 1),
+            'avg_queries': round(statistics.fmean(sample[1] for sample in samples), 1),
+            'max_queries': max(sample[1] for sample in samples),
+            'avg_db_ms': round(statistics.fmean(sample[2] for sample in samples) * 1000, 1),
+            'avg_template_ms': round(statistics.fmean(sample[3] for sample in samples) * 1000, 1),
+            'duplicates': duplicates.get(view, []),
+        })
+    return sorted(stats, key=lambda row: row['p95_ms'], reverse=True)
+
+
+def reset_view_stats():
+    with _lock:
+        _recent.clear()
+        _duplicates.clear()
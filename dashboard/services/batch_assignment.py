@@ -0,0 +1,96 @@
+from django.db import transaction
+from django.db.models import Count, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from dashboard.models import Batch, NoticeUnreadCounter, StudentBatch, StudentProfile
+
+
+class BatchCapacityError(Exception):
+    pass
+
+
+def parse_ids(raw_ids):
+    """'1, 2,3' -> {1, 2, 3}; non-numeric entries are ignored"""
+    if isinstance(raw_ids, str):
+        raw_ids = raw_ids.split(',')
+    ids = set()
+    for value in raw_ids:
+        value = str(value).strip()
+        if value.isdigit():
+            ids.add(int(value))
+    return ids
+
+
+def recount_batches(batch_ids):
+    """Recompute Batch.current_students for the given batches in one UPDATE"""
+    enrolled = StudentBatch.objects.filter(
+        batch=OuterRef('pk')
+    ).values('batch').annotate(total=Count('id')).values('total')
+
+    Batch.objects.filter(id__in=batch_ids).update(
+        current_students=Coalesce(Subquery(enrolled), Value(0))
+    )
+
+
+def assign_students_to_batch(batch_id, mentor, student_user_ids):
+    """
+    Move a set of the mentor's students into a batch.
+
+    All IDs are validated with one query, StudentBatch rows are upserted
+    with a single bulk_create and profiles updated with a single
+    bulk_update. The batch row is locked for the duration so max_students
+    cannot be exceeded by concurrent assignments.
+
+    Returns {'batch': Batch, 'assigned': int, 'skipped': [ids not found]}.
+    Raises Batch.DoesNotExist or BatchCapacityError.
+    """
+    requested = parse_ids(student_user_ids)
+
+    with transaction.atomic():
+        batch = Batch.objects.select_for_update().get(id=batch_id, mentor=mentor)
+
+        profiles = list(StudentProfile.objects.filter(
+            user_id__in=requested,
+            mentor=mentor
+        ))
+        user_ids = [profile.user_id for profile in profiles]
+        skipped = sorted(requested - set(user_ids))
+
+        if not profiles:
+            return {'batch': batch, 'assigned': 0, 'skipped': skipped}
+
+        membership = StudentBatch.objects.filter(batch=batch).aggregate(
+            total=Count('id'),
+            already_in=Count('id', filter=Q(student_id__in=user_ids))
+        )
+        new_members = len(user_ids) - membership['already_in']
+        seats_left = batch.max_students - membership['total']
+        if new_members > seats_left:
+            raise BatchCapacityError(
+                f"Batch '{batch.batch_name}' has {max(seats_left, 0)} seat(s) left, "
+                f"cannot add {new_members} student(s)."
+            )
+
+        # A student belongs to one batch: drop memberships elsewhere
+        previous = StudentBatch.objects.filter(student_id__in=user_ids).exclude(batch=batch)
+        previous_batch_ids = set(previous.values_list('batch_id', flat=True))
+        previous.delete()
+
+        StudentBatch.objects.bulk_create(
+            [StudentBatch(student_id=user_id, batch=batch, is_active=True) for user_id in user_ids],
+            update_conflicts=True,
+            unique_fields=['student', 'batch'],
+            update_fields=['is_active'],
+        )
+
+        for profile in profiles:
+            profile.batch_enrolled = batch.batch_name
+        StudentProfile.objects.bulk_update(profiles, ['batch_enrolled'])
+
+        recount_batches(previous_batch_ids | {batch.id})
+        batch.refresh_from_db(fields=['current_students'])
+
+        # bulk_update skips post_save, so batch-targeted notice counters are dropped here
+        NoticeUnreadCounter.invalidate(user_id__in=user_ids)
+
+    return {'batch': batch, 'assigned': len(user_ids), 'skipped': skipped}
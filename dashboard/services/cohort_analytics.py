@@ -0,0 +1,200 @@
+"""
+Cohort analytics for a mentor's students.
+
+Four bulk queries (students, recent test scores, recent study logs,
+subject progress) are loaded into pandas DataFrames; topic completions are
+counted in SQL. Percentiles, weekly hour trends, per-subject score
+distributions and at-risk flags are then computed vectorized. The report
+is a plain dict, cached per mentor for COHORT_CACHE_TIMEOUT seconds and
+dropped by dashboard.signals when a student's scores, logs, subjects or
+topics change.
+"""
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from dashboard.models import StudentProfile, StudyLog, SubjectProgress, TestScore, TopicCompletion
+
+COHORT_CACHE_TIMEOUT = 60 * 10
+SCORE_WINDOW_DAYS = 90
+TREND_WEEKS = 8
+PERCENTILES = (10, 25, 50, 75, 90)
+SCORE_BINS = np.arange(0, 101, 10)
+
+# At-risk thresholds
+LOW_SCORE_PERCENTILE = 25
+LOW_SUBJECT_PROGRESS = 40
+HOURS_DROP_RATIO = 0.5
+INACTIVE_DAYS = 7
+
+
+def _cache_key(mentor_id):
+    return f"cohort-analytics:{mentor_id}"
+
+
+def invalidate_cohort_reports(student_ids=(), mentor_ids=()):
+    """Drop the cached reports of these mentors and of these students' mentors once the transaction commits"""
+    mentor_ids = set(mentor_ids)
+    if student_ids:
+        mentor_ids.update(StudentProfile.objects.filter(
+            user_id__in=student_ids, mentor__isnull=False
+        ).values_list('mentor_id', flat=True))
+    keys = [_cache_key(mentor_id) for mentor_id in mentor_ids if mentor_id]
+    if keys:
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def _frame(queryset, columns):
+    return pd.DataFrame.from_records(list(queryset.values_list(*columns)), columns=columns)
+
+
+def _round(value, digits=1):
+    return None if value is None or pd.isna(value) else round(float(value), digits)
+
+
+def _percentiles(values):
+    if len(values) == 0:
+        return {f"p{p}": None for p in PERCENTILES}
+    return {f"p{p}": _round(v) for p, v in zip(PERCENTILES, np.percentile(values, PERCENTILES))}
+
+
+def load_cohort(mentor_obj, today):
+    """The mentor's students and their recent activity as DataFrames"""
+    students = _frame(
+        StudentProfile.objects.filter(mentor=mentor_obj, user_type='student'),
+        ['user_id', 'user__username', 'user__first_name', 'user__last_name'],
+    )
+    cohort = {'student__studentprofile__mentor': mentor_obj, 'student__studentprofile__user_type': 'student'}
+    trend_start = today - timedelta(days=today.weekday()) - timedelta(weeks=TREND_WEEKS - 1)
+
+    scores = _frame(
+        TestScore.objects.filter(date_taken__gte=today - timedelta(days=SCORE_WINDOW_DAYS), **cohort),
+        ['student_id', 'subject', 'percentage', 'date_taken'],
+    )
+    logs = _frame(
+        StudyLog.objects.filter(date__gte=trend_start, **cohort),
+        ['student_id', 'date', 'study_hours'],
+    )
+    subjects = _frame(
+        SubjectProgress.objects.filter(**cohort),
+        ['student_id', 'subject', 'progress_percentage'],
+    )
+    return students, scores, logs, subjects, trend_start
+
+
+def weekly_hours(logs, student_ids, trend_start):
+    """Students x weeks matrix of study hours, zero-filled"""
+    weeks = pd.date_range(pd.Timestamp(trend_start), periods=TREND_WEEKS, freq='7D')
+    if logs.empty:
+        return pd.DataFrame(0.0, index=student_ids, columns=weeks)
+    dates = pd.to_datetime(logs['date'])
+    week = dates - pd.to_timedelta(dates.dt.weekday, unit='D')
+    return logs.assign(week=week).pivot_table(
+        index='student_id', columns='week', values='study_hours', aggfunc='sum', fill_value=0.0
+    ).reindex(index=student_ids, columns=weeks, fill_value=0.0)
+
+
+def build_cohort_report(mentor_obj, today=None):
+    today = today or timezone.localdate()
+    students, scores, logs, subjects, trend_start = load_cohort(mentor_obj, today)
+    student_ids = students['user_id'].tolist()
+
+    report = {
+        'mentor_id': mentor_obj.id,
+        'generated_at': timezone.now().isoformat(),
+        'student_count': len(student_ids),
+        'score_percentiles': _percentiles([]),
+        'weekly_hours': [],
+        'subjects': [],
+        'at_risk': [],
+        'topics_this_week': {},
+    }
+    if not student_ids:
+        return report
+
+    # ---- Students per topic completed in the last 7 days ----
+    report['topics_this_week'] = TopicCompletion.students_per_topic(
+        today - timedelta(days=6), today,
+        student__studentprofile__mentor=mentor_obj, student__studentprofile__user_type='student',
+    )
+
+    # ---- Test score percentiles ----
+    average_score = scores.groupby('student_id')['percentage'].mean().reindex(student_ids)
+    score_rank = average_score.rank(pct=True) * 100
+    report['score_percentiles'] = _percentiles(average_score.dropna().to_numpy())
+
+    # ---- Weekly hour trends ----
+    hours = weekly_hours(logs, student_ids, trend_start)
+    weekly = hours.to_numpy()
+    for column, week in enumerate(hours.columns):
+        report['weekly_hours'].append({
+            'week_start': week.date().isoformat(),
+            'mean_hours': _round(weekly[:, column].mean()),
+            'median_hours': _round(np.median(weekly[:, column])),
+            'active_students': int((weekly[:, column] > 0).sum()),
+        })
+
+    # ---- Per-subject score distributions ----
+    for subject, subject_scores in scores.groupby('subject'):
+        values = subject_scores['percentage'].clip(0, 100).to_numpy()
+        counts, _ = np.histogram(values, bins=SCORE_BINS)
+        report['subjects'].append({
+            'subject': subject,
+            'tests': int(len(values)),
+            'students': int(subject_scores['student_id'].nunique()),
+            'mean': _round(values.mean()),
+            **_percentiles(values),
+            'histogram': [
+                {'from': int(low), 'to': int(high), 'count': int(count)}
+                for low, high, count in zip(SCORE_BINS[:-1], SCORE_BINS[1:], counts)
+            ],
+        })
+
+    # ---- At-risk flags ----
+    low_score_cutoff = report['score_percentiles'][f'p{LOW_SCORE_PERCENTILE}']
+    recent = pd.Series(weekly[:, -2:].mean(axis=1), index=student_ids)
+    earlier = pd.Series(weekly[:, :-2].mean(axis=1), index=student_ids)
+    last_log = pd.to_datetime(logs[logs['study_hours'] > 0].groupby('student_id')['date'].max()).reindex(student_ids)
+    inactive = last_log.isna() | (last_log < pd.Timestamp(today - timedelta(days=INACTIVE_DAYS)))
+    weak_subjects = subjects[subjects['progress_percentage'] < LOW_SUBJECT_PROGRESS].groupby(
+        'student_id'
+    )['subject'].agg(list).reindex(student_ids)
+
+    flags = pd.DataFrame({
+        'low_score': (average_score < low_score_cutoff) if low_score_cutoff is not None else False,
+        'hours_dropping': (earlier > 0) & (recent < earlier * HOURS_DROP_RATIO),
+        'inactive': inactive.to_numpy(),
+        'weak_subjects': weak_subjects.notna().to_numpy(),
+    }, index=student_ids)
+
+    names = (students['user__first_name'] + ' ' + students['user__last_name']).str.strip()
+    names = names.where(names != '', students['user__username'])
+    names.index = student_ids
+
+    for student_id in flags.index[flags.any(axis=1)]:
+        row = flags.loc[student_id]
+        report['at_risk'].append({
+            'student_id': int(student_id),
+            'name': names[student_id],
+            'average_score': _round(average_score[student_id]),
+            'score_percentile': _round(score_rank[student_id]),
+            'recent_weekly_hours': _round(recent[student_id]),
+            'reasons': [reason for reason in flags.columns if row[reason]],
+            'weak_subjects': weak_subjects[student_id] if row['weak_subjects'] else [],
+        })
+    report['at_risk'].sort(key=lambda student: (-len(student['reasons']), student['average_score'] or 0))
+    return report
+
+
+def cohort_report(mentor_obj, refresh=False):
+    """build_cohort_report(), cached per mentor"""
+    key = _cache_key(mentor_obj.id)
+    report = None if refresh else cache.get(key)
+    if report is None:
+        report = build_cohort_report(mentor_obj)
+        cache.set(key, report, COHORT_CACHE_TIMEOUT)
+    return report
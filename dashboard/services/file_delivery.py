@@ -0,0 +1,196 @@
+"""
+File delivery for protected media (PYQ PDFs).
+
+serve_file() answers conditional requests (ETag / Last-Modified) with 304,
+serves single byte ranges with 206 so PDF viewers can fetch pages on
+demand, and can hand the transfer to the front-end proxy instead of
+streaming it through a worker:
+
+  FILE_DELIVERY_OFFLOAD = ""                  # stream from Django
+  FILE_DELIVERY_OFFLOAD = "x-sendfile"        # Apache mod_xsendfile, lighttpd
+  FILE_DELIVERY_OFFLOAD = "x-accel-redirect"  # nginx; files are served from
+                                              # FILE_DELIVERY_ACCEL_PREFIX + path
+                                              # relative to MEDIA_ROOT
+
+With offload the proxy handles ranges itself. Permission lookups for PDFs
+are cached (pdf_access) and invalidated by dashboard.signals.
+"""
+import os
+import re
+from email.utils import formatdate
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import content_disposition_header, parse_http_date_safe
+
+CHUNK_SIZE = 64 * 1024
+ACCESS_CACHE_TIMEOUT = 60 * 5
+
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def _file_etag(stat):
+    return f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+
+
+def parse_range(header, size):
+    """
+    (start, end) inclusive for a single "bytes=" range, "unsatisfiable",
+    or None when the header is absent, malformed or asks for several ranges
+    (the whole file is then served, as RFC 9110 allows).
+    """
+    match = RANGE_RE.match((header or "").strip())
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            return "unsatisfiable"
+        return max(size - length, 0), size - 1
+
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or (last and int(last) < start):
+        return "unsatisfiable"
+    return start, end
+
+
+def _if_range_matches(request, etag, last_modified):
+    if_range = request.META.get("HTTP_IF_RANGE")
+    if not if_range:
+        return True
+    if if_range.startswith('"') or if_range.startswith("W/"):
+        return if_range == etag
+    return parse_http_date_safe(if_range) == int(last_modified)
+
+
+def _iter_file_range(path, start, length):
+    with open(path, "rb") as f:
+        f.seek(start)
+        while length > 0:
+            chunk = f.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def _offload_response(path):
+    mode = getattr(settings, "FILE_DELIVERY_OFFLOAD", "")
+    if mode == "x-sendfile":
+        response = HttpResponse()
+        response["X-Sendfile"] = path
+        return response
+    if mode == "x-accel-redirect":
+        prefix = getattr(settings, "FILE_DELIVERY_ACCEL_PREFIX", "/protected-media/")
+        relative = os.path.relpath(path, settings.MEDIA_ROOT).replace(os.sep, "/")
+        response = HttpResponse()
+        response["X-Accel-Redirect"] = prefix.rstrip("/") + "/" + relative
+        return response
+    return None
+
+
+def serve_file(request, path, content_type, filename=None, as_attachment=False):
+    """
+    Response for a local file with conditional GET, Range and optional
+    proxy offload. Raises FileNotFoundError if the file is missing.
+    """
+    stat = os.stat(path)
+    size = stat.st_size
+    etag = _file_etag(stat)
+    last_modified = stat.st_mtime
+
+    response = get_conditional_response(request, etag=etag, last_modified=int(last_modified))
+    if response is None:
+        response = _offload_response(path)
+
+    if response is None:
+        byte_range = None
+        if request.method == "GET" and _if_range_matches(request, etag, last_modified):
+            byte_range = parse_range(request.META.get("HTTP_RANGE"), size)
+
+        if byte_range == "unsatisfiable":
+            response = HttpResponse(status=416)
+            response["Content-Range"] = f"bytes */{size}"
+            return response
+
+        if byte_range:
+            start, end = byte_range
+            length = end - start + 1
+            response = StreamingHttpResponse(_iter_file_range(path, start, length), status=206)
+            response["Content-Range"] = f"bytes {start}-{end}/{size}"
+            response["Content-Length"] = str(length)
+        else:
+            # FileResponse lets the WSGI server use sendfile() when it can
+            response = FileResponse(open(path, "rb"))
+            response["Content-Length"] = str(size)
+
+    if response.status_code != 304:
+        response["Content-Type"] = content_type
+        if filename:
+            response["Content-Disposition"] = content_disposition_header(as_attachment, filename)
+    response["Accept-Ranges"] = "bytes"
+    response["ETag"] = etag
+    response["Last-Modified"] = formatdate(last_modified, usegmt=True)
+    return response
+
+
+# ==================== PDF PERMISSIONS ====================
+
+def _pdf_key(pdf_id):
+    return f"file-delivery:pdf:{pdf_id}"
+
+
+def _role_key(user_id):
+    return f"file-delivery:role:{user_id}"
+
+
+def invalidate_pdf(pdf_id):
+    cache.delete(_pdf_key(pdf_id))
+
+
+def invalidate_user_role(user_id):
+    cache.delete(_role_key(user_id))
+
+
+def pdf_access(user, pdf_id):
+    """
+    {"path", "title"} of an active PYQPDF the user may read, or None.
+    Students may read any active PDF, mentors only their own uploads.
+    Both the PDF row and the user's role are cached, so a warm check costs
+    one cache round-trip and no queries.
+    """
+    from dashboard.models import PYQPDF, StudentProfile
+
+    keys = [_pdf_key(pdf_id), _role_key(user.id)]
+    found = cache.get_many(keys)
+
+    pdf = found.get(keys[0])
+    if pdf is None:
+        row = PYQPDF.objects.filter(id=pdf_id).values(
+            "pdf_file", "linearized_file", "title", "uploaded_by_id", "is_active"
+        ).first()
+        pdf = row or {}
+        if row:
+            # Prefer the linearized copy so browsers can render page 1 early
+            name = row["linearized_file"] or row["pdf_file"]
+            pdf["path"] = PYQPDF._meta.get_field("pdf_file").storage.path(name)
+        cache.set(keys[0], pdf, ACCESS_CACHE_TIMEOUT)
+
+    role = found.get(keys[1])
+    if role is None:
+        role = StudentProfile.objects.filter(user_id=user.id).values_list("user_type", flat=True).first() or ""
+        cache.set(keys[1], role, ACCESS_CACHE_TIMEOUT)
+
+    if not pdf or not pdf["is_active"] or not pdf["pdf_file"]:
+        return None
+    if role == "student" or (role == "mentor" and pdf["uploaded_by_id"] == user.id):
+        return {"path": pdf["path"], "title": pdf["title"]}
+    return None
@@ -0,0 +1,278 @@
+"""
+Background ingestion of uploaded PYQ PDFs.
+
+upload_pyqs only stores the file and queues a PDFIngestionJob; then, per
+job:
+
+  1. reads the real page count with pypdf,
+  2. renders a first-page thumbnail (poppler's pdftoppm when installed,
+     otherwise the largest image embedded in page 1 via pypdf + Pillow),
+  3. writes a linearized "fast web view" copy with qpdf when installed,
+
+and updates the PYQPDF row. Steps 2 and 3 are best effort: when no tool
+is available they are skipped and the PDF is still marked ready.
+Duplicate uploads need no hashing here: pdf_file is content-addressed
+(dashboard/storage.py), so identical files already share one blob.
+
+With settings.PDF_INGESTION_WORKER the run_ingestion_worker command
+processes the queue. Jobs are claimed with a conditional UPDATE, so
+several workers can share the queue on any database, and failures are
+retried with backoff. Without a worker, the web process runs each job on
+a single background thread once the upload has committed, so the upload
+request never waits for the tools; retries are scheduled with the same
+backoff.
+"""
+import io
+import logging
+import os
+import shutil
+import socket
+import subprocess
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connection, transaction
+from django.utils import timezone
+
+from dashboard.models import PDFIngestionJob, PYQPDF
+
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = 3
+RETRY_DELAY = timedelta(minutes=1)
+STALE_AFTER = timedelta(minutes=15)
+THUMBNAIL_SIZE = (320, 320)
+TOOL_TIMEOUT = 120
+
+
+class IngestionError(Exception):
+    pass
+
+
+def enqueue_pdf(pdf):
+    """Mark pdf pending and queue it for the worker"""
+    if pdf.processing_status != 'pending':
+        PYQPDF.objects.filter(pk=pdf.pk).update(processing_status='pending')
+        pdf.processing_status = 'pending'
+    job = PDFIngestionJob.objects.create(pdf=pdf)
+    if not settings.PDF_INGESTION_WORKER:
+        transaction.on_commit(lambda: run_in_background(job.id))
+    return job
+
+
+# ==================== PROCESSING STEPS ====================
+
+def count_pages(path):
+    from pypdf import PdfReader
+    from pypdf.errors import PdfReadError
+
+    try:
+        reader = PdfReader(path)
+        if reader.is_encrypted:
+            reader.decrypt('')
+        return len(reader.pages)
+    except (PdfReadError, ValueError, OSError) as e:
+        raise IngestionError(f"Not a readable PDF: {e}") from e
+
+
+def render_thumbnail(path):
+    """PNG bytes of the first page, or None if nothing could render it"""
+    pdftoppm = shutil.which('pdftoppm')
+    if pdftoppm:
+        with tempfile.TemporaryDirectory() as tmp:
+            prefix = os.path.join(tmp, 'thumb')
+            result = subprocess.run(
+                [pdftoppm, '-png', '-f', '1', '-l', '1', '-singlefile',
+                 '-scale-to', str(max(THUMBNAIL_SIZE)), path, prefix],
+                capture_output=True, timeout=TOOL_TIMEOUT
+            )
+            if result.returncode == 0 and os.path.exists(prefix + '.png'):
+                with open(prefix + '.png', 'rb') as f:
+                    return f.read()
+            logger.warning("pdftoppm failed for %s: %s", path, result.stderr.decode(errors='replace'))
+
+    # Scanned question papers are mostly one image per page
+    try:
+        from PIL import Image
+        from pypdf import PdfReader
+
+        page = PdfReader(path).pages[0]
+        images = list(page.images)
+    except Exception as e:  # pypdf raises many types on odd image encodings
+        logger.info("No embedded image thumbnail for %s: %s", path, e)
+        return None
+    if not images:
+        return None
+
+    largest = max(images, key=lambda image: len(image.data))
+    try:
+        image = Image.open(io.BytesIO(largest.data))
+        image.thumbnail(THUMBNAIL_SIZE)
+        out = io.BytesIO()
+        image.convert('RGB').save(out, format='PNG')
+    except OSError as e:
+        logger.info("Could not decode first-page image of %s: %s", path, e)
+        return None
+    return out.getvalue()
+
+
+def linearize(path):
+    """Bytes of a linearized copy (qpdf), or None if qpdf is unavailable"""
+    qpdf = shutil.which('qpdf')
+    if not qpdf:
+        return None
+    with tempfile.TemporaryDirectory() as tmp:
+        target = os.path.join(tmp, 'linearized.pdf')
+        result = subprocess.run(
+            [qpdf, '--linearize', path, target], capture_output=True, timeout=TOOL_TIMEOUT
+        )
+        # Exit code 3 means success with warnings
+        if result.returncode not in (0, 3):
+            logger.warning("qpdf failed for %s: %s", path, result.stderr.decode(errors='replace'))
+            return None
+        with open(target, 'rb') as f:
+            return f.read()
+
+
+def ingest_pdf(pdf):
+    """Run every step for one PYQPDF and save the results"""
+    path = pdf.pdf_file.path
+    base = os.path.splitext(os.path.basename(pdf.pdf_file.name))[0]
+
+    pdf.pages = count_pages(path)
+    update_fields = ['pages', 'processing_status']
+
+    thumbnail = render_thumbnail(path)
+    if thumbnail:
+        if pdf.thumbnail:
+            pdf.thumbnail.delete(save=False)
+        pdf.thumbnail.save(f"{base}.png", ContentFile(thumbnail), save=False)
+        update_fields.append('thumbnail')
+
+    linearized = linearize(path)
+    if linearized:
+        if pdf.linearized_file:
+            pdf.linearized_file.delete(save=False)
+        pdf.linearized_file.save(f"{base}.pdf", ContentFile(linearized), save=False)
+        update_fields.append('linearized_file')
+
+    pdf.processing_status = 'ready'
+    pdf.save(update_fields=update_fields)
+    return pdf
+
+
+# ==================== QUEUE ====================
+
+def requeue_stale_jobs(now=None):
+    """Jobs left running by a crashed worker go back to the queue"""
+    now = now or timezone.now()
+    return PDFIngestionJob.objects.filter(
+        status='running', started_at__lt=now - STALE_AFTER
+    ).update(status='queued', worker='')
+
+
+def claim_job(worker, now=None):
+    """Claim the oldest due job for worker, or return None"""
+    now = now or timezone.now()
+    candidates = PDFIngestionJob.objects.filter(
+        status='queued', run_after__lte=now
+    ).order_by('run_after', 'id').values_list('id', flat=True)[:10]
+
+    for job_id in candidates:
+        job = claim_job_id(job_id, worker, now)
+        if job is not None:
+            return job
+    return None
+
+
+def claim_job_id(job_id, worker, now=None):
+    """Claim one job if it is still queued, or return None"""
+    # Only one worker's UPDATE can match status='queued'
+    claimed = PDFIngestionJob.objects.filter(id=job_id, status='queued').update(
+        status='running', worker=worker, started_at=now or timezone.now()
+    )
+    if claimed:
+        return PDFIngestionJob.objects.select_related('pdf').get(id=job_id)
+    return None
+
+
+def run_job(job):
+    """Process a claimed job; returns True on success"""
+    job.attempts += 1
+    try:
+        ingest_pdf(job.pdf)
+    except Exception as e:
+        if isinstance(e, IngestionError):
+            logger.warning("Ingestion of PDF %s failed: %s", job.pdf_id, e)
+        else:
+            logger.exception("Ingestion of PDF %s failed (attempt %d)", job.pdf_id, job.attempts)
+        job.last_error = str(e)
+        job.finished_at = timezone.now()
+        with transaction.atomic():
+            if job.attempts < MAX_ATTEMPTS and not isinstance(e, IngestionError):
+                job.status = 'queued'
+                job.run_after = timezone.now() + RETRY_DELAY * job.attempts
+            else:
+                job.status = 'failed'
+                PYQPDF.objects.filter(pk=job.pdf_id).update(processing_status='failed')
+            job.save(update_fields=['attempts', 'last_error', 'finished_at', 'status', 'run_after'])
+        return False
+
+    job.status = 'done'
+    job.last_error = ''
+    job.finished_at = timezone.now()
+    job.save(update_fields=['attempts', 'last_error', 'finished_at', 'status'])
+    return True
+
+
+# ==================== IN-PROCESS FALLBACK ====================
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def background_executor():
+    """The process's ingestion thread; one job at a time keeps uploads responsive"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='pdf-ingestion')
+        return _executor
+
+
+def run_in_background(job_id, delay=0):
+    """Run a job on the ingestion thread, after delay seconds"""
+    if delay > 0:
+        timer = threading.Timer(delay, run_in_background, (job_id,))
+        timer.daemon = True
+        timer.start()
+        return
+    background_executor().submit(_run_background, job_id)
+
+
+def _run_background(job_id):
+    try:
+        job = run_inline(job_id)
+        if job is not None and job.status == 'queued':
+            run_in_background(job_id, (job.run_after - timezone.now()).total_seconds())
+    except Exception:
+        logger.exception("Background ingestion of job %s failed", job_id)
+    finally:
+        # The thread outlives requests, so it must not keep its connection open
+        connection.close()
+
+
+def run_inline(job_id):
+    """Process one job in this process if it is due; returns the job, or None if not claimed"""
+    job = claim_job_id(job_id, f"inline:{default_worker_name()}")
+    if job is not None:
+        run_job(job)
+    return job
+
+
+def default_worker_name():
+    return f"{socket.gethostname()}:{os.getpid()}"
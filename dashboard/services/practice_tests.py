@@ -0,0 +1,202 @@
+"""
+Practice tests built from PYQQuestion.
+
+All question ids are kept in process memory as compact per-(subject,
+topic, difficulty) pools (array('l'), 8 bytes per question), loaded with
+one values_list query. Building a test samples ids from the matching pools
+and fetches exactly those rows by primary key - there is no
+ORDER BY RANDOM() over the table. Each build first reads the pool version
+from the shared cache; the PYQQuestion signals replace it on every save or
+delete, so every process reloads its pools after a change. Writes that send
+no signals (bulk_create, QuerySet.update) must call
+invalidate_question_pools().
+
+A generated test is handed to the browser as a signed token holding its
+question ids, the student it was built for and a nonce; grading reads all
+correct answers in one query and writes a TestScore with NEET marking
+(+4 / -1 / 0). The nonce is stored on the TestScore under a unique
+constraint, so a test is graded once however many workers receive it.
+"""
+import random
+import threading
+import uuid
+from array import array
+from bisect import bisect_right
+from itertools import accumulate
+
+from django.core import signing
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from dashboard.models import PYQQuestion, TestScore
+
+MAX_QUESTIONS = 180
+MARKS_CORRECT = 4
+MARKS_WRONG = 1
+TOKEN_SALT = 'dashboard.practice-test'
+TOKEN_MAX_AGE = 60 * 60 * 6
+POOL_VERSION_KEY = 'practice-tests:pool-version'
+
+# NEET paper: 45 Physics, 45 Chemistry, 90 Biology
+NEET_MOCK = {'Physics': 45, 'Chemistry': 45, 'Biology': 90}
+
+QUESTION_FIELDS = (
+    'id', 'subject', 'year', 'topic', 'difficulty', 'question_number',
+    'question_text', 'option_a', 'option_b', 'option_c', 'option_d',
+)
+
+_pools = {'version': None, 'pools': {}}
+_pools_lock = threading.Lock()
+
+
+class PracticeTestError(Exception):
+    pass
+
+
+# ==================== QUESTION POOLS ====================
+
+def _pool_version():
+    """Shared token that changes whenever questions change; created if missing"""
+    version = cache.get(POOL_VERSION_KEY)
+    if version is None:
+        cache.add(POOL_VERSION_KEY, uuid.uuid4().hex, None)
+        version = cache.get(POOL_VERSION_KEY)
+    # Without a usable cache every build reloads rather than serving stale pools
+    return version or uuid.uuid4().hex
+
+
+def invalidate_question_pools():
+    """Make every process reload its pools once the transaction commits"""
+    transaction.on_commit(lambda: cache.set(POOL_VERSION_KEY, uuid.uuid4().hex, None))
+
+
+def question_pools():
+    """{(subject, topic, difficulty): array of question ids}"""
+    version = _pool_version()
+    if _pools['version'] == version:
+        return _pools['pools']
+
+    with _pools_lock:
+        if _pools['version'] != version:
+            pools = {}
+            rows = PYQQuestion.objects.order_by().values_list('id', 'subject', 'topic', 'difficulty')
+            for question_id, subject, topic, difficulty in rows.iterator(chunk_size=5000):
+                pools.setdefault((subject, topic, difficulty), array('l')).append(question_id)
+            _pools['pools'] = pools
+            _pools['version'] = version
+    return _pools['pools']
+
+
+def matching_pools(subject=None, topics=None, difficulty=None):
+    topics = set(topics or ())
+    return [
+        ids for (pool_subject, topic, pool_difficulty), ids in question_pools().items()
+        if (not subject or pool_subject == subject)
+        and (not topics or topic in topics)
+        and (not difficulty or pool_difficulty == difficulty)
+    ]
+
+
+def sample_ids(pools, count, rng=random):
+    """count distinct ids drawn uniformly across pools without joining them"""
+    sizes = [len(ids) for ids in pools]
+    ends = list(accumulate(sizes))
+    total = ends[-1] if ends else 0
+    picked = []
+    for position in rng.sample(range(total), min(count, total)):
+        pool = bisect_right(ends, position)
+        offset = position - (ends[pool] - sizes[pool])
+        picked.append(pools[pool][offset])
+    return picked
+
+
+# ==================== BUILD ====================
+
+def _fetch_questions(ids):
+    questions = PYQQuestion.objects.only(*QUESTION_FIELDS).in_bulk(ids)
+    return [questions[question_id] for question_id in ids if question_id in questions]
+
+
+def _test_token(student, ids, subject, name):
+    return signing.dumps(
+        {'student': student.id, 'ids': ids, 'subject': subject, 'name': name, 'nonce': uuid.uuid4().hex},
+        salt=TOKEN_SALT, compress=True
+    )
+
+
+def build_practice_test(student, count, subject=None, topics=None, difficulty=None, rng=random):
+    """
+    Random test of up to count questions matching the filters.
+    Returns (questions, token); raises PracticeTestError if none match.
+    """
+    count = max(1, min(int(count), MAX_QUESTIONS))
+    ids = sample_ids(matching_pools(subject, topics, difficulty), count, rng)
+    if not ids:
+        raise PracticeTestError("No questions match these filters yet.")
+
+    name = f"Practice: {subject or 'All subjects'}"
+    if topics:
+        name += f" ({', '.join(sorted(topics))})"
+    return _fetch_questions(ids), _test_token(student, ids, subject or 'Mixed', name[:200])
+
+
+def build_mock_test(student, distribution=NEET_MOCK, rng=random):
+    """Full mock with the NEET subject split, subjects in paper order"""
+    ids = []
+    for subject, count in distribution.items():
+        ids.extend(sample_ids(matching_pools(subject), count, rng))
+    if not ids:
+        raise PracticeTestError("No questions available for a mock test yet.")
+    return _fetch_questions(ids), _test_token(student, ids, 'Full Mock', 'NEET Mock Test')
+
+
+# ==================== GRADE ====================
+
+def grade_practice_test(student, token, answers, today=None):
+    """
+    Grade answers ({question_id: 'A'..'D'}) for the test in token and
+    record a TestScore. Each token can be graded once, by the student it
+    was built for.
+    """
+    try:
+        test = signing.loads(token, salt=TOKEN_SALT, max_age=TOKEN_MAX_AGE)
+    except signing.SignatureExpired:
+        raise PracticeTestError("This practice test has expired.")
+    except signing.BadSignature:
+        raise PracticeTestError("Invalid practice test.")
+    if test.get('student') != student.id:
+        raise PracticeTestError("Invalid practice test.")
+
+    correct_answers = dict(
+        PYQQuestion.objects.filter(id__in=test['ids']).values_list('id', 'correct_answer')
+    )
+    correct = wrong = 0
+    for question_id, correct_answer in correct_answers.items():
+        answer = (answers.get(question_id) or '').strip().upper()
+        if not answer:
+            continue
+        if answer == correct_answer:
+            correct += 1
+        else:
+            wrong += 1
+
+    max_marks = len(correct_answers) * MARKS_CORRECT
+    score = correct * MARKS_CORRECT - wrong * MARKS_WRONG
+    try:
+        with transaction.atomic():
+            # StudentProgress is updated by the TestScore signals
+            test_score = TestScore.objects.create(
+                student=student,
+                subject=test['subject'],
+                test_name=test['name'],
+                score=score,
+                max_marks=max_marks,
+                date_taken=today or timezone.localdate(),
+                # score keeps negative marking; the percentage feeds progress bars
+                percentage=max(round(score / max_marks * 100, 2), 0) if max_marks else 0,
+                practice_nonce=test['nonce'],
+            )
+    except IntegrityError:
+        raise PracticeTestError("This practice test was already submitted.")
+    return test_score, {'correct': correct, 'wrong': wrong, 'unanswered': len(correct_answers) - correct - wrong}
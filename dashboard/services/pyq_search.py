@@ -0,0 +1,115 @@
+"""
+Ranked full-text search over PYQQuestion.
+
+The index is created by migration 0022_pyqquestion_search:
+  - PostgreSQL: weighted tsvector column (question A, options B,
+    explanation C) with a GIN index, queried with websearch_to_tsquery and
+    ranked with ts_rank_cd;
+  - SQLite: FTS5 table (porter stemming) ranked with bm25.
+Other databases fall back to an unranked icontains scan.
+
+Filters are plain column filters on the same queryset, so the result can
+be paginated like any other queryset.
+"""
+import re
+
+from django.core.paginator import Paginator
+from django.db import connection
+from django.db.models import BooleanField, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+from dashboard.models import PYQQuestion
+
+PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+MAX_TERMS = 12
+FILTER_FIELDS = ('subject', 'year', 'topic', 'difficulty')
+TEXT_FIELDS = ('question_text', 'option_a', 'option_b', 'option_c', 'option_d', 'explanation')
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+# bm25 column weights, in the FTS5 column order of the migration
+FTS_WEIGHTS = "10.0, 2.0, 2.0, 2.0, 2.0, 1.0"
+
+
+def fts5_query(text):
+    """
+    User input -> safe FTS5 MATCH expression: every word must match,
+    and the last one is a prefix so partial words still find results.
+    """
+    terms = TOKEN_RE.findall(text)[:MAX_TERMS]
+    if not terms:
+        return None
+    quoted = [f'"{term}"' for term in terms]
+    quoted[-1] += '*'
+    return ' '.join(quoted)
+
+
+def _postgres_search(questions, text):
+    query = "websearch_to_tsquery('english', %s)"
+    # search_vector is maintained by a trigger and is not a model field
+    return questions.filter(
+        RawSQL(f"dashboard_pyqquestion.search_vector @@ {query}", (text,), output_field=BooleanField())
+    ).annotate(
+        rank=RawSQL(f"ts_rank_cd(dashboard_pyqquestion.search_vector, {query})", (text,), output_field=FloatField())
+    )
+
+
+def _sqlite_search(questions, text):
+    match = fts5_query(text)
+    if match is None:
+        return questions.none()
+    # The FTS lookup runs once; rank is read back per matched row by rowid
+    return questions.filter(
+        id__in=RawSQL(
+            "SELECT rowid FROM dashboard_pyqquestion_fts WHERE dashboard_pyqquestion_fts MATCH %s", (match,)
+        )
+    ).annotate(
+        rank=RawSQL(
+            "(SELECT -bm25(dashboard_pyqquestion_fts, " + FTS_WEIGHTS + ") "
+            "FROM dashboard_pyqquestion_fts "
+            "WHERE dashboard_pyqquestion_fts MATCH %s AND rowid = dashboard_pyqquestion.id)",
+            (match,),
+            output_field=FloatField()
+        )
+    )
+
+
+def _fallback_search(questions, text):
+    condition = Q()
+    for term in TOKEN_RE.findall(text)[:MAX_TERMS]:
+        term_condition = Q()
+        for field in TEXT_FIELDS:
+            term_condition |= Q(**{f'{field}__icontains': term})
+        condition &= term_condition
+    return questions.filter(condition).annotate(rank=Value(0.0, output_field=FloatField()))
+
+
+def search_questions(text, **filters):
+    """
+    Questions matching text (all words), best first. filters may contain
+    subject, year, topic and difficulty; empty values are ignored.
+    """
+    questions = PYQQuestion.objects.filter(
+        **{field: value for field, value in filters.items() if field in FILTER_FIELDS and value}
+    )
+
+    text = (text or '').strip()
+    if not text:
+        return questions.annotate(rank=Value(0.0, output_field=FloatField())).order_by(
+            '-year', 'subject', 'question_number'
+        )
+
+    if connection.vendor == 'postgresql':
+        questions = _postgres_search(questions, text)
+    elif connection.vendor == 'sqlite':
+        questions = _sqlite_search(questions, text)
+    else:
+        questions = _fallback_search(questions, text)
+    return questions.order_by('-rank', '-year', 'question_number')
+
+
+def search_page(text, page=1, page_size=PAGE_SIZE, **filters):
+    """One Paginator page of search_questions()"""
+    page_size = max(1, min(int(page_size), MAX_PAGE_SIZE))
+    return Paginator(search_questions(text, **filters), page_size).get_page(page)
@@ -0,0 +1,32 @@
+"""
+One-time initialization of a student's progress rows.
+
+The StudentProgress row is created once (at registration, on the first
+progress POST, or by recompute_student_progress for existing accounts) so
+that rendering the progress page never writes. No SubjectProgress rows are
+seeded: overall_preparation is derived from them, so they only hold what
+the student actually recorded. Subjects without a row are shown, unsaved,
+with the values the first target update stores for them.
+"""
+from dashboard.models import StudentProgress, SubjectProgress
+
+SUBJECT_NAMES = [name for name, _ in SubjectProgress.SUBJECT_CHOICES]
+
+
+def default_subject_progress(student_id, subject):
+    """Unsaved row matching what update_subject_target creates"""
+    return SubjectProgress(student_id=student_id, subject=subject, progress_percentage=0, needs_attention='')
+
+
+def initialize_student(user):
+    """Create the student's StudentProgress row if it does not exist yet"""
+    StudentProgress.for_student(user)
+
+
+def subject_progress_for(user):
+    """Every subject for the progress page in one query; missing rows are unsaved and empty"""
+    saved = {
+        row.subject: row
+        for row in SubjectProgress.objects.filter(student=user, subject__in=SUBJECT_NAMES).order_by('id')
+    }
+    return [saved.get(subject) or default_subject_progress(user.id, subject) for subject in SUBJECT_NAMES]
@@ -0,0 +1,122 @@
+import csv
+import io
+import json
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Q
+
+from dashboard.models import StudentProfile, StudentTestSeries
+from .batch_assignment import parse_ids
+
+BATCH_SIZE = 1000
+
+
+class EnrollmentImportError(Exception):
+    pass
+
+
+def enroll_students(series, mentor, student_user_ids):
+    """
+    Enroll a set of the mentor's students into a TestSeries.
+
+    Students are resolved with one query, missing enrollments are inserted
+    with bulk_create(ignore_conflicts=True) against the
+    (student, test_series) unique constraint, and inactive ones are
+    reactivated with one UPDATE.
+
+    Returns {'inserted', 'reactivated', 'skipped', 'not_found'} where
+    skipped counts students that were already actively enrolled.
+    """
+    requested = parse_ids(student_user_ids)
+
+    user_ids = set(StudentProfile.objects.filter(
+        user_id__in=requested,
+        mentor=mentor
+    ).values_list('user_id', flat=True))
+    not_found = sorted(requested - user_ids)
+
+    with transaction.atomic():
+        existing = dict(StudentTestSeries.objects.filter(
+            test_series=series,
+            student_id__in=user_ids
+        ).values_list('student_id', 'is_active'))
+
+        missing = user_ids - existing.keys()
+        StudentTestSeries.objects.bulk_create(
+            [StudentTestSeries(student_id=user_id, test_series=series, is_active=True)
+             for user_id in missing],
+            batch_size=BATCH_SIZE,
+            ignore_conflicts=True,
+        )
+
+        inactive = [user_id for user_id, is_active in existing.items() if not is_active]
+        if inactive:
+            StudentTestSeries.objects.filter(
+                test_series=series,
+                student_id__in=inactive
+            ).update(is_active=True)
+
+    return {
+        'inserted': len(missing),
+        'reactivated': len(inactive),
+        'skipped': len(existing) - len(inactive),
+        'not_found': not_found,
+    }
+
+
+def read_student_identifiers(uploaded_file):
+    """
+    Read student identifiers from an uploaded CSV or JSON file.
+
+    CSV: a header row with one of student_id / user_id / username / email.
+    JSON: a list of ids, usernames/emails, or objects with one of those keys.
+    Returns a list of strings.
+    """
+    name = (uploaded_file.name or '').lower()
+    try:
+        text = uploaded_file.read().decode('utf-8-sig')
+    except UnicodeDecodeError:
+        raise EnrollmentImportError("File must be UTF-8 encoded.")
+
+    keys = ('student_id', 'user_id', 'username', 'email')
+
+    if name.endswith('.json'):
+        try:
+            rows = json.loads(text)
+        except ValueError:
+            raise EnrollmentImportError("Invalid JSON file.")
+        if not isinstance(rows, list):
+            raise EnrollmentImportError("JSON file must contain a list.")
+        values = []
+        for row in rows:
+            if isinstance(row, dict):
+                row = next((row[key] for key in keys if row.get(key) not in (None, '')), None)
+            if row is not None:
+                values.append(str(row).strip())
+        return values
+
+    if name.endswith('.csv'):
+        reader = csv.DictReader(io.StringIO(text))
+        column = next((key for key in keys if key in (reader.fieldnames or [])), None)
+        if column is None:
+            raise EnrollmentImportError(f"CSV needs one of these columns: {', '.join(keys)}.")
+        return [row[column].strip() for row in reader if row.get(column)]
+
+    raise EnrollmentImportError("Only .csv and .json files are supported.")
+
+
+def resolve_user_ids(identifiers):
+    """Map ids/usernames/emails to user ids with at most one query"""
+    ids = {int(value) for value in identifiers if value.isdigit()}
+    names = {value for value in identifiers if not value.isdigit()}
+    if names:
+        ids.update(User.objects.filter(
+            Q(username__in=names) | Q(email__in=names)
+        ).values_list('id', flat=True))
+    return ids
+
+
+def import_enrollments(series, mentor, uploaded_file):
+    """Enroll students listed in a CSV/JSON upload into a TestSeries"""
+    return enroll_students(series, mentor, resolve_user_ids(read_student_identifiers(uploaded_file)))
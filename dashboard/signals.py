@@ -1,8 +1,15 @@
 # dashboard/signals.py
-from django.db.models.signals import post_save
+from django.db.models.signals import post_init, post_save, post_delete, m2m_changed
 from django.dispatch import receiver
 from django.contrib.auth.models import User
-from .models import StudentProfile
+from .models import (
+    MessageReply, Notice, NoticeUnreadCounter, PYQPDF, PYQQuestion, StoredBlob, StudentMessage,
+    StudentProfile, StudentProgress, StudyLog, SubjectProgress, TestScore, TopicCompletion
+)
+from .storage import take_pin
+from .services.cohort_analytics import invalidate_cohort_reports
+from .services.file_delivery import invalidate_pdf, invalidate_user_role
+from .services.practice_tests import invalidate_question_pools
 
 @receiver(post_save, sender=User)
 def create_student_profile(sender, instance, created, **kwargs):
@@ -11,4 +18,207 @@ def create_student_profile(sender, instance, created, **kwargs):
 
 @receiver(post_save, sender=User)
 def save_student_profile(sender, instance, **kwargs):
-    instance.studentprofile.save()
\ No newline at end of file
+    instance.studentprofile.save()
+
+
+# ==================== UNREAD NOTICE COUNTERS ====================
+
+@receiver(post_save, sender=Notice)
+def update_counters_on_notice_save(sender, instance, created, **kwargs):
+    if created:
+        if instance.is_active:
+            NoticeUnreadCounter.adjust(
+                instance.mentor_id,
+                instance.recipient_profiles().values('user_id'),
+                1
+            )
+    else:
+        # Targeting or is_active may have changed; rebuild lazily
+        NoticeUnreadCounter.invalidate(mentor_id=instance.mentor_id)
+
+@receiver(post_delete, sender=Notice)
+def update_counters_on_notice_delete(sender, instance, **kwargs):
+    NoticeUnreadCounter.invalidate(mentor_id=instance.mentor_id)
+
+@receiver(m2m_changed, sender=Notice.read_by.through)
+def update_counters_on_read(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'post_add' and not reverse:
+        # pk_set only holds users that were newly added
+        if instance.is_active and pk_set:
+            NoticeUnreadCounter.adjust(
+                instance.mentor_id,
+                instance.recipient_profiles().filter(user_id__in=pk_set).values('user_id'),
+                -1
+            )
+    elif action in ('post_add', 'post_remove', 'post_clear'):
+        if reverse:
+            NoticeUnreadCounter.invalidate(user_id=instance.pk)
+        else:
+            NoticeUnreadCounter.invalidate(mentor_id=instance.mentor_id)
+
+@receiver(post_save, sender=StudentProfile)
+def invalidate_counters_on_profile_save(sender, instance, created, **kwargs):
+    # Mentor and batch decide which notices a student sees; other saves
+    # (one per login, via save_student_profile) keep the counters
+    if not created and profile_changed(instance, 'mentor_id', 'batch_enrolled'):
+        NoticeUnreadCounter.invalidate(user_id=instance.user_id)
+
+
+# ==================== FILE DELIVERY PERMISSIONS ====================
+
+@receiver(post_save, sender=PYQPDF)
+@receiver(post_delete, sender=PYQPDF)
+def invalidate_pdf_access(sender, instance, **kwargs):
+    invalidate_pdf(instance.pk)
+
+@receiver(post_save, sender=StudentProfile)
+@receiver(post_delete, sender=StudentProfile)
+def invalidate_pdf_role(sender, instance, **kwargs):
+    invalidate_user_role(instance.user_id)
+
+
+# ==================== STUDENT PROGRESS AGGREGATES ====================
+
+@receiver(post_init, sender=StudyLog)
+def remember_study_hours(sender, instance, **kwargs):
+    # What the row held when loaded, so post_save can apply the difference
+    if instance.pk is not None and 'study_hours' not in instance.get_deferred_fields():
+        instance._saved_hours = (instance.student_id, instance.study_hours)
+
+@receiver(post_save, sender=StudyLog)
+def update_progress_on_log_save(sender, instance, created, **kwargs):
+    saved = (instance.student_id, 0) if created else getattr(instance, '_saved_hours', None)
+    if saved is None or saved[0] != instance.student_id:
+        student_ids = {instance.student_id}
+        if saved is not None:
+            student_ids.add(saved[0])
+        StudentProgress.recompute(student_ids)
+    elif instance.study_hours != saved[1]:
+        StudentProgress.adjust(instance.student_id, hours=instance.study_hours - saved[1])
+    instance._saved_hours = (instance.student_id, instance.study_hours)
+
+@receiver(post_delete, sender=StudyLog)
+def update_progress_on_log_delete(sender, instance, **kwargs):
+    saved = getattr(instance, '_saved_hours', None)
+    if saved is None:
+        StudentProgress.recompute([instance.student_id])
+    else:
+        StudentProgress.adjust(saved[0], hours=-saved[1])
+
+@receiver(post_save, sender=TestScore)
+def update_progress_on_score_save(sender, instance, created, **kwargs):
+    if created:
+        StudentProgress.adjust(instance.student_id, tests=1)
+    StudentProgress.refresh_preparation(instance.student_id)
+
+@receiver(post_delete, sender=TestScore)
+def update_progress_on_score_delete(sender, instance, **kwargs):
+    StudentProgress.adjust(instance.student_id, tests=-1)
+    StudentProgress.refresh_preparation(instance.student_id)
+
+@receiver(post_save, sender=SubjectProgress)
+@receiver(post_delete, sender=SubjectProgress)
+def update_progress_on_subject_change(sender, instance, **kwargs):
+    StudentProgress.refresh_preparation(instance.student_id)
+
+
+# ==================== COHORT ANALYTICS ====================
+
+@receiver(post_save, sender=TestScore)
+@receiver(post_delete, sender=TestScore)
+@receiver(post_save, sender=StudyLog)
+@receiver(post_delete, sender=StudyLog)
+@receiver(post_save, sender=SubjectProgress)
+@receiver(post_delete, sender=SubjectProgress)
+@receiver(post_save, sender=TopicCompletion)
+@receiver(post_delete, sender=TopicCompletion)
+def invalidate_cohort_on_activity(sender, instance, **kwargs):
+    invalidate_cohort_reports(student_ids=[instance.student_id])
+
+@receiver(post_save, sender=StudentProfile)
+def invalidate_cohort_on_profile_save(sender, instance, **kwargs):
+    # Only a new mentor or role moves the student between cohorts
+    if profile_changed(instance, 'mentor_id', 'user_type'):
+        saved = getattr(instance, '_saved_profile', {})
+        invalidate_cohort_reports(mentor_ids=[instance.mentor_id, saved.get('mentor_id')])
+
+@receiver(post_delete, sender=StudentProfile)
+def invalidate_cohort_on_profile_delete(sender, instance, **kwargs):
+    saved = getattr(instance, '_saved_profile', {})
+    invalidate_cohort_reports(mentor_ids=[instance.mentor_id, saved.get('mentor_id')])
+
+
+# ==================== PRACTICE TEST POOLS ====================
+
+@receiver(post_save, sender=PYQQuestion)
+@receiver(post_delete, sender=PYQQuestion)
+def invalidate_pools_on_question_change(sender, instance, **kwargs):
+    invalidate_question_pools()
+
+
+# ==================== CONTENT-ADDRESSED BLOB REFCOUNTS ====================
+
+BLOB_FIELDS = {
+    PYQPDF: ['pdf_file'],
+    StudentMessage: ['attachment'],
+    MessageReply: ['attachment'],
+}
+
+def _blob_names(instance):
+    # Deferred fields are skipped; reading them would cost a query each
+    deferred = instance.get_deferred_fields()
+    return {
+        field: getattr(instance, field).name or ''
+        for field in BLOB_FIELDS[type(instance)]
+        if field not in deferred
+    }
+
+def remember_blob_names(sender, instance, **kwargs):
+    # Loaded names, so post_save can tell which files were replaced
+    instance._blob_names = _blob_names(instance)
+
+def update_blob_refs(sender, instance, created, **kwargs):
+    old_names = {} if created else getattr(instance, '_blob_names', {})
+    new_names = _blob_names(instance)
+    for field, name in new_names.items():
+        if not created and field not in old_names:
+            continue
+        old = old_names.get(field, '')
+        if name == old:
+            continue
+        if name and not take_pin(name):
+            StoredBlob.acquire(name)
+        if old:
+            StoredBlob.release(old, instance._meta.get_field(field).storage)
+    instance._blob_names = {**old_names, **new_names}
+
+def release_blob_refs(sender, instance, **kwargs):
+    for field, name in getattr(instance, '_blob_names', {}).items():
+        if name:
+            StoredBlob.release(name, instance._meta.get_field(field).storage)
+
+for model in BLOB_FIELDS:
+    post_init.connect(remember_blob_names, sender=model, dispatch_uid=f'blob_names_{model.__name__}')
+    post_save.connect(update_blob_refs, sender=model, dispatch_uid=f'blob_save_{model.__name__}')
+    post_delete.connect(release_blob_refs, sender=model, dispatch_uid=f'blob_delete_{model.__name__}')
+
+
+# ==================== STUDENT PROFILE SNAPSHOTS ====================
+
+PROFILE_FIELDS = ('mentor_id', 'batch_enrolled', 'user_type')
+
+def profile_changed(instance, *fields):
+    """Whether any of fields differs from the loaded value (True if unknown)"""
+    saved = getattr(instance, '_saved_profile', None)
+    return saved is None or any(saved[field] != getattr(instance, field) for field in fields)
+
+@receiver(post_init, sender=StudentProfile)
+def remember_profile_fields(sender, instance, **kwargs):
+    # Values as loaded, so post_save receivers can tell what changed
+    if instance.pk is not None and not set(PROFILE_FIELDS) & instance.get_deferred_fields():
+        instance._saved_profile = {field: getattr(instance, field) for field in PROFILE_FIELDS}
+
+# Connected after every receiver above, which compare against the old values
+@receiver(post_save, sender=StudentProfile)
+def refresh_profile_fields(sender, instance, **kwargs):
+    instance._saved_profile = {field: getattr(instance, field) for field in PROFILE_FIELDS}
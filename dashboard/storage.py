@@ -0,0 +1,92 @@
+# dashboard/storage.py
+"""
+Content-addressed file storage.
+
+Uploads are hashed (sha256) while they are streamed to a temporary file,
+then moved to blobs/<aa>/<bb>/<digest><ext>. If a blob with that digest
+already exists, the temporary copy is discarded, so a re-upload takes no
+extra disk and only costs one streaming pass. Files are never read into
+memory as a whole.
+
+Several rows can point at the same blob, so blobs are reference-counted
+(StoredBlob, maintained by dashboard/signals.py) and deleted only when the
+last reference goes away. _save takes the new row's reference itself,
+before it looks for an existing file, so a blob cannot be deleted between
+that check and the row being saved. The name it returns is a PinnedName,
+which FieldFile stores on the instance, so the reference travels with the
+row being saved: update_blob_refs claims it with take_pin() instead of
+counting it twice, and a save that fails drops it with the instance (a
+leftover count only keeps the file). Use blob_storage as the storage of any
+FileField whose files should be shared this way and add the field to
+BLOB_FIELDS in dashboard/signals.py.
+"""
+import hashlib
+import os
+import tempfile
+
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+BLOB_DIR = 'blobs'
+
+
+class PinnedName(str):
+    """Blob name from _save, holding the reference _save counted for its row"""
+    pinned = True
+
+
+def take_pin(name):
+    """Claim the reference _save counted for name, once; False if there is none"""
+    if not getattr(name, 'pinned', False):
+        return False
+    name.pinned = False
+    return True
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+
+    def get_available_name(self, name, max_length=None):
+        # The final name is chosen in _save from the content digest
+        return name
+
+    def blob_name(self, digest, original_name):
+        ext = os.path.splitext(original_name)[1].lower()[:10]
+        return f"{BLOB_DIR}/{digest[:2]}/{digest[2:4]}/{digest}{ext}"
+
+    def _save(self, name, content):
+        from dashboard.models import StoredBlob
+
+        os.makedirs(os.path.join(self.location, BLOB_DIR), exist_ok=True)
+        digest = hashlib.sha256()
+
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.join(self.location, BLOB_DIR), suffix='.part')
+        try:
+            with os.fdopen(fd, 'wb') as tmp:
+                if hasattr(content, 'seek'):
+                    content.seek(0)
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    tmp.write(chunk)
+
+            blob = self.blob_name(digest.hexdigest(), name)
+            full_path = self.path(blob)
+            StoredBlob.acquire(blob)
+            if os.path.exists(full_path):
+                os.remove(tmp_path)
+            else:
+                os.makedirs(os.path.dirname(full_path), exist_ok=True)
+                if self.file_permissions_mode is not None:
+                    os.chmod(tmp_path, self.file_permissions_mode)
+                # Atomic; a concurrent identical upload just replaces equal bytes
+                os.replace(tmp_path, full_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        return PinnedName(blob)
+
+
+def blob_storage():
+    return ContentAddressedStorage()
@@ -1,3 +1,1107 @@
-from django.test import TestCase
+import hashlib
+import io
+import json
+import logging
+import os
+import tempfile
+from datetime import timedelta
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import IntegrityError, connection, transaction
+from django.test import Client, RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from scheduler.models import Call
+from scheduler.services.ical import feed_token
+
+from .diagnostics import DebugSampleFilter, DebugSamplingMiddleware, is_debug_sampled
+from .profiling import REGISTRY, reset_view_stats, view_stats
+from .models import (
+    Batch,
+    Mentor,
+    MentorProfile,
+    Notice,
+    NoticeUnreadCounter,
+    PDFIngestionJob,
+    PYQPDF,
+    PYQQuestion,
+    StoredBlob,
+    StudentBatch,
+    StudentMessage,
+    StudentProfile,
+    StudentProgress,
+    StudentTestSeries,
+    StudyLog,
+    SubjectProgress,
+    TestScore,
+    TestSeries,
+    TopicCompletion,
+)
+from .services.cohort_analytics import build_cohort_report, cohort_report
+from .services.practice_tests import PracticeTestError, build_mock_test, build_practice_test, grade_practice_test
+from .services.pyq_search import fts5_query, search_questions
+from .services.batch_assignment import BatchCapacityError, assign_students_to_batch
+from .services.test_series_enrollment import EnrollmentImportError, enroll_students, import_enrollments
+
+
+class MentorDashboardQueryBudgetTests(TestCase):
+    """mentor_dashboard must not issue per-student queries"""
+
+    QUERY_BUDGET = 25
+
+    def setUp(self):
+        cache.clear()
+        self.mentor_user = User.objects.create_user(username='mentor', password='pass')
+        self.mentor = Mentor.objects.create(
+            name='Mentor', qualification='MBBS', user=self.mentor_user
+        )
+        profile = self.mentor_user.studentprofile
+        profile.user_type = 'mentor'
+        profile.mentor = self.mentor
+        profile.save()
+
+        self.series = [
+            TestSeries.objects.create(series_name=f'Series {i}', series_code=f'TS{i}')
+            for i in range(3)
+        ]
+        self.client.force_login(self.mentor_user)
+
+    def add_students(self, count):
+        # bulk_create skips the post_save signal, so profiles are created here
+        start = User.objects.count()
+        users = User.objects.bulk_create([
+            User(username=f'student_{start + i}') for i in range(count)
+        ])
+        StudentProfile.objects.bulk_create([
+            StudentProfile(user=user, user_type='student', mentor=self.mentor)
+            for user in users
+        ])
+        StudentProgress.objects.bulk_create([
+            StudentProgress(student=user, overall_preparation=40 + i % 50)
+            for i, user in enumerate(users)
+        ])
+        StudentTestSeries.objects.bulk_create([
+            StudentTestSeries(student=user, test_series=series)
+            for user in users
+            for series in self.series
+        ])
+
+    def count_dashboard_queries(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('mentor_dashboard'))
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries), response
+
+    def test_query_count_is_constant(self):
+        # First request creates the MentorProfile; keep it out of the budget
+        self.count_dashboard_queries()
+        counts = []
+        total = 0
+        for size in (10, 100, 1000):
+            self.add_students(size - total)
+            total = size
+            num_queries, response = self.count_dashboard_queries()
+            self.assertEqual(response.context['total_students'], size)
+            self.assertEqual(response.context['tests_assigned'], size * len(self.series))
+            counts.append(num_queries)
+
+        self.assertLessEqual(max(counts), self.QUERY_BUDGET)
+        self.assertEqual(len(set(counts)), 1, f"Query count grew with students: {counts}")
+
+    def test_test_series_display(self):
+        self.add_students(1)
+        _, response = self.count_dashboard_queries()
+        student = response.context['students'][0]
+        self.assertEqual(student.test_series_display, 'Series 0, Series 1 (+1 more)')
+        self.assertEqual(student.overall_preparation, 40)
+
+
+class DebugSamplingTests(TestCase):
+    """DEBUG diagnostics are only emitted for sampled requests"""
+
+    def make_record(self, level):
+        return logging.LogRecord('dashboard.views', level, __file__, 1, 'msg', None, None)
+
+    def test_debug_dropped_when_not_sampled(self):
+        log_filter = DebugSampleFilter()
+        self.assertFalse(log_filter.filter(self.make_record(logging.DEBUG)))
+        self.assertTrue(log_filter.filter(self.make_record(logging.INFO)))
+
+    def test_debug_user_is_sampled(self):
+        seen = []
+
+        def get_response(request):
+            seen.append(is_debug_sampled())
+
+        with self.settings(DIAGNOSTICS_DEBUG_USERS=['tracer']):
+            middleware = DebugSamplingMiddleware(get_response)
+        request = RequestFactory().get('/')
+        request.user = User.objects.create_user(username='tracer', password='pass')
+        middleware(request)
+
+        self.assertEqual(seen, [True])
+        self.assertFalse(is_debug_sampled())
+
+
+class NoticeTargetingTests(TestCase):
+    """Notice targeting is resolved in SQL"""
+
+    def setUp(self):
+        mentor_user = User.objects.create_user(username='mentor', password='pass')
+        self.mentor = Mentor.objects.create(name='Mentor', qualification='MBBS', user=mentor_user)
+        self.batch = Batch.objects.create(
+            batch_name='Batch A', batch_code='BA', mentor=self.mentor,
+            start_date='2025-01-01', end_date='2025-12-31'
+        )
+        other_batch = Batch.objects.create(
+            batch_name='Batch B', batch_code='BB', mentor=self.mentor,
+            start_date='2025-01-01', end_date='2025-12-31'
+        )
+        self.student = User.objects.create_user(username='student', password='pass')
+        self.profile = self.student.studentprofile
+        self.profile.mentor = self.mentor
+        self.profile.batch_enrolled = 'Batch A'
+        self.profile.save()
+        other_student = User.objects.create_user(username='other', password='pass')
+
+        self.expected = {
+            Notice.objects.create(mentor=self.mentor, title='all', message='m').id,
+            Notice.objects.create(mentor=self.mentor, title='batch', message='m',
+                                  recipient_type='batch', specific_batch=self.batch).id,
+            Notice.objects.create(mentor=self.mentor, title='me', message='m',
+                                  recipient_type='student', specific_student=self.student).id,
+        }
+        Notice.objects.create(mentor=self.mentor, title='other batch', message='m',
+                              recipient_type='batch', specific_batch=other_batch)
+        Notice.objects.create(mentor=self.mentor, title='other student', message='m',
+                              recipient_type='student', specific_student=other_student)
+        Notice.objects.create(mentor=self.mentor, title='inactive', message='m', is_active=False)
+
+    def test_targeting(self):
+        notices = self.profile.get_mentor_notices()
+        self.assertEqual({notice.id for notice in notices}, self.expected)
+
+    def test_top_notices_and_count_are_constant_queries(self):
+        Notice.objects.bulk_create([
+            Notice(mentor=self.mentor, title=f'bulk {i}', message='m',
+                   recipient_type='batch', specific_batch=self.batch)
+            for i in range(50)
+        ])
+        with self.assertNumQueries(2):
+            notices = self.profile.get_mentor_notices()
+            top = [(n.title, n.mentor.name, n.specific_batch and n.specific_batch.batch_name)
+                   for n in notices[:3]]
+            count = notices.count()
+        self.assertEqual(len(top), 3)
+        self.assertEqual(count, 53)
+
+    def test_unread_counter_tracks_new_and_read_notices(self):
+        self.assertEqual(self.profile.get_unread_notices_count(), 3)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(self.profile.get_unread_notices_count(), 3)
+
+        notice = Notice.objects.create(mentor=self.mentor, title='new', message='m')
+        Notice.objects.create(mentor=self.mentor, title='not mine', message='m',
+                              recipient_type='batch', specific_batch=Batch.objects.get(batch_code='BB'))
+        self.assertEqual(self.profile.get_unread_notices_count(), 4)
+
+        notice.mark_as_read(self.student)
+        notice.mark_as_read(self.student)
+        self.assertEqual(self.profile.get_unread_notices_count(), 3)
+
+    def test_mark_all_notices_read(self):
+        self.assertEqual(self.profile.get_unread_notices_count(), 3)
+        self.assertEqual(self.profile.mark_all_notices_read(), 3)
+        self.assertEqual(self.profile.get_unread_notices_count(), 0)
+        self.assertEqual(self.student.read_notices.count(), 3)
+        self.assertEqual(self.profile.mark_all_notices_read(), 0)
+
+    def test_student_dashboard_badge(self):
+        self.client.force_login(self.student)
+        response = self.client.get(reverse('dashboard'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['unread_notices_count'], 3)
+
+        response = self.client.post(reverse('mark_all_notices_read'))
+        self.assertEqual(response.json()['marked'], 3)
+        response = self.client.get(reverse('dashboard'))
+        self.assertEqual(response.context['unread_notices_count'], 0)
+        self.assertTrue(all(notice.is_read for notice in response.context['notices']))
+
+    def test_mark_read_requires_csrf_token(self):
+        client = Client(enforce_csrf_checks=True)
+        client.force_login(self.student)
+        notice_id = next(iter(self.expected))
+        url = reverse('mark_notice_read', args=[notice_id])
+        self.assertEqual(client.post(url).status_code, 403)
+        self.assertEqual(client.post(reverse('mark_all_notices_read')).status_code, 403)
+
+        token = client.get(reverse('dashboard')).context['csrf_token']
+        response = client.post(url, HTTP_X_CSRFTOKEN=str(token))
+        self.assertEqual(response.json()['unread_count'], 2)
+
+    def test_login_keeps_unread_counter(self):
+        self.assertEqual(self.profile.get_unread_notices_count(), 3)
+        self.assertTrue(self.client.login(username='student', password='pass'))
+        self.assertTrue(NoticeUnreadCounter.objects.filter(user=self.student).exists())
+
+        self.profile.batch_enrolled = 'Batch C'
+        self.profile.save()
+        self.assertFalse(NoticeUnreadCounter.objects.filter(user=self.student).exists())
+        self.assertEqual(self.profile.get_unread_notices_count(), 2)
+
+
+class BatchAssignmentTests(TestCase):
+    """assign_students_to_batch works in bulk and respects max_students"""
+
+    def setUp(self):
+        mentor_user = User.objects.create_user(username='mentor', password='pass')
+        self.mentor = Mentor.objects.create(name='Mentor', qualification='MBBS', user=mentor_user)
+        self.batch_a = Batch.objects.create(
+            batch_name='Batch A', batch_code='BA', mentor=self.mentor,
+            start_date='2025-01-01', end_date='2025-12-31', max_students=1000
+        )
+        self.batch_b = Batch.objects.create(
+            batch_name='Batch B', batch_code='BB', mentor=self.mentor,
+            start_date='2025-01-01', end_date='2025-12-31', max_students=5
+        )
+        users = User.objects.bulk_create([User(username=f'student_{i}') for i in range(500)])
+        StudentProfile.objects.bulk_create([
+            StudentProfile(user=user, user_type='student', mentor=self.mentor) for user in users
+        ])
+        self.user_ids = [user.id for user in users]
+
+    def test_bulk_assignment_uses_constant_queries(self):
+        with CaptureQueriesContext(connection) as small:
+            assign_students_to_batch(self.batch_a.id, self.mentor, self.user_ids[:10])
+        with CaptureQueriesContext(connection) as large:
+            result = assign_students_to_batch(
+                self.batch_a.id, self.mentor, ','.join(map(str, self.user_ids)) + ',999999,abc'
+            )
+
+        # SQLite splits large bulk statements by parameter limit, so allow a little slack
+        self.assertLessEqual(len(large.captured_queries), len(small.captured_queries) + 5)
+        self.assertEqual(result['assigned'], 500)
+        self.assertEqual(result['skipped'], [999999])
+        self.assertEqual(result['batch'].current_students, 500)
+        self.assertEqual(StudentBatch.objects.filter(batch=self.batch_a).count(), 500)
+        self.assertEqual(
+            StudentProfile.objects.filter(batch_enrolled='Batch A').count(), 500
+        )
+
+    def test_moving_students_recounts_both_batches(self):
+        assign_students_to_batch(self.batch_a.id, self.mentor, self.user_ids[:10])
+        assign_students_to_batch(self.batch_b.id, self.mentor, self.user_ids[:3])
+
+        self.batch_a.refresh_from_db()
+        self.batch_b.refresh_from_db()
+        self.assertEqual(self.batch_a.current_students, 7)
+        self.assertEqual(self.batch_b.current_students, 3)
+
+    def test_capacity_is_enforced(self):
+        with self.assertRaises(BatchCapacityError):
+            assign_students_to_batch(self.batch_b.id, self.mentor, self.user_ids[:6])
+        self.assertFalse(StudentBatch.objects.filter(batch=self.batch_b).exists())
+
+        result = assign_students_to_batch(self.batch_b.id, self.mentor, self.user_ids[:5])
+        self.assertTrue(result['batch'].is_full())
+
+
+class TestSeriesEnrollmentTests(TestCase):
+    """enroll_students inserts only missing enrollments"""
+
+    def setUp(self):
+        mentor_user = User.objects.create_user(username='mentor', password='pass')
+        self.mentor = Mentor.objects.create(name='Mentor', qualification='MBBS', user=mentor_user)
+        self.series = TestSeries.objects.create(series_name='Mock', series_code='MOCK')
+        users = User.objects.bulk_create([
+            User(username=f'student_{i}', email=f'student_{i}@example.com') for i in range(300)
+        ])
+        StudentProfile.objects.bulk_create([
+            StudentProfile(user=user, user_type='student', mentor=self.mentor) for user in users
+        ])
+        self.user_ids = [user.id for user in users]
+
+    def test_counts_inserted_reactivated_and_skipped(self):
+        StudentTestSeries.objects.create(student_id=self.user_ids[0], test_series=self.series)
+        StudentTestSeries.objects.create(student_id=self.user_ids[1], test_series=self.series, is_active=False)
+
+        with CaptureQueriesContext(connection) as ctx:
+            result = enroll_students(self.series, self.mentor, self.user_ids + [999999])
+
+        self.assertLess(len(ctx.captured_queries), 10)
+        self.assertEqual(result['inserted'], 298)
+        self.assertEqual(result['reactivated'], 1)
+        self.assertEqual(result['skipped'], 1)
+        self.assertEqual(result['not_found'], [999999])
+        self.assertEqual(
+            StudentTestSeries.objects.filter(test_series=self.series, is_active=True).count(), 300
+        )
+
+    def test_csv_and_json_import(self):
+        rows = '\n'.join(['username'] + [f'student_{i}' for i in range(100)])
+        result = import_enrollments(self.series, self.mentor, SimpleUploadedFile('students.csv', rows.encode()))
+        self.assertEqual(result['inserted'], 100)
+
+        payload = json.dumps([{'email': f'student_{i}@example.com'} for i in range(50, 150)])
+        result = import_enrollments(self.series, self.mentor, SimpleUploadedFile('students.json', payload.encode()))
+        self.assertEqual(result['inserted'], 50)
+        self.assertEqual(result['skipped'], 50)
+
+    def test_rejects_unknown_format(self):
+        with self.assertRaises(EnrollmentImportError):
+            import_enrollments(self.series, self.mentor, SimpleUploadedFile('students.txt', b'1,2'))
+
+
+class CalendarFeedTests(TestCase):
+    """iCalendar feed with conditional GET"""
+
+    def setUp(self):
+        cache.clear()
+        self.student = User.objects.create_user(username='student', first_name='Asha')
+        self.mentor = MentorProfile.objects.create(user=User.objects.create_user(username='mentor'))
+        self.start = timezone.now() + timedelta(days=1)
+        self.url = reverse('calendar_feed', args=[feed_token('student', self.student.id)])
+
+    def make_call(self, start):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Call.objects.create(
+                student=self.student, mentor=self.mentor, call_type='normal',
+                start_time=start, end_time=start + timedelta(minutes=20)
+            )
+
+    def test_feed_and_not_modified(self):
+        call = self.make_call(self.start)
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/calendar; charset=utf-8')
+        body = b''.join(response.streaming_content).decode()
+        self.assertIn(f'UID:call-{call.id}@nirvant\r\n', body)
+        self.assertIn('SUMMARY:Normal call with mentor\r\n', body)
+        self.assertTrue(body.endswith('END:VCALENDAR\r\n'))
+
+        # One aggregate query, shared by the ETag and Last-Modified checks
+        with self.assertNumQueries(1):
+            cached = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(cached.status_code, 304)
+
+        self.make_call(self.start + timedelta(days=1))
+        changed = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(changed.status_code, 200)
+        self.assertEqual(b''.join(changed.streaming_content).decode().count('BEGIN:VEVENT'), 2)
+
+        call.status = 'completed'
+        call.save()
+        edited = self.client.get(self.url, HTTP_IF_NONE_MATCH=changed['ETag'])
+        self.assertEqual(edited.status_code, 200)
+
+        call.delete()
+        deleted = self.client.get(self.url, HTTP_IF_NONE_MATCH=edited['ETag'])
+        self.assertEqual(deleted.status_code, 200)
+        self.assertEqual(b''.join(deleted.streaming_content).decode().count('BEGIN:VEVENT'), 1)
+
+    def test_etag_does_not_depend_on_the_cache(self):
+        self.make_call(self.start)
+        etag = self.client.get(self.url)['ETag']
+        cache.clear()
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_forged_token_is_404(self):
+        response = self.client.get(reverse('calendar_feed', args=[f'mentor:{self.mentor.id}:forged']))
+        self.assertEqual(response.status_code, 404)
+
+    def test_long_lines_are_folded(self):
+        from scheduler.services.ical import _fold
+
+        line = 'SUMMARY:' + 'é' * 80
+        folded = _fold(line)
+        chunks = folded.split('\r\n')[:-1]
+        self.assertTrue(all(len(chunk.encode()) <= 75 for chunk in chunks))
+        self.assertEqual(''.join(c[1:] if i else c for i, c in enumerate(chunks)), line)
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class PdfDeliveryTests(TestCase):
+    """Range/conditional PDF delivery and cached permission checks"""
+
+    CONTENT = b'%PDF-1.4 0123456789 %%EOF'
+
+    def setUp(self):
+        cache.clear()
+        self.mentor = User.objects.create_user(username='mentor', password='pass')
+        profile = self.mentor.studentprofile
+        profile.user_type = 'mentor'
+        profile.save()
+        self.student = User.objects.create_user(username='student', password='pass')
+        profile = self.student.studentprofile
+        profile.user_type = 'student'
+        profile.save()
+
+        self.pdf = PYQPDF.objects.create(
+            subject='Physics', year='2024', title='Physics 2024',
+            pdf_file=SimpleUploadedFile('p.pdf', self.CONTENT, content_type='application/pdf'),
+            uploaded_by=self.mentor,
+        )
+        self.url = reverse('view_pdf', args=[self.pdf.id])
+        self.client.login(username='student', password='pass')
+
+    def test_full_and_range_requests(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), self.CONTENT)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(response['Content-Length'], str(len(self.CONTENT)))
+
+        partial = self.client.get(self.url, HTTP_RANGE='bytes=9-12')
+        self.assertEqual(partial.status_code, 206)
+        self.assertEqual(b''.join(partial.streaming_content), b'0123')
+        self.assertEqual(partial['Content-Range'], f'bytes 9-12/{len(self.CONTENT)}')
+
+        suffix = self.client.get(self.url, HTTP_RANGE='bytes=-5')
+        self.assertEqual(b''.join(suffix.streaming_content), b'%%EOF')
+
+        stale = self.client.get(self.url, HTTP_RANGE='bytes=9-12', HTTP_IF_RANGE='"stale"')
+        self.assertEqual(stale.status_code, 200)
+
+        self.assertEqual(self.client.get(self.url, HTTP_RANGE='bytes=500-').status_code, 416)
+
+    def test_conditional_get(self):
+        response = self.client.get(self.url)
+        self.assertEqual(
+            self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304
+        )
+        self.assertEqual(
+            self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']).status_code, 304
+        )
+
+    def test_permissions_are_cached_and_invalidated(self):
+        from .services.file_delivery import pdf_access
+
+        self.assertIsNotNone(pdf_access(self.student, self.pdf.id))
+        with self.assertNumQueries(0):
+            self.assertIsNotNone(pdf_access(self.student, self.pdf.id))
+
+        other_mentor = User.objects.create_user(username='other')
+        profile = other_mentor.studentprofile
+        profile.user_type = 'mentor'
+        profile.save()
+        self.assertIsNone(pdf_access(other_mentor, self.pdf.id))
+        self.assertIsNotNone(pdf_access(self.mentor, self.pdf.id))
+
+        self.pdf.is_active = False
+        self.pdf.save()
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+    @override_settings(FILE_DELIVERY_OFFLOAD='x-accel-redirect', FILE_DELIVERY_ACCEL_PREFIX='/protected/')
+    def test_proxy_offload(self):
+        response = self.client.get(reverse('download_pdf', args=[self.pdf.id]))
+        self.assertEqual(response['X-Accel-Redirect'], f'/protected/{self.pdf.pdf_file.name}')
+        self.assertIn('attachment', response['Content-Disposition'])
+        self.assertEqual(response.content, b'')
+
+
+class PdfUploadMixin:
+    def setUp(self):
+        self.mentor = User.objects.create_user(username='mentor', password='pass')
+        profile = self.mentor.studentprofile
+        profile.user_type = 'mentor'
+        profile.save()
+        self.client.login(username='mentor', password='pass')
+
+    def make_pdf(self, pages):
+        from pypdf import PdfWriter
+
+        writer = PdfWriter()
+        for _ in range(pages):
+            writer.add_blank_page(width=200, height=200)
+        out = io.BytesIO()
+        writer.write(out)
+        return out.getvalue()
+
+    def upload(self, content):
+        return self.client.post(reverse('upload_pyqs'), {
+            'action': 'upload_pdf', 'subject': 'Physics', 'year': '2024', 'title': 'Paper',
+            'pages': '1', 'questions': '180',
+            'pdf_file': SimpleUploadedFile('paper.pdf', content, content_type='application/pdf'),
+        })
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(), PDF_INGESTION_WORKER=True)
+class PdfIngestionTests(PdfUploadMixin, TestCase):
+    """Upload queues a job; the worker fills in the real PDF metadata"""
+
+    def test_upload_is_processed_by_worker(self):
+        content = self.make_pdf(3)
+        self.upload(content)
+
+        pdf = PYQPDF.objects.get()
+        self.assertEqual((pdf.processing_status, pdf.pages), ('pending', 1))
+        self.assertEqual(PDFIngestionJob.objects.filter(pdf=pdf, status='queued').count(), 1)
+
+        call_command('run_ingestion_worker', '--once', stdout=io.StringIO())
+
+        pdf.refresh_from_db()
+        self.assertEqual((pdf.processing_status, pdf.pages), ('ready', 3))
+        self.assertEqual(PDFIngestionJob.objects.get().status, 'done')
+
+    def test_unreadable_pdf_fails_without_retry(self):
+        self.upload(b'not really a pdf')
+
+        call_command('run_ingestion_worker', '--once', stdout=io.StringIO())
+
+        job = PDFIngestionJob.objects.get()
+        self.assertEqual((job.status, job.attempts), ('failed', 1))
+        self.assertEqual(job.pdf.processing_status, 'failed')
+
+    def test_job_is_claimed_once(self):
+        from .services.pdf_ingestion import claim_job
+
+        self.upload(self.make_pdf(1))
+        self.assertIsNotNone(claim_job('worker-1'))
+        self.assertIsNone(claim_job('worker-2'))
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(), PDF_INGESTION_WORKER=False)
+class BackgroundIngestionTests(PdfUploadMixin, TransactionTestCase):
+    """Without a worker, uploads are processed off the request thread"""
+
+    def test_upload_is_processed_after_the_response(self):
+        from .services.pdf_ingestion import background_executor
+
+        self.upload(self.make_pdf(2))
+        # The single ingestion thread runs jobs in order
+        background_executor().submit(lambda: None).result(timeout=60)
+
+        pdf = PYQPDF.objects.get()
+        self.assertEqual((pdf.processing_status, pdf.pages), ('ready', 2))
+        self.assertEqual(PDFIngestionJob.objects.get().status, 'done')
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class ContentAddressedStorageTests(TestCase):
+    """Deduplicated, reference-counted PDF and attachment storage"""
+
+    CONTENT = b'%PDF-1.4 same paper %%EOF'
+
+    def setUp(self):
+        self.mentor = User.objects.create_user(username='mentor')
+
+    def make_pdf(self, content=CONTENT, name='paper.pdf'):
+        return PYQPDF.objects.create(
+            subject='Physics', year='2024', title='Paper', uploaded_by=self.mentor,
+            pdf_file=SimpleUploadedFile(name, content, content_type='application/pdf'),
+        )
+
+    def test_duplicates_share_one_blob(self):
+        first = self.make_pdf()
+        second = self.make_pdf(name='copy-of-paper.PDF')
+
+        digest = hashlib.sha256(self.CONTENT).hexdigest()
+        self.assertEqual(first.pdf_file.name, f'blobs/{digest[:2]}/{digest[2:4]}/{digest}.pdf')
+        self.assertEqual(second.pdf_file.name, first.pdf_file.name)
+        self.assertEqual(StoredBlob.objects.get(name=first.pdf_file.name).refcount, 2)
+        with first.pdf_file.open('rb') as f:
+            self.assertEqual(f.read(), self.CONTENT)
+
+    def test_blob_deleted_with_last_reference(self):
+        first = self.make_pdf()
+        second = self.make_pdf()
+        path = first.pdf_file.path
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertTrue(os.path.exists(path))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            PYQPDF.objects.get(pk=second.pk).delete()
+        self.assertFalse(os.path.exists(path))
+        self.assertFalse(StoredBlob.objects.exists())
+
+    def test_reupload_before_pending_delete_keeps_file(self):
+        first = self.make_pdf()
+        path = first.pdf_file.path
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            first.delete()
+        second = self.make_pdf()
+        for callback in callbacks:
+            callback()
+
+        self.assertTrue(os.path.exists(path))
+        self.assertEqual(StoredBlob.objects.get(name=second.pdf_file.name).refcount, 1)
+
+    def test_failed_upload_does_not_leak_its_reference(self):
+        first = self.make_pdf()
+        # The blob is stored and counted, then the INSERT fails and rolls back
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            PYQPDF.objects.create(
+                subject='Physics', year='2024', title=None, uploaded_by=self.mentor,
+                pdf_file=SimpleUploadedFile('paper.pdf', self.CONTENT),
+            )
+
+        # A plain-name reference must still be counted
+        copy = PYQPDF.objects.create(
+            subject='Physics', year='2024', title='Copy', uploaded_by=self.mentor, pdf_file=first.pdf_file.name,
+        )
+        self.assertEqual(StoredBlob.objects.get(name=first.pdf_file.name).refcount, 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertTrue(os.path.exists(copy.pdf_file.path))
+
+    def test_replacing_attachment_releases_old_blob(self):
+        mentor = Mentor.objects.create(name='Mentor', qualification='MBBS', user=self.mentor)
+        message = StudentMessage.objects.create(
+            student=User.objects.create_user(username='student'), mentor=mentor,
+            subject='Doubt', message='Q12',
+            attachment=SimpleUploadedFile('a.png', b'old image'),
+        )
+        old_name = message.attachment.name
+
+        message = StudentMessage.objects.get(pk=message.pk)
+        message.attachment = SimpleUploadedFile('b.png', b'new image')
+        with self.captureOnCommitCallbacks(execute=True):
+            message.save()
+
+        self.assertFalse(StoredBlob.objects.filter(name=old_name).exists())
+        self.assertFalse(message.attachment.storage.exists(old_name))
+        self.assertEqual(StoredBlob.objects.get(name=message.attachment.name).refcount, 1)
+
+
+class PyqSearchTests(TestCase):
+    """Ranked, filtered full-text search over PYQQuestion"""
+
+    def setUp(self):
+        self.student = User.objects.create_user(username='student', password='pw')
+        StudentProfile.objects.filter(user=self.student).update(user_type='student')
+
+    def make_question(self, number, text, subject='Physics', year='2023', topic='Optics', **kwargs):
+        defaults = dict(option_a='one', option_b='two', option_c='three', option_d='four', correct_answer='A')
+        defaults.update(kwargs)
+        return PYQQuestion.objects.create(
+            subject=subject, year=year, topic=topic, question_number=number, question_text=text, **defaults
+        )
+
+    def test_ranked_match_and_filters(self):
+        lens = self.make_question(1, 'A convex lens forms a real image of an object')
+        mention = self.make_question(2, 'Which mirror is used', explanation='Unlike a lens, a mirror reflects')
+        self.make_question(3, 'Convex lens power', subject='Physics', year='2019')
+        self.make_question(4, 'Enzymes are proteins', subject='Biology', topic='Biomolecules')
+
+        results = list(search_questions('lens'))
+        self.assertEqual(len(results), 3)
+        # A hit in the question outranks one in the explanation
+        self.assertEqual(results[-1], mention)
+
+        self.assertEqual(list(search_questions('lens', year='2023', topic='Optics')), [lens, mention])
+        self.assertEqual(list(search_questions('lens', subject='Biology')), [])
+
+    def test_index_follows_updates_and_deletes(self):
+        question = self.make_question(1, 'Refraction through a prism')
+        question.question_text = 'Dispersion of white light'
+        question.save()
+        self.assertEqual(list(search_questions('prism')), [])
+        self.assertEqual(list(search_questions('dispers')), [question])
+
+        question.delete()
+        self.assertEqual(list(search_questions('dispersion')), [])
+
+    def test_user_input_is_not_query_syntax(self):
+        self.assertEqual(fts5_query('lens" OR NEAR(*'), '"lens" "OR" "NEAR"*')
+        self.assertIsNone(fts5_query('  "*" '))
+        self.make_question(1, 'Lens maker formula')
+        self.assertEqual(len(search_questions('lens" (')), 1)
+
+    def test_view_paginates(self):
+        for number in range(1, 6):
+            self.make_question(number, f'Thin lens problem {number}')
+        self.client.login(username='student', password='pw')
+
+        response = self.client.get(reverse('search_pyq_questions'), {'q': 'lens', 'page_size': 2, 'page': 3})
+        data = response.json()
+        self.assertEqual(data['count'], 5)
+        self.assertEqual(data['num_pages'], 3)
+        self.assertEqual(len(data['results']), 1)
+        self.assertFalse(data['has_next'])
+
+
+class PracticeTestTests(TestCase):
+    """Practice tests sampled from in-memory PYQQuestion id pools"""
+
+    def setUp(self):
+        cache.clear()  # bulk_create below sends no signals to bump the pool version
+        self.student = User.objects.create_user(username='student', password='pw')
+        StudentProgress.objects.create(student=self.student)
+        PYQQuestion.objects.bulk_create([
+            PYQQuestion(
+                subject=subject, year='2022', topic=topic, question_number=number,
+                question_text=f'{subject} question {number}', option_a='a', option_b='b',
+                option_c='c', option_d='d', correct_answer='A', difficulty=difficulty,
+            )
+            for subject, topic in (('Physics', 'Optics'), ('Biology', 'Genetics'))
+            for number, difficulty in enumerate(['Easy', 'Hard'] * 5, start=1)
+        ])
+
+    def test_sampling_uses_pools_not_random_ordering(self):
+        build_practice_test(self.student, 1)  # warm the pools
+        with CaptureQueriesContext(connection) as ctx:
+            questions, token = build_practice_test(self.student, 4, subject='Physics', difficulty='Hard')
+        # only the questions themselves: the pool version is in the cache
+        self.assertEqual(len(ctx.captured_queries), 1)
+        self.assertFalse(any('RANDOM' in query['sql'].upper() for query in ctx.captured_queries))
+        self.assertEqual(len({q.id for q in questions}), 4)
+        self.assertTrue(all(q.subject == 'Physics' and q.difficulty == 'Hard' for q in questions))
+
+        with self.assertRaises(PracticeTestError):
+            build_practice_test(self.student, 5, subject='Chemistry')
+
+    def test_question_changes_reload_pools(self):
+        build_practice_test(self.student, 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            question = PYQQuestion.objects.create(
+                subject='Chemistry', year='2021', topic='Biomolecules', question_number=1,
+                question_text='Chemistry question', option_a='a', option_b='b', option_c='c',
+                option_d='d', correct_answer='B',
+            )
+        questions, _ = build_practice_test(self.student, 5, subject='Chemistry')
+        self.assertEqual(len(questions), 1)
+
+        question.difficulty = 'Hard'
+        with self.captureOnCommitCallbacks(execute=True):
+            question.save()
+        questions, _ = build_practice_test(self.student, 5, subject='Chemistry', difficulty='Hard')
+        self.assertEqual([q.id for q in questions], [question.id])
+
+    def test_grading_writes_score_once(self):
+        questions, token = build_mock_test(self.student, {'Physics': 3, 'Biology': 2})
+        self.assertEqual([q.subject for q in questions], ['Physics'] * 3 + ['Biology'] * 2)
+        answers = {questions[0].id: 'A', questions[1].id: 'a', questions[2].id: 'C'}
+
+        test_score, summary = grade_practice_test(self.student, token, answers)
+        self.assertEqual(summary, {'correct': 2, 'wrong': 1, 'unanswered': 2})
+        self.assertEqual((test_score.score, test_score.max_marks), (7, 20))
+        self.assertEqual(test_score.subject, 'Full Mock')
+        self.assertEqual(StudentProgress.objects.get(student=self.student).total_tests_taken, 1)
+
+        with self.assertRaises(PracticeTestError):
+            grade_practice_test(self.student, token, answers)
+        with self.assertRaises(PracticeTestError):
+            grade_practice_test(self.student, token[:-2] + 'xx', answers)
+        self.assertEqual(TestScore.objects.filter(student=self.student).count(), 1)
+
+    def test_negative_marking_does_not_go_below_zero_percent(self):
+        questions, token = build_practice_test(self.student, 3, subject='Physics')
+        test_score, _ = grade_practice_test(self.student, token, {q.id: 'D' for q in questions})
+        self.assertEqual((test_score.score, test_score.percentage), (-3, 0))
+        self.assertEqual(StudentProgress.objects.get(student=self.student).overall_preparation, 0)
+
+    def test_token_is_bound_to_student(self):
+        questions, token = build_practice_test(self.student, 2)
+        other = User.objects.create_user(username='other')
+        with self.assertRaises(PracticeTestError):
+            grade_practice_test(other, token, {questions[0].id: 'A'})
+        self.assertFalse(TestScore.objects.exists())
+
+    def test_view_generates_and_grades(self):
+        self.client.login(username='student', password='pw')
+        response = self.client.post(reverse('practice_test'), {
+            'action': 'generate', 'subject': 'Biology', 'topic': ['Genetics'], 'count': 3,
+        })
+        questions = response.context['questions']
+        self.assertEqual(len(questions), 3)
+
+        data = {'action': 'submit', 'token': response.context['token']}
+        data.update({f'q_{q.id}': 'A' for q in questions})
+        response = self.client.post(reverse('practice_test'), data)
+        self.assertRedirects(response, reverse('progress'), fetch_redirect_response=False)
+        self.assertEqual(TestScore.objects.get(student=self.student).score, 12)
+
+
+class StudentProgressAggregateTests(TestCase):
+    """StudentProgress derived from study logs, test scores and subject progress"""
+
+    def setUp(self):
+        self.student = User.objects.create_user(username='student', password='pw')
+        self.progress = StudentProgress.objects.create(student=self.student)
+        self.today = timezone.localdate()
+
+    def current(self):
+        return StudentProgress.objects.get(pk=self.progress.pk)
+
+    def add_score(self, percentage):
+        return TestScore.objects.create(
+            student=self.student, subject='Physics', test_name='Unit test', score=int(percentage),
+            max_marks=100, date_taken=self.today, percentage=percentage,
+        )
+
+    def test_overwriting_todays_log_applies_the_difference(self):
+        log = StudyLog.objects.create(student=self.student, date=self.today, study_hours=2.5)
+        log.study_hours = 3
+        log.save()
+        StudyLog.objects.create(student=self.student, date=self.today - timedelta(days=1), study_hours=1.5)
+        self.assertEqual(self.current().total_study_hours, 4.5)
+
+        StudyLog.objects.get(pk=log.pk).delete()
+        self.assertEqual(self.current().total_study_hours, 1.5)
+
+    def test_scores_and_subjects_drive_overall_preparation(self):
+        first = self.add_score(60)
+        self.add_score(80)
+        self.assertEqual((self.current().total_tests_taken, self.current().overall_preparation), (2, 70))
+
+        SubjectProgress.objects.create(student=self.student, subject='Physics', progress_percentage=50)
+        self.assertEqual(self.current().overall_preparation, 60)
+
+        first.delete()
+        self.assertEqual((self.current().total_tests_taken, self.current().overall_preparation), (1, 65))
+
+    def test_recompute_repairs_bulk_writes(self):
+        StudyLog.objects.bulk_create([
+            StudyLog(student=self.student, date=self.today - timedelta(days=i), study_hours=2)
+            for i in range(3)
+        ])
+        StudentProgress.objects.filter(pk=self.progress.pk).update(total_tests_taken=9, overall_preparation=68)
+        other = User.objects.create_user(username='other')
+        StudentProfile.objects.filter(user=other).update(user_type='student')
+
+        with self.assertNumQueries(3):
+            call_command('recompute_student_progress', stdout=io.StringIO())
+
+        progress = self.current()
+        self.assertEqual((progress.total_study_hours, progress.total_tests_taken, progress.overall_preparation), (6, 0, 0))
+        self.assertTrue(StudentProgress.objects.filter(student=other).exists())
+        self.assertFalse(SubjectProgress.objects.exists())
+
+    def test_first_update_builds_row_from_history(self):
+        self.progress.delete()
+        StudyLog.objects.create(student=self.student, date=self.today - timedelta(days=1), study_hours=2)
+        self.add_score(90)
+        self.client.login(username='student', password='pw')
+
+        self.client.post(reverse('progress'), {'log_hours': '1', 'study_hours': '1.5'})
+        progress = self.client.get(reverse('progress')).context['student_progress']
+        self.assertEqual((progress.total_study_hours, progress.total_tests_taken), (3.5, 1))
+        # Only the test average: no subject progress has been recorded
+        self.assertEqual(progress.overall_preparation, 90)
+        self.assertFalse(SubjectProgress.objects.filter(student=self.student).exists())
+
+
+class CohortAnalyticsTests(TestCase):
+    """Vectorized cohort report for a mentor's students"""
+
+    def setUp(self):
+        cache.clear()
+        self.today = timezone.localdate()
+        self.mentor_user = User.objects.create_user(username='mentor', password='pw')
+        self.mentor = Mentor.objects.create(name='Mentor', qualification='MBBS', user=self.mentor_user)
+        StudentProfile.objects.filter(user=self.mentor_user).update(user_type='mentor', mentor=self.mentor)
+
+        self.students = []
+        for i, (score, hours) in enumerate([(90, 4), (80, 4), (70, 3), (20, 0)]):
+            user = User.objects.create_user(username=f'student{i}', password='pw')
+            StudentProfile.objects.filter(user=user).update(user_type='student', mentor=self.mentor)
+            TestScore.objects.create(
+                student=user, subject='Physics', test_name='Mock', score=score, max_marks=100,
+                date_taken=self.today, percentage=score,
+            )
+            for day in range(1, 40):
+                # The last student stopped studying three weeks ago
+                if hours or day > 21:
+                    StudyLog.objects.create(student=user, date=self.today - timedelta(days=day), study_hours=hours or 5)
+            self.students.append(user)
+        SubjectProgress.objects.create(student=self.students[2], subject='Chemistry', progress_percentage=30)
+
+    def test_report(self):
+        with self.assertNumQueries(5):
+            report = build_cohort_report(self.mentor, today=self.today)
+
+        self.assertEqual(report['student_count'], 4)
+        self.assertEqual(report['score_percentiles']['p50'], 75.0)
+        self.assertEqual(len(report['weekly_hours']), 8)
+        physics = report['subjects'][0]
+        self.assertEqual((physics['subject'], physics['tests'], physics['mean']), ('Physics', 4, 65.0))
+        self.assertEqual(sum(bucket['count'] for bucket in physics['histogram']), 4)
+
+        at_risk = {student['student_id']: student for student in report['at_risk']}
+        self.assertEqual(set(at_risk), {self.students[2].id, self.students[3].id})
+        self.assertEqual(at_risk[self.students[3].id]['reasons'], ['low_score', 'hours_dropping', 'inactive'])
+        self.assertEqual(at_risk[self.students[2].id]['weak_subjects'], ['Chemistry'])
+        self.assertEqual(report['at_risk'][0]['student_id'], self.students[3].id)
+
+    def test_cached_per_mentor(self):
+        cohort_report(self.mentor)
+        with self.assertNumQueries(0):
+            cohort_report(self.mentor)
+
+    def test_new_activity_drops_cached_report(self):
+        self.assertEqual(cohort_report(self.mentor)['subjects'][0]['tests'], 4)
+        with self.captureOnCommitCallbacks(execute=True):
+            TestScore.objects.create(
+                student=self.students[0], subject='Physics', test_name='Retest', score=60, max_marks=100,
+                date_taken=self.today, percentage=60,
+            )
+        self.assertEqual(cohort_report(self.mentor)['subjects'][0]['tests'], 5)
+
+    def test_moving_student_drops_both_reports(self):
+        other_user = User.objects.create_user(username='other', password='pw')
+        other = Mentor.objects.create(name='Other', qualification='MBBS', user=other_user)
+        cohort_report(self.mentor)
+        self.assertEqual(cohort_report(other)['student_count'], 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.login(username='student0', password='pw')
+        self.assertIsNotNone(cache.get(f'cohort-analytics:{self.mentor.id}'))
+
+        profile = StudentProfile.objects.get(user=self.students[0])
+        profile.mentor = other
+        with self.captureOnCommitCallbacks(execute=True):
+            profile.save()
+        self.assertEqual(cohort_report(self.mentor)['student_count'], 3)
+        self.assertEqual(cohort_report(other)['student_count'], 1)
+
+    def test_view_is_mentor_only(self):
+        self.client.login(username='student0', password='pw')
+        self.assertEqual(self.client.get(reverse('mentor_cohort_analytics')).status_code, 403)
+
+        self.client.login(username='mentor', password='pw')
+        response = self.client.get(reverse('mentor_cohort_analytics'))
+        self.assertEqual(response.json()['student_count'], 4)
+
+
+class ProgressPageTests(TestCase):
+    """The progress page GET is read-only with a fixed number of queries"""
+
+    def setUp(self):
+        self.student = User.objects.create_user(username='student', password='pw')
+        self.client.login(username='student', password='pw')
+
+    def test_get_does_not_write(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('progress'))
+        writes = [q['sql'] for q in ctx.captured_queries if not q['sql'].lstrip().upper().startswith('SELECT')]
+        self.assertEqual(writes, [])
+        self.assertFalse(SubjectProgress.objects.exists())
+        self.assertEqual(
+            [(s['name'], s['progress'], s['needs_attention']) for s in response.context['subjects_progress']],
+            [('Physics', 0, ''), ('Chemistry', 0, ''), ('Biology', 0, '')],
+        )
+
+    def test_target_update_keeps_displayed_progress(self):
+        self.client.post(reverse('progress'), {'update_subject_target': '1', 'subject': 'Physics', 'target': '90'})
+
+        physics = self.client.get(reverse('progress')).context['subjects_progress'][0]
+        self.assertEqual((physics['progress'], physics['needs_attention'], physics['weekly_target']), (0, '', 90))
+
+    def test_query_count_is_fixed(self):
+        self.client.post(reverse('progress'), {'log_hours': '1', 'study_hours': '2'})
+        for day in range(1, 6):
+            StudyLog.objects.create(student=self.student, date=timezone.localdate() - timedelta(days=day), study_hours=1)
+
+        # session, user, profile, progress, subjects, weekly logs, today's topics, tests, goals
+        with self.assertNumQueries(9):
+            response = self.client.get(reverse('progress'))
+        self.assertEqual(response.context['today_log'].study_hours, 2)
+        self.assertEqual(response.context['weekly_hours_total'], 5)
+
+
+class TopicCompletionTests(TestCase):
+    """Completed topics stored as rows instead of JSON text"""
+
+    def setUp(self):
+        self.student = User.objects.create_user(username='student', password='pw')
+        self.client.login(username='student', password='pw')
+        self.today = timezone.localdate()
+
+    def test_add_and_remove_topics(self):
+        self.client.post(reverse('progress'), {'add_topic': '1', 'topic': 'Genetics, Ecology, Genetics'})
+        self.client.post(reverse('progress'), {'add_topic': '1', 'topic': 'Ecology, Optics'})
+        self.client.post(reverse('progress'), {'remove_topic': '1', 'topic': 'Ecology'})
+
+        log = StudyLog.objects.get(student=self.student, date=self.today)
+        self.assertEqual(log.topics, ['Genetics', 'Optics'])
+        self.assertEqual(self.client.get(reverse('progress')).context['today_topics'], ['Genetics', 'Optics'])
+
+    def test_students_per_topic_in_sql(self):
+        other = User.objects.create_user(username='other')
+        for user, day, topics in [
+            (self.student, 0, ['Genetics', 'Optics']),
+            (self.student, 1, ['Genetics']),
+            (other, 2, ['Genetics']),
+            (other, 10, ['Optics']),
+        ]:
+            log = StudyLog.objects.create(student=user, date=self.today - timedelta(days=day))
+            TopicCompletion.add_to_log(log, topics)
+
+        with self.assertNumQueries(1):
+            counts = TopicCompletion.students_per_topic(self.today - timedelta(days=6))
+        self.assertEqual(counts, {'Genetics': 2, 'Optics': 1})
+
+    def test_backfill_parses_legacy_values(self):
+        from importlib import import_module
+        migration = import_module('dashboard.migrations.0024_topic_completions')
+
+        self.assertEqual(migration._parse_topics('["Genetics", " Optics ", "", "Genetics"]'), ['Genetics', 'Optics'])
+        self.assertEqual(migration._parse_topics('Genetics, Ecology'), ['Genetics', 'Ecology'])
+        self.assertEqual(migration._parse_topics(None), [])
+
+
+class ViewProfilingTests(TestCase):
+    """Per-view query, DB, template and latency metrics"""
+
+    def setUp(self):
+        reset_view_stats()
+        self.mentor_user = User.objects.create_user(username='mentor', password='pw')
+        mentor = Mentor.objects.create(name='Mentor', qualification='MBBS', user=self.mentor_user)
+        StudentProfile.objects.filter(user=self.mentor_user).update(user_type='mentor', mentor=mentor)
+        for i in range(3):
+            student = User.objects.create_user(username=f'student{i}')
+            StudentProfile.objects.filter(user=student).update(user_type='student', mentor=mentor)
+
+    @override_settings(VIEW_PROFILING=True)
+    def test_records_queries_and_duplicates_per_view(self):
+        before = REGISTRY.get_sample_value('view_db_queries_count', {'view': 'my_students'}) or 0
+        self.client.login(username='mentor', password='pw')
+        self.client.get(reverse('my_students'))
+
+        stats = {row['view']: row for row in view_stats()}
+        row = stats['my_students']
+        self.assertEqual(row['requests'], 1)
+        self.assertGreater(row['avg_queries'], 3)
+        self.assertGreater(row['avg_template_ms'], 0)
+        # The per-student test series lookup runs once per student
+        self.assertTrue(any(repeats >= 2 and 'studenttestseries' in sql for sql, repeats in row['duplicates']))
+        self.assertEqual(REGISTRY.get_sample_value('view_db_queries_count', {'view': 'my_students'}), before + 1)
+
+    def test_disabled_by_default(self):
+        self.client.login(username='mentor', password='pw')
+        self.client.get(reverse('my_students'))
+        self.assertEqual(view_stats(), [])
+
+    def test_duplicate_statements_are_bounded(self):
+        from .profiling import DUPLICATES_KEPT, RequestProfile, _duplicates, _record_request, normalize_sql
+
+        self.assertEqual(
+            normalize_sql('SELECT 1 FROM t WHERE id IN (%s, %s, %s) AND x = %s'),
+            'SELECT 1 FROM t WHERE id IN (...) AND x = %s',
+        )
+        for i in range(DUPLICATES_KEPT * 3):
+            profile = RequestProfile()
+            profile.statements[f'SELECT {i}'] = 2
+            _record_request('bounded', profile, 0.01)
+        self.assertLessEqual(len(_duplicates['bounded']), DUPLICATES_KEPT)
+
+    def test_metrics_page_is_staff_only(self):
+        self.client.login(username='mentor', password='pw')
+        self.assertEqual(self.client.get(reverse('view_metrics')).status_code, 302)
+
+        User.objects.filter(pk=self.mentor_user.pk).update(is_staff=True)
+        response = self.client.get(reverse('view_metrics'), {'format': 'prometheus'})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'# TYPE view_latency_seconds histogram', response.content)
@@ -2,23 +2,40 @@ from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.utils import timezone
-import os
 from datetime import timedelta
 import json
 from django.contrib.auth.models import User 
-import json
 from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.core.files.storage import FileSystemStorage
-from pathlib import Path
 
-from collections import defaultdict
+import logging
+from django.db.models import Avg, OuterRef, Prefetch, Subquery
 
-from scheduler.models import Call
+from django.conf import settings
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.views.decorators.http import condition, require_http_methods
+from scheduler.services.calendar import upcoming_calendar_page, weekly_calendar
+from scheduler.services.ical import (
+    feed_etag, feed_last_modified, feed_state, feed_token, iter_ical, parse_feed_token
+)
 from django.contrib.auth.decorators import login_required
+from django.contrib.admin.views.decorators import staff_member_required
 from dashboard.models import MentorProfile
 
 from .forms import ProfileForm
+from .profiling import prometheus_text, view_stats
+from .services.batch_assignment import BatchCapacityError, assign_students_to_batch
+from .services.cohort_analytics import cohort_report, invalidate_cohort_reports
+from .services.file_delivery import pdf_access, serve_file
+from .services.pdf_ingestion import enqueue_pdf
+from .services.practice_tests import (
+    MAX_QUESTIONS, PracticeTestError, build_mock_test, build_practice_test, grade_practice_test
+)
+from .services.pyq_search import FILTER_FIELDS, search_page
+from .services.student_setup import initialize_student, subject_progress_for
+from .services.test_series_enrollment import EnrollmentImportError, enroll_students, import_enrollments
 from .models import MentorProfile
 
 # Add these imports (keep existing ones)
@@ -30,28 +47,27 @@ from .models import (
     TestScore,
     StudyLog,
     StudentGoal,
+    TopicCompletion,
     # ADD THESE:
     Batch,
     TestSeries,
     StudentBatch,
     StudentTestSeries,
     PYQPDF,
+    PYQQuestion,
     Notice,
     StudentMessage , # ADD THIS LINE
     MessageReply
     )
 
+logger = logging.getLogger(__name__)
+
 
 
 # Add this helper function at the TOP of views.py, after imports
-def get_student_test_series_display(student_user):
-    """Get formatted test series display for a student"""
-    test_series = StudentTestSeries.objects.filter(
-        student=student_user,
-        is_active=True
-    ).select_related('test_series')
-    
-    if not test_series.exists():
+def get_student_test_series_display(test_series):
+    """Get formatted test series display from a student's active enrollments"""
+    if not test_series:
         return "None"
     
     # Get first 2 test series names
@@ -59,11 +75,54 @@ def get_student_test_series_display(student_user):
     display = ", ".join(series_list)
     
     # Add "+X more" if there are more
-    if test_series.count() > 2:
-        display += f" (+{test_series.count() - 2} more)"
+    if len(test_series) > 2:
+        display += f" (+{len(test_series) - 2} more)"
     
     return display
 
+
+def get_mentor_students_with_stats(mentor_obj):
+    """
+    Mentor's students annotated with everything the dashboard shows.
+
+    Progress comes from a subquery and active test series are prefetched,
+    so the number of queries does not depend on the number of students.
+    """
+    latest_progress = StudentProgress.objects.filter(
+        student=OuterRef('user')
+    ).order_by('-last_updated')
+
+    return StudentProfile.objects.filter(
+        mentor=mentor_obj,
+        user_type='student'
+    ).select_related('user').annotate(
+        overall_preparation=Subquery(latest_progress.values('overall_preparation')[:1])
+    ).prefetch_related(
+        Prefetch(
+            'user__enrolled_test_series',
+            queryset=StudentTestSeries.objects.filter(is_active=True).select_related('test_series'),
+            to_attr='active_test_series'
+        )
+    )
+
+
+def get_mentor_dashboard_stats(mentor_obj):
+    """Aggregate counts for the mentor dashboard in a fixed number of queries"""
+    student_filter = {
+        'student__studentprofile__mentor': mentor_obj,
+        'student__studentprofile__user_type': 'student',
+    }
+    
+    progress = StudentProgress.objects.filter(**student_filter).aggregate(
+        avg_progress=Avg('overall_preparation')
+    )
+    
+    return {
+        'batches_count': Batch.objects.filter(mentor=mentor_obj).count(),
+        'tests_assigned': StudentTestSeries.objects.filter(**student_filter).count(),
+        'avg_progress': int(progress['avg_progress'] or 0),
+    }
+
 @login_required
 def profile_view(request):
     # Get or create profile
@@ -137,8 +196,8 @@ def mentor_view(request):
                         mentor_profile.profile_picture = student_profile.mentor.photo
                     mentor_profile.save()
     
-    except Exception as e:
-        print(f"Error: {e}")
+    except Exception:
+        logger.exception("mentor_view failed for user=%s", request.user.username)
     
     context = {'mentor_profile': mentor_profile}
     return render(request, 'mentor.html', context)
@@ -146,35 +205,23 @@ def mentor_view(request):
 
 @login_required
 def mentor_dashboard(request):
-    from pathlib import Path
-    def log_debug(message: str) -> None:
-        debug_file = Path("/workspaces/nirvant-site-django/debug_mentor_dashboard.txt")
-        debug_file.parent.mkdir(parents=True, exist_ok=True)
-        with debug_file.open("a", encoding="utf-8") as handle:
-            handle.write(f"{message}\n")
-
-    log_debug(f"DEBUG MENTOR_DASHBOARD: User={request.user.username}")
+    logger.debug("mentor_dashboard user=%s", request.user.username)
     
     # Check if user is mentor
-    log_debug("DEBUG: Checking if user has studentprofile")
     if not hasattr(request.user, 'studentprofile'):
-        log_debug("DEBUG: No studentprofile found!")
+        logger.debug("mentor_dashboard: no studentprofile for user=%s", request.user.username)
         messages.error(request, "Access denied. Mentor only.")
         return redirect('dashboard')
     
     profile = request.user.studentprofile
-    log_debug(f"DEBUG: user_type={profile.user_type}, company_id={profile.company_id}")
     
-    log_debug("DEBUG: Checking user type")
     if profile.user_type != 'mentor':
-        log_debug(f"DEBUG: User is NOT mentor! user_type={profile.user_type}")
+        logger.debug("mentor_dashboard: user=%s is not a mentor (user_type=%s)",
+                     request.user.username, profile.user_type)
         messages.error(request, "Access denied. Mentor only.")
         return redirect('dashboard')
     
-    log_debug("DEBUG: User IS mentor, continuing...")
-    
     # Get mentor's profile
-    log_debug("DEBUG: Getting mentor profile")
     mentor_profile = request.user.studentprofile
     mentor_profile_obj, created = MentorProfile.objects.get_or_create(
         user=request.user,
@@ -188,7 +235,8 @@ def mentor_dashboard(request):
             'is_available': True
         }
     )
-    log_debug(f"DEBUG: MentorProfile created={created}, id={mentor_profile_obj.id}, user={mentor_profile_obj.user}")
+    if created:
+        logger.info("Created MentorProfile id=%s for %s", mentor_profile_obj.id, request.user.username)
 
     # ============================
     # Mentor Schedule (This Month)
@@ -198,39 +246,17 @@ def mentor_dashboard(request):
     current_year = now.year
     current_month = now.month
 
-    # Fetch all calls for this mentor in last 7 days
-    log_debug("DEBUG: Fetching mentor calls")
-    log_debug(f"DEBUG: mentor_profile_obj.id={mentor_profile_obj.id}, user={mentor_profile_obj.user}")
-    log_debug(f"DEBUG: Filtering calls with mentor={mentor_profile_obj}")
-    log_debug(f"DEBUG: Date filter: start_time__gte={timezone.now() - timedelta(days=7)}")
-    
-    mentor_calls = Call.objects.filter(
-        mentor=mentor_profile_obj,
-        start_time__gte=timezone.now() - timedelta(days=7)
-    ).order_by("start_time")
-    
-    log_debug(f"DEBUG: Found {mentor_calls.count()} mentor_calls")
-    log_debug(f"DEBUG: All calls in DB: {Call.objects.count()}")
-    log_debug(f"DEBUG: All calls for this mentor (no date filter): {Call.objects.filter(mentor=mentor_profile_obj).count()}")
-
-    upcoming_calls = []
-    completed_calls = []
-
-    for call in mentor_calls:
-        if call.start_time >= now:
-            upcoming_calls.append(call)
-        else:
-            completed_calls.append(call)
-
-    def group_by_week(calls):
-        weeks = defaultdict(list)
-        for call in calls:
-            week_number = call.start_time.isocalendar()[1]
-            weeks[f"Week {week_number}"].append(call)
-        return dict(weeks)
+    # Calls from the last 7 days through the next two weeks (cached calendar)
+    upcoming_by_week, completed_by_week = weekly_calendar(
+        "mentor",
+        mentor_profile_obj.id,
+        now - timedelta(days=7),
+        now + timedelta(days=14),
+        now=now
+    )
 
-    upcoming_by_week = group_by_week(upcoming_calls)
-    completed_by_week = group_by_week(completed_calls)
+    logger.debug("mentor_dashboard: mentor_profile=%s upcoming_weeks=%d completed_weeks=%d",
+                 mentor_profile_obj.id, len(upcoming_by_week), len(completed_by_week))
 
     month_label = now.strftime("%B %Y")
     
@@ -246,56 +272,29 @@ def mentor_dashboard(request):
         )
         mentor_profile.mentor = mentor_record
         mentor_profile.save()
-        log_debug(f"Auto-created mentor record for {request.user.username}")
+        logger.info("Auto-created mentor record for %s", request.user.username)
     
     # Get mentor object
     mentor_obj = mentor_profile.mentor
     
     if not mentor_obj:
-        log_debug("DEBUG: No mentor object found in profile!")
+        logger.warning("mentor_dashboard: no mentor object for user=%s", request.user.username)
         messages.error(request, "No mentor profile found. Please contact admin.")
         return redirect('dashboard')
     
-    log_debug(f"DEBUG: Mentor object found: {mentor_obj.name}")
-    
     # FIX 2: Find students by mentor ForeignKey (NOT company_id)
-    students = StudentProfile.objects.filter(
-        mentor=mentor_obj,  # This is the ForeignKey to Mentor model
-        user_type='student'
-    )
+    students = get_mentor_students_with_stats(mentor_obj)
 
-    # Add test series information to each student
+    # Add test series information to each student (prefetched, no extra queries)
     for student_profile in students:
-        # Get test series for this student
-        student_profile.test_series_display = get_student_test_series_display(student_profile.user)
+        student_profile.test_series_display = get_student_test_series_display(
+            student_profile.user.active_test_series
+        )
 
-    print(f"DEBUG: Found {students.count()} students")
-    
     # Calculate statistics
-    total_students = students.count()
-    
-    # Get batches count for this mentor
-    batches_count = Batch.objects.filter(mentor=mentor_obj).count()
-    
-    # Count test series assigned
-    tests_assigned = 0
-    for student in students:
-        tests_assigned += StudentTestSeries.objects.filter(student=student.user).count()
-    
-    # Calculate average progress
-    avg_progress = 0
-    progress_count = 0
-    
-    for student in students:
-        try:
-            progress = StudentProgress.objects.get(student=student.user)
-            avg_progress += progress.overall_preparation
-            progress_count += 1
-        except StudentProgress.DoesNotExist:
-            continue
-    
-    if progress_count > 0:
-        avg_progress = avg_progress // progress_count
+    total_students = len(students)
+    stats = get_mentor_dashboard_stats(mentor_obj)
+    logger.debug("mentor_dashboard: mentor=%s students=%d", mentor_obj.id, total_students)
     
     # ==================== GET STUDENT MESSAGES ====================
     # Get recent student messages for this mentor
@@ -314,9 +313,9 @@ def mentor_dashboard(request):
         'mentor_obj': mentor_obj,  # Add mentor object
         'students': students,
         'total_students': total_students,
-        'batches_count': batches_count,
-        'tests_assigned': tests_assigned,
-        'avg_progress': avg_progress,
+        'batches_count': stats['batches_count'],
+        'tests_assigned': stats['tests_assigned'],
+        'avg_progress': stats['avg_progress'],
         'month_label': month_label,
         'upcoming_by_week': upcoming_by_week,
         'completed_by_week': completed_by_week,
@@ -324,7 +323,6 @@ def mentor_dashboard(request):
         'unread_messages_count': unread_messages_count,
     }
     
-    print(f"DEBUG: Rendering mentor_dashboard.html")
     return render(request, 'mentor_dashboard.html', context)
 
 @login_required
@@ -358,73 +356,37 @@ def assign_students(request):
 # Add this function in dashboard/views.py
 @login_required
 def progress_view(request):
-    # Get user profile
-    profile, created = StudentProfile.objects.get_or_create(
-        user=request.user,
-        defaults={
-            'attempt_year': 2025,
-            'neet_exam_date': '2025-05-05',
-            'batch_enrolled': 'NEET 2025 Batch A',
-        }
-    )
-    
-    # Get or create student progress
-    student_progress, created_progress = StudentProgress.objects.get_or_create(
-        student=request.user,
-        defaults={
-            'overall_preparation': 68,
-            'total_study_hours': 32,
-            'total_tests_taken': 2,
-            'mentorship_streak': 15,
-        }
-    )
-    
-    # Get today's study log
     today = timezone.now().date()
-    today_log, created_log = StudyLog.objects.get_or_create(
-        student=request.user,
-        date=today,
-        defaults={'study_hours': 0, 'topics_completed': '[]'}
-    )
     
     # Handle form submissions - SIMPLIFIED VERSION
+    # Only POST writes; rendering the page below is read-only
     if request.method == 'POST':
+        initialize_student(request.user)
+        today_log, created_log = StudyLog.objects.get_or_create(
+            student=request.user,
+            date=today,
+            defaults={'study_hours': 0}
+        )
+        
         # FIX: Handle topic addition
         if 'add_topic' in request.POST:
             topic = request.POST.get('topic', '').strip()
             if topic:
-                # Parse existing topics
-                try:
-                    topics = json.loads(today_log.topics_completed or '[]')
-                except:
-                    topics = []
-                
                 # Split by commas and add each topic
-                new_topics = [t.strip() for t in topic.split(',') if t.strip()]
-                for new_topic in new_topics:
-                    if new_topic and new_topic not in topics:
-                        topics.append(new_topic)
-                
-                today_log.topics_completed = json.dumps(topics)
-                today_log.save()
-                messages.success(request, f'Added {len(new_topics)} topic(s)!')
+                new_topics = [t.strip()[:200] for t in topic.split(',') if t.strip()]
+                added = TopicCompletion.add_to_log(today_log, new_topics)
+                # bulk_create sends no signals
+                invalidate_cohort_reports(student_ids=[request.user.id])
+                messages.success(request, f'Added {added} topic(s)!')
                 return redirect('progress')
         
         # DELETE TOPICS
         elif 'remove_topic' in request.POST:
             topic_to_remove = request.POST.get('topic', '').strip()
             if topic_to_remove:
-                # Parse existing topics
-                try:
-                    topics = json.loads(today_log.topics_completed or '[]')
-                except:
-                    topics = []
-                
                 # Remove the topic if it exists
-                if topic_to_remove in topics:
-                    topics.remove(topic_to_remove)
-                    today_log.topics_completed = json.dumps(topics)
-                    today_log.save()
+                removed, _ = today_log.topic_completions.filter(topic=topic_to_remove).delete()
+                if removed:
                     messages.success(request, f'Removed topic: {topic_to_remove}')
                 return redirect('progress')
         
@@ -435,10 +397,6 @@ def progress_view(request):
                 today_log.study_hours = hours
                 today_log.save()
                 
-                # Update total hours
-                student_progress.total_study_hours += int(hours)
-                student_progress.save()
-                
                 messages.success(request, f'Study hours logged successfully!')
                 return redirect('progress')
         
@@ -462,9 +420,6 @@ def progress_view(request):
                     percentage=percentage
                 )
                 
-                student_progress.total_tests_taken += 1
-                student_progress.save()
-                
                 messages.success(request, 'Test score added successfully!')
                 return redirect('progress')
         
@@ -497,10 +452,6 @@ def progress_view(request):
                 test = TestScore.objects.get(id=test_id, student=request.user)
                 test.delete()
                 
-                # Update test count
-                student_progress.total_tests_taken = TestScore.objects.filter(student=request.user).count()
-                student_progress.save()
-                
                 messages.success(request, 'Test score deleted successfully!')
             except TestScore.DoesNotExist:
                 messages.error(request, 'Test score not found!')
@@ -526,35 +477,33 @@ def progress_view(request):
                 messages.success(request, f'Target updated for {subject_name}!')
             return redirect('progress')
     
+    # Through the accessor, so the template's user.studentprofile is cached
+    try:
+        profile = request.user.studentprofile
+    except StudentProfile.DoesNotExist:
+        messages.error(request, "Please complete your profile first.")
+        return redirect('profile')
+    
     # Calculate days to NEET
     days_to_neet = profile.days_to_neet()
     
-    # Get subject progress
-    subjects_progress = []
-    default_subjects = [
-        {'name': 'Physics', 'progress': 72, 'needs_attention': 'Optics, Thermodynamics'},
-        {'name': 'Chemistry', 'progress': 65, 'needs_attention': 'Organic Chemistry, Coordination Compounds'},
-        {'name': 'Biology', 'progress': 75, 'needs_attention': 'Genetics, Ecology'},
-    ]
+    # Aggregates are kept current by dashboard.signals; until the student's
+    # first update the page shows empty, unsaved rows
+    student_progress = StudentProgress.objects.filter(
+        student=request.user
+    ).order_by('-last_updated').first() or StudentProgress(student=request.user)
     
-    for subj in default_subjects:
-        subject_prog, created = SubjectProgress.objects.get_or_create(
-            student=request.user,
-            subject=subj['name'],
-            defaults={
-                'progress_percentage': subj['progress'],
-                'needs_attention': subj['needs_attention'],
-                'weekly_target': subj['progress'] + 10
-            }
-        )
-        
-        subjects_progress.append({
-            'name': subj['name'],
+    # Get subject progress (one query for all default subjects)
+    subjects_progress = [
+        {
+            'name': subject_prog.subject,
             'progress': subject_prog.progress_percentage,
             'needs_attention': subject_prog.needs_attention,
             'weekly_target': subject_prog.weekly_target,
             'id': subject_prog.id
-        })
+        }
+        for subject_prog in subject_progress_for(request.user)
+    ]
     
     # Get test scores
     test_scores = TestScore.objects.filter(student=request.user).order_by('-date_taken')[:10]
@@ -562,7 +511,7 @@ def progress_view(request):
     # Get goals
     goals = StudentGoal.objects.filter(student=request.user, is_completed=False).order_by('-created_at')
     
-    # Get all study logs for this week
+    # Get all study logs for this week (today's log included)
     week_ago = today - timedelta(days=7)
     weekly_logs = StudyLog.objects.filter(
         student=request.user,
@@ -571,19 +520,20 @@ def progress_view(request):
     
     # Calculate weekly hours
     weekly_hours = [0, 0, 0, 0, 0, 0, 0]
+    today_log = None
     for log in weekly_logs:
         day_index = (log.date - week_ago).days
         if 0 <= day_index < 7:
             weekly_hours[day_index] = log.study_hours
+        elif log.date == today:
+            today_log = log
+    if today_log is None:
+        today_log = StudyLog(student=request.user, date=today, study_hours=0)
     
     # Calculate total weekly hours
     weekly_hours_total = sum(weekly_hours)
     
-    # Parse today's topics
-    try:
-        today_topics = json.loads(today_log.topics_completed or '[]')
-    except:
-        today_topics = []
+    today_topics = today_log.topics
     
     context = {
         'profile': profile,
@@ -766,43 +716,17 @@ def assign_batch(request):
                 messages.error(request, "Please select at least one student.")
             else:
                 try:
-                    batch = Batch.objects.get(id=batch_id, mentor=mentor_obj)
-                    student_id_list = [id.strip() for id in student_ids.split(',') if id.strip()]
+                    result = assign_students_to_batch(batch_id, mentor_obj, student_ids)
+                    batch = result['batch']
                     
-                    assigned_count = 0
-                    for student_id in student_id_list:
-                        try:
-                            student_profile = StudentProfile.objects.get(
-                                user__id=student_id,
-                                mentor=mentor_obj
-                            )
-                            
-                            # Update student's batch
-                            student_profile.batch_enrolled = batch.batch_name
-                            student_profile.save()
-                            
-                            # Create or update StudentBatch record
-                            StudentBatch.objects.update_or_create(
-                                student=student_profile.user,
-                                defaults={
-                                    'batch': batch,
-                                    'is_active': True
-                                }
-                            )
-                            
-                            # Update batch student count
-                            batch.current_students = StudentBatch.objects.filter(batch=batch).count()
-                            batch.save()
-                            
-                            assigned_count += 1
-                            
-                        except StudentProfile.DoesNotExist:
-                            continue
-                    
-                    messages.success(request, f"Batch '{batch.batch_name}' assigned to {assigned_count} student(s) successfully!")
+                    messages.success(request, f"Batch '{batch.batch_name}' assigned to {result['assigned']} student(s) successfully!")
+                    if result['skipped']:
+                        messages.warning(request, f"{len(result['skipped'])} student(s) were not found and were skipped.")
                     
                 except Batch.DoesNotExist:
                     messages.error(request, "Invalid batch selected.")
+                except BatchCapacityError as e:
+                    messages.error(request, str(e))
                 except Exception as e:
                     messages.error(request, f"Error assigning batch: {str(e)}")
     
@@ -887,45 +811,47 @@ def manage_test_series(request):
             else:
                 try:
                     series = TestSeries.objects.get(id=series_id)
-                    student_id_list = [id.strip() for id in student_ids.split(',') if id.strip()]
-                    
-                    assigned_count = 0
-                    for student_id in student_id_list:
-                        try:
-                            student_profile = StudentProfile.objects.get(
-                                user__id=student_id,
-                                mentor=profile.mentor
-                            )
-                            
-                            # Check if already enrolled
-                            existing = StudentTestSeries.objects.filter(
-                                student=student_profile.user,
-                                test_series=series
-                            ).first()
-                            
-                            if existing:
-                                # Update if exists
-                                existing.is_active = True
-                                existing.save()
-                            else:
-                                # Create new enrollment
-                                StudentTestSeries.objects.create(
-                                    student=student_profile.user,
-                                    test_series=series,
-                                    is_active=True
-                                )
-                            
-                            assigned_count += 1
-                            
-                        except StudentProfile.DoesNotExist:
-                            continue
+                    result = enroll_students(series, profile.mentor, student_ids)
                     
-                    messages.success(request, f"Test series '{series.series_name}' assigned to {assigned_count} student(s) successfully!")
+                    messages.success(
+                        request,
+                        f"Test series '{series.series_name}' assigned to "
+                        f"{result['inserted'] + result['reactivated']} student(s) successfully! "
+                        f"({result['skipped']} already enrolled)"
+                    )
                     
                 except TestSeries.DoesNotExist:
                     messages.error(request, "Invalid test series selected.")
                 except Exception as e:
                     messages.error(request, f"Error assigning test series: {str(e)}")
+        
+        # ACTION 3: Import enrollments from a CSV/JSON file
+        elif action == 'import_series':
+            series_id = request.POST.get('series_id')
+            enrollment_file = request.FILES.get('enrollment_file')
+            
+            if not series_id:
+                messages.error(request, "Please select a test series.")
+            elif not enrollment_file:
+                messages.error(request, "Please choose a CSV or JSON file.")
+            else:
+                try:
+                    series = TestSeries.objects.get(id=series_id)
+                    result = import_enrollments(series, profile.mentor, enrollment_file)
+                    
+                    messages.success(
+                        request,
+                        f"Imported into '{series.series_name}': {result['inserted']} enrolled, "
+                        f"{result['reactivated']} reactivated, {result['skipped']} already enrolled, "
+                        f"{len(result['not_found'])} not found."
+                    )
+                    
+                except TestSeries.DoesNotExist:
+                    messages.error(request, "Invalid test series selected.")
+                except EnrollmentImportError as e:
+                    messages.error(request, str(e))
+                except Exception as e:
+                    messages.error(request, f"Error importing enrollments: {str(e)}")
     
     context = {
         'students': students,
@@ -985,20 +911,23 @@ def upload_pyqs(request):
                 messages.error(request, "File size exceeds 50MB limit.")
             else:
                 try:
-                    # Create new PYQPDF
+                    # Create new PYQPDF; the page count is provisional until
+                    # ingestion has read the file
                     new_pdf = PYQPDF.objects.create(
                         subject=subject,
                         year=year,
                         title=title,
                         description=description,
                         pdf_file=pdf_file,
-                        pages=int(pages),
-                        questions_count=int(questions_count),
+                        pages=int(pages or 1),
+                        questions_count=int(questions_count or 0),
                         uploaded_by=request.user,
-                        is_active=True
+                        is_active=True,
+                        processing_status='pending'
                     )
+                    enqueue_pdf(new_pdf)
                     
-                    messages.success(request, f"PDF '{title}' uploaded successfully!")
+                    messages.success(request, f"PDF '{title}' uploaded successfully! It is being processed in the background.")
                     
                     # Refresh the uploaded PDFs list
                     uploaded_pdfs = PYQPDF.objects.filter(
@@ -1026,65 +955,136 @@ def upload_pyqs(request):
     
     return render(request, 'upload_pyqs.html', context)
 
-from django.http import FileResponse, Http404
-import os
+def _serve_pdf(request, pdf_id, as_attachment):
+    pdf = pdf_access(request.user, pdf_id)
+    if pdf is None:
+        raise Http404("PDF not found")
+    try:
+        return serve_file(
+            request,
+            pdf["path"],
+            content_type="application/pdf",
+            filename=f"{pdf['title']}.pdf",
+            as_attachment=as_attachment
+        )
+    except FileNotFoundError:
+        raise Http404("PDF file not found")
+
 
 @login_required
+@require_http_methods(["GET", "HEAD"])
 def view_pdf(request, pdf_id):
-    """View PDF in browser"""
-    try:
-        pdf = PYQPDF.objects.get(id=pdf_id, is_active=True)
-        
-        # Check if user has permission (student or mentor)
-        if request.user.studentprofile.user_type == 'student':
-            # Student can view any active PDF
-            pass
-        elif request.user.studentprofile.user_type == 'mentor':
-            # Mentor can view their own PDFs
-            if pdf.uploaded_by != request.user:
-                raise Http404("PDF not found")
-        else:
-            raise Http404("Access denied")
-        
-        # Open and serve PDF file
-        file_path = pdf.pdf_file.path
-        if os.path.exists(file_path):
-            return FileResponse(open(file_path, 'rb'), content_type='application/pdf')
-        else:
-            raise Http404("PDF file not found")
-            
-    except PYQPDF.DoesNotExist:
-        raise Http404("PDF not found")
+    """View PDF in browser (students: any active PDF, mentors: their own)"""
+    return _serve_pdf(request, pdf_id, as_attachment=False)
+
 
 @login_required
+@require_http_methods(["GET", "HEAD"])
 def download_pdf(request, pdf_id):
     """Download PDF file"""
+    return _serve_pdf(request, pdf_id, as_attachment=True)
+
+
+@login_required
+@require_http_methods(["GET"])
+def mentor_cohort_analytics(request):
+    """Score percentiles, weekly hour trends, subject distributions and at-risk students (JSON)"""
+    profile = getattr(request.user, 'studentprofile', None)
+    if profile is None or profile.user_type != 'mentor':
+        return JsonResponse({'error': 'Access denied. Mentor only.'}, status=403)
+    if not profile.mentor:
+        return JsonResponse({'error': 'No mentor profile found.'}, status=404)
+
+    return JsonResponse(cohort_report(profile.mentor, refresh=request.GET.get('refresh') == '1'))
+
+
+@login_required
+def practice_test_view(request):
+    """Generate a random PYQ practice test or grade a submitted one"""
+    context = {
+        'subjects': PYQQuestion.SUBJECT_CHOICES,
+        'topics': PYQQuestion.TOPIC_CHOICES,
+        'difficulties': PYQQuestion._meta.get_field('difficulty').choices,
+        'max_questions': MAX_QUESTIONS,
+    }
+    if request.method != 'POST':
+        return render(request, 'practice_test.html', context)
+
+    action = request.POST.get('action')
     try:
-        pdf = PYQPDF.objects.get(id=pdf_id, is_active=True)
-        
-        # Check if user has permission
-        if request.user.studentprofile.user_type == 'student':
-            # Student can download any active PDF
-            pass
-        elif request.user.studentprofile.user_type == 'mentor':
-            # Mentor can download their own PDFs
-            if pdf.uploaded_by != request.user:
-                raise Http404("PDF not found")
-        else:
-            raise Http404("Access denied")
-        
-        # Serve file for download
-        file_path = pdf.pdf_file.path
-        if os.path.exists(file_path):
-            response = FileResponse(open(file_path, 'rb'))
-            response['Content-Disposition'] = f'attachment; filename="{pdf.title}.pdf"'
-            return response
+        if action == 'submit':
+            answers = {
+                int(key[2:]): value
+                for key, value in request.POST.items()
+                if key.startswith('q_') and key[2:].isdigit()
+            }
+            test_score, summary = grade_practice_test(request.user, request.POST.get('token', ''), answers)
+            messages.success(
+                request,
+                f"{test_score.test_name}: {test_score.score}/{test_score.max_marks} "
+                f"({summary['correct']} correct, {summary['wrong']} wrong, {summary['unanswered']} unanswered)"
+            )
+            return redirect('progress')
+
+        if action == 'mock':
+            questions, token = build_mock_test(request.user)
         else:
-            raise Http404("PDF file not found")
-            
-    except PYQPDF.DoesNotExist:
-        raise Http404("PDF not found")
-    
+            try:
+                count = int(request.POST.get('count', 30))
+            except ValueError:
+                count = 30
+            questions, token = build_practice_test(
+                request.user, count,
+                subject=request.POST.get('subject') or None,
+                topics=request.POST.getlist('topic'),
+                difficulty=request.POST.get('difficulty') or None,
+            )
+    except PracticeTestError as e:
+        messages.error(request, str(e))
+        return redirect('practice_test')
+
+    context.update({'questions': questions, 'token': token})
+    return render(request, 'practice_test.html', context)
+
+
+@login_required
+@require_http_methods(["GET"])
+def search_pyq_questions(request):
+    """Ranked full-text search over past-year questions (JSON)"""
+    filters = {field: request.GET.get(field, '').strip() for field in FILTER_FIELDS}
+    try:
+        page_size = int(request.GET.get('page_size', 20))
+    except ValueError:
+        return JsonResponse({'error': 'Invalid page size'}, status=400)
+
+    page = search_page(request.GET.get('q', ''), request.GET.get('page', 1), page_size, **filters)
+    return JsonResponse({
+        'results': [
+            {
+                'id': question.id,
+                'subject': question.subject,
+                'year': question.year,
+                'topic': question.topic,
+                'difficulty': question.difficulty,
+                'question_number': question.question_number,
+                'question_text': question.question_text,
+                'options': {
+                    'A': question.option_a,
+                    'B': question.option_b,
+                    'C': question.option_c,
+                    'D': question.option_d,
+                },
+                'rank': question.rank,
+            }
+            for question in page
+        ],
+        'page': page.number,
+        'num_pages': page.paginator.num_pages,
+        'count': page.paginator.count,
+        'has_next': page.has_next(),
+    })
+
+
 @login_required
 def send_notices(request):
     # Check if user is mentor
@@ -1128,6 +1128,15 @@ def send_notices(request):
                 messages.error(request, "Please fill in title and message.")
             else:
                 try:
+                    # Resolve specific recipient before creating, so the notice is
+                    # saved once with its final targeting (unread counters rely on it)
+                    specific_batch = None
+                    specific_student = None
+                    if recipient_type == 'batch' and specific_batch_id:
+                        specific_batch = Batch.objects.filter(id=specific_batch_id, mentor=mentor_obj).first()
+                    elif recipient_type == 'student' and specific_student_id:
+                        specific_student = User.objects.filter(id=specific_student_id).first()
+                    
                     # Create notice
                     notice = Notice.objects.create(
                         mentor=mentor_obj,
@@ -1135,26 +1144,11 @@ def send_notices(request):
                         message=message,
                         priority=priority,
                         recipient_type=recipient_type,
+                        specific_batch=specific_batch,
+                        specific_student=specific_student,
                         is_active=True
                     )
                     
-                    # Set specific recipient if needed
-                    if recipient_type == 'batch' and specific_batch_id:
-                        try:
-                            batch = Batch.objects.get(id=specific_batch_id, mentor=mentor_obj)
-                            notice.specific_batch = batch
-                            notice.save()
-                        except Batch.DoesNotExist:
-                            pass
-                    
-                    elif recipient_type == 'student' and specific_student_id:
-                        try:
-                            student = User.objects.get(id=specific_student_id)
-                            notice.specific_student = student
-                            notice.save()
-                        except User.DoesNotExist:
-                            pass
-                    
                     # Determine recipients
                     recipients = []
                     if recipient_type == 'all':
@@ -1211,12 +1205,17 @@ def my_students(request):
         user_type='student'
     ).select_related('user').prefetch_related('user__enrolled_test_series__test_series')
     
+    # One precomputed progress row per student, read in a single query
+    progress_by_student = {
+        progress.student_id: progress
+        for progress in StudentProgress.objects.filter(
+            student__in=[student.user_id for student in students]
+        ).order_by('last_updated')
+    }
+    
     # Get progress and test series for each student
     for student in students:
-        try:
-            student.progress = StudentProgress.objects.get(student=student.user)
-        except StudentProgress.DoesNotExist:
-            student.progress = None
+        student.progress = progress_by_student.get(student.user_id)
         
         # Get test series for this student
         student.test_series_list = StudentTestSeries.objects.filter(
@@ -1450,10 +1449,6 @@ def mentor_profile_picture(request):
             'success': False,
             'error': str(e)
         }, status=500)
-    
-import json
-from django.http import JsonResponse
-from django.views.decorators.csrf import csrf_exempt
 
 @csrf_exempt
 @login_required
@@ -1528,17 +1523,64 @@ def mentor_profile_picture(request):
         }, status=500)
 
 
+def _calendar_feed_url(request, kind, owner_id):
+    return request.build_absolute_uri(
+        reverse("calendar_feed", args=[feed_token(kind, owner_id)])
+    )
+
+
+def _calendar_feed_state(request, token):
+    # Shared by both validators, so a conditional GET costs one query
+    if not hasattr(request, '_calendar_feed_state'):
+        owner = parse_feed_token(token)
+        request._calendar_feed_state = (owner, feed_state(*owner) if owner else None)
+    return request._calendar_feed_state
+
+
+def _calendar_feed_etag(request, token):
+    owner, state = _calendar_feed_state(request, token)
+    return feed_etag(*owner, state) if owner else None
+
+
+def _calendar_feed_last_modified(request, token):
+    owner, state = _calendar_feed_state(request, token)
+    return feed_last_modified(state) if owner else None
+
+
+@require_http_methods(["GET", "HEAD"])
+@condition(etag_func=_calendar_feed_etag, last_modified_func=_calendar_feed_last_modified)
+def calendar_feed(request, token):
+    """
+    iCalendar feed of a user's calls. The signed token in the URL replaces
+    the session, and unchanged feeds are answered with 304 Not Modified.
+    """
+    owner = parse_feed_token(token)
+    if owner is None:
+        raise Http404("Unknown calendar feed")
+
+    response = StreamingHttpResponse(
+        iter_ical(*owner, join_url=lambda call_id: request.build_absolute_uri(reverse("join_call", args=[call_id]))),
+        content_type="text/calendar; charset=utf-8"
+    )
+    response["Content-Disposition"] = 'inline; filename="nirvant-calls.ics"'
+    response["Cache-Control"] = "private, no-cache"
+    return response
+
+
 @login_required
 def student_calls_view(request):
-    calls = Call.objects.filter(
-        student=request.user,
-        start_time__gte=timezone.now()
-    ).order_by("start_time")
+    calls, next_cursor = upcoming_calendar_page(
+        "student", request.user.id, after=request.GET.get("after")
+    )
 
     return render(
         request,
         "student_calls.html",
-        {"calls": calls}
+        {
+            "calls": calls,
+            "next_cursor": next_cursor,
+            "calendar_feed_url": _calendar_feed_url(request, "student", request.user.id),
+        }
     )
 
 
@@ -1549,15 +1591,18 @@ def mentor_calls_view(request):
     except MentorProfile.DoesNotExist:
         return render(request, "not_a_mentor.html")
 
-    calls = Call.objects.filter(
-        mentor=mentor_profile,
-        start_time__gte=timezone.now()
-    ).order_by("start_time")
+    calls, next_cursor = upcoming_calendar_page(
+        "mentor", mentor_profile.id, after=request.GET.get("after")
+    )
 
     return render(
         request,
         "mentor_calls.html",
-        {"calls": calls}
+        {
+            "calls": calls,
+            "next_cursor": next_cursor,
+            "calendar_feed_url": _calendar_feed_url(request, "mentor", mentor_profile.id),
+        }
     )
 
 @login_required
@@ -1646,6 +1691,49 @@ def delete_student_message(request, message_id):
             'error': 'Message not found.'
         }, status=404)
     
+@login_required
+def mark_notice_read(request, notice_id):
+    """
+    Student marks one notice as read
+    """
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Invalid request method'}, status=400)
+    
+    try:
+        profile = request.user.studentprofile
+        notice = profile.get_mentor_notices().get(id=notice_id)
+    except (StudentProfile.DoesNotExist, Notice.DoesNotExist):
+        return JsonResponse({'success': False, 'error': 'Notice not found.'}, status=404)
+    
+    notice.mark_as_read(request.user)
+    
+    return JsonResponse({
+        'success': True,
+        'unread_count': profile.get_unread_notices_count()
+    })
+
+
+@login_required
+def mark_all_notices_read(request):
+    """
+    Student marks all notices from their mentor as read
+    """
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Invalid request method'}, status=400)
+    
+    try:
+        profile = request.user.studentprofile
+    except StudentProfile.DoesNotExist:
+        return JsonResponse({'success': False, 'error': 'Profile not found.'}, status=404)
+    
+    marked = profile.mark_all_notices_read()
+    
+    return JsonResponse({
+        'success': True,
+        'marked': marked,
+        'unread_count': 0
+    })
+    
 @login_required
 def mentor_messages(request):
     """Mentor view for student messages"""
@@ -1841,4 +1929,16 @@ def delete_message(request, message_id):
     except StudentMessage.DoesNotExist:
         messages.error(request, "Message not found.")
     
-    return redirect('mentor_dashboard')
\ No newline at end of file
+    return redirect('mentor_dashboard')
+
+
+@staff_member_required
+@require_http_methods(["GET"])
+def view_metrics(request):
+    """Per-view performance panel; ?format=prometheus returns the exposition text"""
+    if request.GET.get('format') == 'prometheus':
+        return HttpResponse(prometheus_text(), content_type='text/plain; version=0.0.4; charset=utf-8')
+    return render(request, 'view_metrics.html', {
+        'stats': view_stats(),
+        'profiling_enabled': getattr(settings, 'VIEW_PROFILING', False),
+    })
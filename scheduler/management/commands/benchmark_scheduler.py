@@ -0,0 +1,54 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from scheduler.services.weekly_scheduler import schedule_week
+
+
+def build_dummy_mentors(count):
+    """Same 7 normal : 3 academic mix and hours as simulate_schedule"""
+    mentors = []
+    for i in range(count):
+        mentors.append({
+            "mentor_id": i + 1,
+            "type": "normal" if i % 10 < 7 else "academic",
+            "weekday_window": ("19:00", "24:00"),
+            "sunday_windows": [("10:00", "12:00"), ("19:00", "24:00")],
+            "breaks": [("21:00", "22:00")],
+            "gap_minutes": 5,
+        })
+    return mentors
+
+
+class Command(BaseCommand):
+    help = "Benchmark the weekly scheduler with synthetic students and mentors"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes", nargs="+", type=int, default=[1000, 10000, 100000],
+            help="Student counts to benchmark"
+        )
+        parser.add_argument(
+            "--students-per-mentor", type=int, default=14,
+            help="Students per mentor (simulate_schedule uses 140 students / 10 mentors)"
+        )
+        parser.add_argument("--repeat", type=int, default=1, help="Runs per size; best time is reported")
+        parser.add_argument("--mode", choices=["greedy", "balanced"], default="greedy")
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"{'students':>10} {'mentors':>8} {'calls':>9} {'seconds':>9} {'students/s':>12}")
+
+        for size in options["sizes"]:
+            students = [{"user_id": i + 1} for i in range(size)]
+            mentors = build_dummy_mentors(max(10, -(-size // options["students_per_mentor"])))
+
+            best = None
+            for _ in range(options["repeat"]):
+                started = time.perf_counter()
+                calls = schedule_week(students, mentors, mode=options["mode"])
+                elapsed = time.perf_counter() - started
+                best = elapsed if best is None else min(best, elapsed)
+
+            self.stdout.write(
+                f"{size:>10} {len(mentors):>8} {len(calls):>9} {best:>9.3f} {size / best:>12,.0f}"
+            )
@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from scheduler.services.rescheduler import HORIZON_DAYS, reschedule_calls
+from scheduler.services.weekly_scheduler import SchedulingError
+
+
+class Command(BaseCommand):
+    help = "Move individual calls to the earliest free slot without touching the rest of the week"
+
+    def add_arguments(self, parser):
+        parser.add_argument("call_ids", nargs="+", type=int)
+        parser.add_argument(
+            "--status", choices=["missed_student", "missed_mentor", "rescheduled"],
+            help="Status to record on the original calls"
+        )
+        parser.add_argument("--horizon-days", type=int, default=HORIZON_DAYS)
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        try:
+            pairs = reschedule_calls(
+                options["call_ids"],
+                status=options["status"],
+                horizon_days=options["horizon_days"]
+            )
+        except SchedulingError as e:
+            raise CommandError(str(e))
+        elapsed = (time.perf_counter() - started) * 1000
+
+        for original, replacement in pairs:
+            self.stdout.write(
+                f"Call {original.id} ({original.status}) -> call {replacement.id} "
+                f"with mentor {replacement.mentor_id} at {replacement.start_time:%Y-%m-%d %H:%M}"
+            )
+        self.stdout.write(self.style.SUCCESS(f"Rescheduled {len(pairs)} call(s) in {elapsed:.1f}ms."))
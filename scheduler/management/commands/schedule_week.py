@@ -0,0 +1,72 @@
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from dashboard.models import StudentProfile
+from scheduler.models import MentorScheduleConfig
+from scheduler.services.persistence import BATCH_SIZE, get_next_monday, replace_week_calls
+from scheduler.services.slot_templates import config_to_mentor
+from scheduler.services.weekly_scheduler import SchedulingError, schedule_week
+
+
+class Command(BaseCommand):
+    help = "Schedule next week's calls for all students from the real mentor schedule configs"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--week-start", type=date.fromisoformat,
+            help="Monday of the week to schedule (YYYY-MM-DD). Defaults to next Monday."
+        )
+        parser.add_argument("--mode", choices=["greedy", "balanced"], default="greedy")
+        parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+        parser.add_argument("--dry-run", action="store_true", help="Run the scheduler without writing calls")
+
+    def handle(self, *args, **options):
+        week_start = options["week_start"] or get_next_monday()
+        if week_start.weekday() != 0:
+            raise CommandError(f"{week_start} is not a Monday")
+
+        timings = {}
+        started = time.perf_counter()
+
+        students = [
+            {"user_id": user_id}
+            for user_id in StudentProfile.objects.filter(
+                user_type="student"
+            ).order_by("user_id").values_list("user_id", flat=True)
+        ]
+        mentors = [
+            config_to_mentor(config)
+            for config in MentorScheduleConfig.objects.filter(
+                mentor__is_available=True
+            ).order_by("mentor_id")
+        ]
+        timings["load"] = time.perf_counter() - started
+
+        self.stdout.write(
+            f"Scheduling week of {week_start}: {len(students)} students, {len(mentors)} mentors "
+            f"({sum(m['type'] == 'academic' for m in mentors)} academic)"
+        )
+
+        step = time.perf_counter()
+        try:
+            calls = schedule_week(students, mentors, mode=options["mode"])
+        except SchedulingError as e:
+            raise CommandError(str(e))
+        timings["schedule"] = time.perf_counter() - step
+
+        if options["dry_run"]:
+            self.stdout.write(f"Dry run: {len(calls)} calls would be created.")
+        else:
+            step = time.perf_counter()
+            try:
+                deleted, created = replace_week_calls(calls, week_start, batch_size=options["batch_size"])
+            except SchedulingError as e:
+                raise CommandError(str(e))
+            timings["write"] = time.perf_counter() - step
+            self.stdout.write(f"Replaced {deleted} scheduled call(s) with {created} new call(s).")
+
+        timings["total"] = time.perf_counter() - started
+        self.stdout.write(", ".join(f"{name}: {seconds:.3f}s" for name, seconds in timings.items()))
+        self.stdout.write(self.style.SUCCESS("Scheduling complete."))
@@ -1,20 +1,12 @@
 from django.core.management.base import BaseCommand
 from django.contrib.auth.models import User
-from django.utils import timezone
-from datetime import datetime, timedelta, time
+from datetime import time
 
 from scheduler.services.weekly_scheduler import schedule_week
-from scheduler.models import Call, MentorScheduleConfig
+from scheduler.models import MentorScheduleConfig
+from scheduler.services.persistence import get_next_monday, replace_week_calls
 from dashboard.models import MentorProfile
 
-def get_next_monday():
-    today = timezone.now().date()
-    days_ahead = 0 - today.weekday()  # Monday = 0
-    if days_ahead <= 0:
-        days_ahead += 7
-    return today + timedelta(days=days_ahead)
-
-
 class Command(BaseCommand):
     help = "Simulate weekly scheduling with dummy data"
 
@@ -106,6 +98,7 @@ class Command(BaseCommand):
                     "dinner_start": time(21, 0),
                     "dinner_end": time(22, 0),
                     "gap_minutes": 5,
+                    "call_type": "academic",
                 }
             )
 
@@ -123,50 +116,9 @@ class Command(BaseCommand):
         calls = schedule_week(students, mentors)
 
 
-        week_start = timezone.now().date() + timedelta(days=1)
-
-        day_to_offset = {
-            "mon": 0,
-            "tue": 1,
-            "wed": 2,
-            "thu": 3,
-            "fri": 4,
-            "sat": 5,
-            "sun": 6,
-        }
-
-        # 4. Save calls to database
-        Call.objects.all().delete()  # clean previous simulation
-
-        def build_datetime(base_date, time_str):
-            hour, minute = map(int, time_str.split(":"))
-            if hour == 24 and minute == 0:
-                base_date = base_date + timedelta(days=1)
-                hour = 0
-            return timezone.make_aware(
-                datetime.combine(
-                    base_date,
-                    datetime.min.time().replace(
-                        hour=hour,
-                        minute=minute
-                    )
-                )
-            )
-
-        for c in calls:
-            day_offset = day_to_offset[c["day"]]
-            call_date = week_start + timedelta(days=day_offset)
-
-            start_datetime = build_datetime(call_date, c["start"])
-            end_datetime = build_datetime(call_date, c["end"])
+        week_start = get_next_monday()
 
-            Call.objects.create(
-                student_id=c["student"],
-                mentor_id=c["mentor"],
-                call_type=c["type"],
-                start_time=start_datetime,
-                end_time=end_datetime,
-                status="scheduled"
-            )
+        # 4. Save calls to database, replacing only the simulated week
+        deleted, created = replace_week_calls(calls, week_start)
 
-        self.stdout.write(f"Simulation complete. {len(calls)} calls created.")
+        self.stdout.write(f"Simulation complete. {created} calls created ({deleted} replaced).")
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.9 on 2026-10-18 10:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scheduler', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mentorscheduleconfig',
+            name='call_type',
+            field=models.CharField(choices=[('normal', 'Normal'), ('academic', 'Academic')], default='normal', max_length=20),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.9 on 2026-10-18 10:51
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0019_noticeunreadcounter'),
+        ('scheduler', '0002_mentorscheduleconfig_call_type'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='call',
+            index=models.Index(fields=['mentor', 'start_time'], name='call_mentor_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='call',
+            index=models.Index(fields=['student', 'start_time'], name='call_student_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='call',
+            index=models.Index(condition=models.Q(('status', 'scheduled')), fields=['start_time'], name='call_scheduled_start_idx'),
+        ),
+    ]
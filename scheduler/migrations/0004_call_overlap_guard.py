@@ -0,0 +1,62 @@
+from django.db import migrations
+
+CONSTRAINTS = {
+    "call_mentor_no_overlap": "mentor_id",
+    "call_student_no_overlap": "student_id",
+}
+
+# SQLite has no exclusion constraints; triggers do the same check with one
+# probe of the (mentor|student, start_time) index. Django recreates SQLite
+# tables on most ALTERs, which drops triggers, so a later migration that
+# alters scheduler_call must run add_overlap_guard again.
+SQLITE_TRIGGER = """
+CREATE TRIGGER {name}_{event} BEFORE {event} ON scheduler_call
+WHEN NEW.status = 'scheduled'
+BEGIN
+    SELECT RAISE(ABORT, '{name}') WHERE EXISTS (
+        SELECT 1 FROM scheduler_call
+        WHERE {column} = NEW.{column}
+          AND status = 'scheduled'
+          AND id != NEW.id
+          AND start_time < NEW.end_time
+          AND end_time > NEW.start_time
+    );
+END
+"""
+
+
+def add_overlap_guard(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        schema_editor.execute("CREATE EXTENSION IF NOT EXISTS btree_gist")
+        for name, column in CONSTRAINTS.items():
+            schema_editor.execute(
+                f"ALTER TABLE scheduler_call ADD CONSTRAINT {name} EXCLUDE USING gist "
+                f"({column} WITH =, tstzrange(start_time, end_time, '[)') WITH &&) "
+                f"WHERE (status = 'scheduled')"
+            )
+    elif vendor == "sqlite":
+        for name, column in CONSTRAINTS.items():
+            for event in ("INSERT", "UPDATE"):
+                schema_editor.execute(SQLITE_TRIGGER.format(name=name, event=event, column=column))
+
+
+def remove_overlap_guard(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    for name in CONSTRAINTS:
+        if vendor == "postgresql":
+            schema_editor.execute(f"ALTER TABLE scheduler_call DROP CONSTRAINT IF EXISTS {name}")
+        elif vendor == "sqlite":
+            for event in ("INSERT", "UPDATE"):
+                schema_editor.execute(f"DROP TRIGGER IF EXISTS {name}_{event}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("scheduler", "0003_call_indexes"),
+    ]
+
+    operations = [
+        migrations.RunPython(add_overlap_guard, remove_overlap_guard),
+    ]
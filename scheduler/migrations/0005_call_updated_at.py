@@ -0,0 +1,30 @@
+from importlib import import_module
+
+from django.db import migrations, models
+
+overlap = import_module("scheduler.migrations.0004_call_overlap_guard")
+
+
+def reinstall_sqlite_overlap_guard(apps, schema_editor):
+    # SQLite recreates scheduler_call for this AddField, which drops the
+    # overlap triggers (see 0004_call_overlap_guard)
+    if schema_editor.connection.vendor == "sqlite":
+        overlap.remove_overlap_guard(apps, schema_editor)
+        overlap.add_overlap_guard(apps, schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("scheduler", "0004_call_overlap_guard"),
+    ]
+
+    operations = [
+        migrations.RunPython(migrations.RunPython.noop, reinstall_sqlite_overlap_guard),
+        migrations.AddField(
+            model_name="call",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.RunPython(reinstall_sqlite_overlap_guard, migrations.RunPython.noop),
+    ]
@@ -46,6 +46,18 @@ class Call(models.Model):
     )
 
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['mentor', 'start_time'], name='call_mentor_start_idx'),
+            models.Index(fields=['student', 'start_time'], name='call_student_start_idx'),
+            models.Index(
+                fields=['start_time'],
+                name='call_scheduled_start_idx',
+                condition=models.Q(status='scheduled'),
+            ),
+        ]
 
     def __str__(self):
         return f"{self.student} - {self.call_type} - {self.start_time}"
@@ -58,6 +70,12 @@ class MentorScheduleConfig(models.Model):
         related_name='schedule_config'
     )
 
+    call_type = models.CharField(
+        max_length=20,
+        choices=Call.CALL_TYPE_CHOICES,
+        default='normal'
+    )
+
     weekday_start = models.TimeField()
     weekday_end = models.TimeField()
 
@@ -0,0 +1,252 @@
+"""
+Balanced weekly scheduling.
+
+Unlike the greedy engine, this solver finds an assignment whenever one
+exists and spreads calls evenly across mentors. It works in two stages:
+
+1. Day demands (integer program). Within a call type, every mentor slot on
+   a given day is interchangeable as far as feasibility goes. So the only
+   real decision is how many students take each "pattern": two normal days
+   plus one different academic day, 105 patterns in total. A small ILP
+   picks pattern counts that respect the per-(type, day) slot capacity and
+   minimise the busiest day's utilisation. Its size does not depend on the
+   number of students.
+
+2. Mentor loads (min-cost flow). For each call type, day demands flow
+   source -> day -> mentor -> sink. Each mentor's k-th call costs 2k - 1,
+   so the minimum-cost flow minimises the sum of squared loads, which is
+   the same as minimising load variance.
+
+Stage 1 uses scipy (HiGHS) and stage 2 uses networkx. If either is
+missing, the ILP hits its time limit, or the flow network would exceed
+max_flow_arcs, the solver falls back to the fast greedy engine. Stage 2
+falls back to heap-based balancing when the day demands from stage 1 are
+already known, so the feasibility guarantee holds.
+"""
+import heapq
+import itertools
+import logging
+import time
+from collections import deque
+
+from .engine import CALLS_NEEDED, DAYS, SchedulingError
+from .engine import schedule_week as greedy_schedule_week
+from .slot_generator import to_time
+
+logger = logging.getLogger(__name__)
+
+PATTERNS = [
+    (normal_days, academic_day)
+    for normal_days in itertools.combinations(DAYS, 2)
+    for academic_day in DAYS
+    if academic_day not in normal_days
+]
+
+
+def solve_day_demands(capacity, num_students, time_limit):
+    """
+    capacity: {(call_type, day): slots}. Returns {pattern: count} or None if
+    no assignment exists. Raises TimeoutError if the solver gave up.
+    """
+    import numpy as np
+    from scipy.optimize import Bounds, LinearConstraint, milp
+
+    cells = [(call_type, day) for call_type in ("normal", "academic") for day in DAYS]
+    n = len(PATTERNS)
+
+    # Columns: one per pattern, last column is t (max utilisation)
+    usage = np.zeros((len(cells), n + 1))
+    for j, (normal_days, academic_day) in enumerate(PATTERNS):
+        for day in normal_days:
+            usage[cells.index(("normal", day)), j] = 1
+        usage[cells.index(("academic", academic_day)), j] = 1
+
+    caps = np.array([capacity.get(cell, 0) for cell in cells], dtype=float)
+
+    utilisation = usage.copy()
+    utilisation[:, n] = -caps
+
+    total = np.zeros((1, n + 1))
+    total[0, :n] = 1
+
+    constraints = [
+        LinearConstraint(usage, -np.inf, caps),
+        LinearConstraint(utilisation, -np.inf, 0),
+        LinearConstraint(total, num_students, num_students),
+    ]
+    objective = np.zeros(n + 1)
+    objective[n] = 1
+    integrality = np.ones(n + 1)
+    integrality[n] = 0
+
+    result = milp(
+        objective,
+        constraints=constraints,
+        integrality=integrality,
+        bounds=Bounds(0, np.inf),
+        options={"time_limit": time_limit},
+    )
+
+    if result.x is None:
+        if result.status == 2:
+            return None
+        raise TimeoutError(result.message)
+
+    counts = np.rint(result.x[:n]).astype(int)
+    return {PATTERNS[j]: int(c) for j, c in enumerate(counts) if c}
+
+
+def demands_from_patterns(pattern_counts):
+    demand = {}
+    for (normal_days, academic_day), count in pattern_counts.items():
+        for day in normal_days:
+            demand[("normal", day)] = demand.get(("normal", day), 0) + count
+        demand[("academic", academic_day)] = demand.get(("academic", academic_day), 0) + count
+    return demand
+
+
+def balance_with_flow(mentors, demand):
+    """
+    mentors: [(mentor_id, {day: slots_left})] of one call type.
+    demand: {day: calls}. Returns {(mentor_id, day): calls}.
+    """
+    import networkx as nx
+
+    total = sum(demand.values())
+    graph = nx.MultiDiGraph()
+    graph.add_node("source", demand=-total)
+    graph.add_node("sink", demand=total)
+
+    for day, calls in demand.items():
+        if calls:
+            graph.add_edge("source", ("day", day), capacity=calls, weight=0)
+
+    for mentor_id, day_slots in mentors:
+        available = 0
+        for day, slots in day_slots.items():
+            if slots and demand.get(day):
+                graph.add_edge(("day", day), ("mentor", mentor_id), capacity=slots, weight=0)
+                available += slots
+        # k-th call costs 2k - 1, so total cost is load^2
+        for k in range(1, available + 1):
+            graph.add_edge(("mentor", mentor_id), "sink", capacity=1, weight=2 * k - 1)
+
+    flow = nx.min_cost_flow(graph)
+
+    quotas = {}
+    for day in demand:
+        for target, edges in flow.get(("day", day), {}).items():
+            calls = sum(edges.values())
+            if calls:
+                quotas[(target[1], day)] = calls
+    return quotas
+
+
+def balance_with_heap(mentors, demand):
+    """Fast fallback for balance_with_flow: least-loaded mentor per unit"""
+    load = {mentor_id: 0 for mentor_id, _ in mentors}
+    quotas = {}
+
+    # Scarcest days first, so flexible mentors are still free for them
+    def slack(day):
+        return sum(slots.get(day, 0) for _, slots in mentors) - demand[day]
+
+    for day in sorted(demand, key=slack):
+        heap = [
+            (load[mentor_id], order, mentor_id, slots.get(day, 0))
+            for order, (mentor_id, slots) in enumerate(mentors)
+            if slots.get(day, 0)
+        ]
+        heapq.heapify(heap)
+        for _ in range(demand[day]):
+            mentor_load, order, mentor_id, left = heapq.heappop(heap)
+            quotas[(mentor_id, day)] = quotas.get((mentor_id, day), 0) + 1
+            load[mentor_id] = mentor_load + 1
+            if left > 1:
+                heapq.heappush(heap, (mentor_load + 1, order, mentor_id, left - 1))
+    return quotas
+
+
+def schedule_week_balanced(students, mentors, time_limit=5.0, max_flow_arcs=20000, build_slots=None):
+    """
+    Same input/output as schedule_week, but the result is feasible whenever
+    any assignment exists and mentor loads have minimum variance.
+    """
+    if build_slots is None:
+        from .weekly_scheduler import build_weekly_slots as build_slots
+
+    deadline = time.monotonic() + time_limit
+
+    weekly = {}
+    by_type = {}
+    for m in mentors:
+        if m["mentor_id"] not in weekly:
+            weekly[m["mentor_id"]] = build_slots(m)
+            by_type.setdefault(m["type"], []).append(m["mentor_id"])
+
+    capacity = {}
+    for call_type, mentor_ids in by_type.items():
+        for mentor_id in mentor_ids:
+            for day in DAYS:
+                slots = len(weekly[mentor_id].get(day, ()))
+                capacity[(call_type, day)] = capacity.get((call_type, day), 0) + slots
+
+    try:
+        pattern_counts = solve_day_demands(capacity, len(students), time_limit)
+    except ImportError:
+        logger.warning("scipy not installed; using greedy scheduler")
+        return greedy_schedule_week(students, mentors, build_slots=build_slots)
+    except TimeoutError:
+        logger.warning("Day-demand ILP hit its %.1fs limit; using greedy scheduler", time_limit)
+        return greedy_schedule_week(students, mentors, build_slots=build_slots)
+
+    if pattern_counts is None:
+        raise SchedulingError("No feasible assignment of calls to mentor slots")
+
+    demand = demands_from_patterns(pattern_counts)
+
+    # Stage 2: per-(type, day) queue of (mentor, slot) chosen for balance
+    slot_queues = {}
+    for call_type, mentor_ids in by_type.items():
+        type_mentors = [
+            (mentor_id, {day: len(weekly[mentor_id].get(day, ())) for day in DAYS})
+            for mentor_id in mentor_ids
+        ]
+        type_demand = {day: demand.get((call_type, day), 0) for day in DAYS}
+        type_demand = {day: calls for day, calls in type_demand.items() if calls}
+
+        arcs = sum(7 + sum(slots.values()) for _, slots in type_mentors)
+        quotas = None
+        if arcs <= max_flow_arcs and time.monotonic() < deadline:
+            try:
+                quotas = balance_with_flow(type_mentors, type_demand)
+            except ImportError:
+                logger.warning("networkx not installed; balancing %s mentors with heap", call_type)
+        if quotas is None:
+            quotas = balance_with_heap(type_mentors, type_demand)
+
+        for mentor_id in mentor_ids:
+            for day in DAYS:
+                calls = quotas.get((mentor_id, day))
+                if calls:
+                    queue = slot_queues.setdefault((call_type, day), deque())
+                    queue.extend((mentor_id, slot) for slot in weekly[mentor_id][day][:calls])
+
+    calls = []
+    patterns = itertools.chain.from_iterable(
+        itertools.repeat(pattern, count) for pattern, count in pattern_counts.items()
+    )
+    for student, (normal_days, academic_day) in zip(students, patterns):
+        for call_type, day in zip(CALLS_NEEDED, (*normal_days, academic_day)):
+            mentor_id, slot = slot_queues[(call_type, day)].popleft()
+            calls.append({
+                "student": student["user_id"],
+                "mentor": mentor_id,
+                "day": day,
+                "start": to_time(slot[0]),
+                "end": to_time(slot[1]),
+                "type": call_type
+            })
+
+    logger.debug("schedule_week_balanced: %d calls for %d students", len(calls), len(students))
+    return calls
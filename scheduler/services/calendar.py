@@ -0,0 +1,197 @@
+"""
+Cached mentor/student calendars.
+
+Calls are cached per owner ("mentor" -> MentorProfile id, "student" ->
+User id) in ISO-week buckets of plain CalendarEntry objects, so a calendar
+page on a cache hit is two cache round-trips and no Call query. Upcoming
+vs completed is split at read time, which keeps buckets valid as time
+passes.
+
+Bucket keys carry a version per owner plus a global generation:
+  - Call post_save/post_delete (scheduler.signals) drop the owner versions,
+    including the previous mentor and student when a call is reassigned;
+  - bulk writes (bulk_create/bulk_update, whole-week replacement) call
+    invalidate_calendars() or invalidate_all_calendars() themselves.
+Stale buckets are never read again and expire after CALENDAR_TIMEOUT.
+Invalidation only works if every worker shares the cache, which is why
+settings.CACHES has no per-process fallback.
+"""
+import contextvars
+import itertools
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from scheduler.models import Call
+
+from .call_queries import PAGE_SIZE, WINDOW_DAYS, decode_cursor, encode_cursor
+
+CALENDAR_TIMEOUT = 60 * 60 * 24
+KEY_PREFIX = "calendar"
+OWNER_FIELDS = {"mentor": "mentor_id", "student": "student_id"}
+
+_suspended = contextvars.ContextVar("calendar_invalidation_suspended", default=False)
+
+
+class CalendarEntry:
+    """What the calendar pages need from a Call, cheap to pickle"""
+
+    __slots__ = (
+        "id", "start_time", "end_time", "call_type", "status",
+        "mentor_id", "mentor_label", "student_id", "student_name",
+    )
+
+    def __init__(self, call):
+        self.id = call.id
+        self.start_time = call.start_time
+        self.end_time = call.end_time
+        self.call_type = call.call_type
+        self.status = call.status
+        self.mentor_id = call.mentor_id
+        self.mentor_label = str(call.mentor)
+        self.student_id = call.student_id
+        self.student_name = call.student.username
+
+
+def week_of(moment):
+    """Monday (local date) of the ISO week containing moment"""
+    day = timezone.localdate(moment)
+    return day - timedelta(days=day.weekday())
+
+
+def _week_range(week):
+    start = timezone.make_aware(datetime.combine(week, datetime.min.time()))
+    return start, start + timedelta(days=7)
+
+
+def _version_key(kind, owner_id):
+    return f"{KEY_PREFIX}:v:{kind}:{owner_id}"
+
+
+def _generation_key():
+    return f"{KEY_PREFIX}:generation"
+
+
+def _new_token():
+    return time.time_ns()
+
+
+def calendar_versions(kind, owner_id):
+    """(generation, owner version), creating either if missing"""
+    keys = [_generation_key(), _version_key(kind, owner_id)]
+    found = cache.get_many(keys)
+    tokens = []
+    for key in keys:
+        if key not in found:
+            cache.add(key, _new_token(), None)
+            found[key] = cache.get(key)
+        tokens.append(found[key])
+    return tokens
+
+
+def _bucket_key(kind, owner_id, versions, week):
+    generation, version = versions
+    return f"{KEY_PREFIX}:{kind}:{owner_id}:{generation}:{version}:{week.isoformat()}"
+
+
+def invalidate_calendars(mentor_ids=(), student_ids=()):
+    """
+    Drop the calendars of these owners once the current transaction
+    commits, so a concurrent reader cannot re-cache the old rows.
+    """
+    if _suspended.get():
+        return
+    keys = [_version_key("mentor", i) for i in set(mentor_ids)]
+    keys += [_version_key("student", i) for i in set(student_ids)]
+    if keys:
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def invalidate_all_calendars():
+    transaction.on_commit(lambda: cache.set(_generation_key(), _new_token(), None))
+
+
+@contextmanager
+def suspend_invalidation():
+    """Skip per-row invalidation inside a bulk write that invalidates once at the end"""
+    token = _suspended.set(True)
+    try:
+        yield
+    finally:
+        _suspended.reset(token)
+
+
+def get_weeks(kind, owner_id, weeks):
+    """{week: [CalendarEntry]} for the given Mondays, loading misses in one query"""
+    versions = calendar_versions(kind, owner_id)
+    keys = {week: _bucket_key(kind, owner_id, versions, week) for week in weeks}
+    found = cache.get_many(keys.values())
+    buckets = {week: found[key] for week, key in keys.items() if key in found}
+
+    missing = [week for week in weeks if week not in buckets]
+    if missing:
+        ranges = Q()
+        for week in missing:
+            start, end = _week_range(week)
+            ranges |= Q(start_time__gte=start, start_time__lt=end)
+        calls = Call.objects.filter(
+            ranges, **{OWNER_FIELDS[kind]: owner_id}
+        ).select_related("mentor__user", "student").order_by("start_time", "id")
+
+        loaded = {week: [] for week in missing}
+        for call in calls:
+            loaded[week_of(call.start_time)].append(CalendarEntry(call))
+        cache.set_many({keys[week]: entries for week, entries in loaded.items()}, CALENDAR_TIMEOUT)
+        buckets.update(loaded)
+
+    return buckets
+
+
+def calendar_entries(kind, owner_id, start, end):
+    """Cached calls with start <= start_time < end, ordered by (start_time, id)"""
+    weeks = []
+    week = week_of(start)
+    while week <= week_of(end):
+        weeks.append(week)
+        week += timedelta(days=7)
+
+    buckets = get_weeks(kind, owner_id, weeks)
+    return [
+        entry
+        for entry in itertools.chain.from_iterable(buckets[week] for week in weeks)
+        if start <= entry.start_time < end
+    ]
+
+
+def upcoming_calendar_page(kind, owner_id, after=None, now=None, window_days=WINDOW_DAYS, page_size=PAGE_SIZE):
+    """Cached equivalent of call_queries.upcoming_calls_page"""
+    now = now or timezone.now()
+    entries = calendar_entries(kind, owner_id, now, now + timedelta(days=window_days))
+
+    cursor = decode_cursor(after) if after else None
+    if cursor:
+        entries = [entry for entry in entries if (entry.start_time, entry.id) > cursor]
+
+    if len(entries) > page_size:
+        entries = entries[:page_size]
+        return entries, encode_cursor(entries[-1])
+    return entries, None
+
+
+def weekly_calendar(kind, owner_id, start, end, now=None):
+    """
+    (upcoming_by_week, completed_by_week) for start <= start_time < end,
+    each {"Week N": [CalendarEntry]} in date order.
+    """
+    now = now or timezone.now()
+    upcoming, completed = defaultdict(list), defaultdict(list)
+    for entry in calendar_entries(kind, owner_id, start, end):
+        target = upcoming if entry.start_time >= now else completed
+        target[f"Week {entry.start_time.isocalendar()[1]}"].append(entry)
+    return dict(upcoming), dict(completed)
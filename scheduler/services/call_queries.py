@@ -0,0 +1,56 @@
+"""
+Bounded, keyset-paginated Call lookups for the schedule pages.
+
+Every query is limited to a start_time window and ordered by
+(start_time, id), so it is a range scan on the (mentor, start_time) or
+(student, start_time) index however much history has built up. Pages
+continue from the last row seen ("after" cursor) instead of using OFFSET.
+"""
+from datetime import datetime, timedelta
+
+from django.db.models import Q
+from django.utils import timezone
+
+PAGE_SIZE = 20
+WINDOW_DAYS = 28
+
+
+def encode_cursor(call):
+    return f"{call.start_time.isoformat()}_{call.id}"
+
+
+def decode_cursor(value):
+    """(start_time, id) from an "after" cursor, or None if it is malformed"""
+    try:
+        start_time, call_id = value.rsplit("_", 1)
+        start_time = datetime.fromisoformat(start_time)
+    except (AttributeError, ValueError):
+        return None
+    if timezone.is_naive(start_time) or not call_id.isdigit():
+        return None
+    return start_time, int(call_id)
+
+
+def calls_page(queryset, window_start, window_end, after=None, page_size=PAGE_SIZE):
+    """
+    One page of calls with window_start <= start_time < window_end.
+    Returns (calls, next_cursor); next_cursor is None on the last page.
+    """
+    calls = queryset.filter(start_time__gte=window_start, start_time__lt=window_end)
+
+    cursor = decode_cursor(after) if after else None
+    if cursor:
+        start_time, call_id = cursor
+        calls = calls.filter(Q(start_time__gt=start_time) | Q(start_time=start_time, id__gt=call_id))
+
+    calls = list(calls.order_by("start_time", "id")[:page_size + 1])
+    if len(calls) > page_size:
+        calls = calls[:page_size]
+        return calls, encode_cursor(calls[-1])
+    return calls, None
+
+
+def upcoming_calls_page(queryset, after=None, now=None, window_days=WINDOW_DAYS, page_size=PAGE_SIZE):
+    """Calls starting in the next window_days days, one page at a time"""
+    now = now or timezone.now()
+    return calls_page(queryset, now, now + timedelta(days=window_days), after=after, page_size=page_size)
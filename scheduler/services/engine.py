@@ -0,0 +1,119 @@
+import heapq
+import logging
+from collections import deque
+
+from .slot_generator import to_time
+
+logger = logging.getLogger(__name__)
+
+DAYS = ["mon", "tue", "wed", "thu", "fri", "sat", "sun"]
+CALLS_NEEDED = ["normal", "normal", "academic"]
+
+
+class SchedulingError(Exception):
+    pass
+
+
+class MentorQueue:
+    """One mentor's remaining slots, one deque per day"""
+
+    __slots__ = ("mentor_id", "order", "load", "days", "remaining")
+
+    def __init__(self, mentor_id, order, weekly_slots):
+        self.mentor_id = mentor_id
+        self.order = order
+        self.load = 0
+        self.days = {day: deque(weekly_slots.get(day, ())) for day in DAYS}
+        self.remaining = sum(len(slots) for slots in self.days.values())
+
+    def first_free_day(self, used_days):
+        for day in DAYS:
+            if day not in used_days and self.days[day]:
+                return day
+        return None
+
+    def take(self, day):
+        self.load += 1
+        self.remaining -= 1
+        return self.days[day].popleft()
+
+
+class TypePool:
+    """
+    Mentors of one call type in a heap ordered by (load, original order),
+    which is the same order the greedy scheduler sorted them in.
+    """
+
+    def __init__(self, mentor_queues):
+        self.heap = [(m.load, m.order, m) for m in mentor_queues if m.remaining]
+        heapq.heapify(self.heap)
+
+    def assign(self, used_days):
+        """Pop the least-loaded mentor with a slot on a day not in used_days"""
+        skipped = []
+        found = None
+
+        while self.heap:
+            entry = heapq.heappop(self.heap)
+            mentor = entry[2]
+            day = mentor.first_free_day(used_days)
+            if day is None:
+                # Only busy on this student's days; keep for the next student
+                skipped.append(entry)
+                continue
+            slot = mentor.take(day)
+            if mentor.remaining:
+                heapq.heappush(self.heap, (mentor.load, mentor.order, mentor))
+            found = (mentor, day, slot)
+            break
+
+        for entry in skipped:
+            heapq.heappush(self.heap, entry)
+        return found
+
+
+def schedule_week(students, mentors, build_slots=None):
+    """
+    Assign 2 normal + 1 academic call per student, at most one call per
+    day per student, always using the least-loaded eligible mentor.
+
+    Each assignment is O(log m) heap work plus a scan of at most 7 days;
+    a mentor is only passed over when all of its free days are already
+    taken by the student, which can happen for at most a handful of
+    mentors per assignment.
+    """
+    if build_slots is None:
+        from .weekly_scheduler import build_weekly_slots as build_slots
+
+    queues_by_type = {}
+    for order, m in enumerate(mentors):
+        queues_by_type.setdefault(m["type"], []).append(
+            MentorQueue(m["mentor_id"], order, build_slots(m))
+        )
+    pools = {call_type: TypePool(queues) for call_type, queues in queues_by_type.items()}
+
+    calls = []
+    for student in students:
+        used_days = set()
+
+        for call_type in CALLS_NEEDED:
+            pool = pools.get(call_type)
+            found = pool.assign(used_days) if pool else None
+
+            if found is None:
+                logger.warning("No %s slot left for student %s", call_type, student["user_id"])
+                raise SchedulingError(f"No available {call_type} mentor slots")
+
+            mentor, day, slot = found
+            calls.append({
+                "student": student["user_id"],
+                "mentor": mentor.mentor_id,
+                "day": day,
+                "start": to_time(slot[0]),
+                "end": to_time(slot[1]),
+                "type": call_type
+            })
+            used_days.add(day)
+
+    logger.debug("schedule_week: %d calls for %d students", len(calls), len(students))
+    return calls
@@ -0,0 +1,161 @@
+"""
+iCalendar (RFC 5545) feeds of a mentor's or student's calls.
+
+Feed URLs carry a signed "<kind>:<owner_id>" token, so calendar clients can
+poll without a session. A conditional request is answered from one
+aggregate over the exported calls (count, highest id, latest updated_at),
+read from the database so every worker returns the same ETag. The body is
+produced by a generator over a chunked queryset iterator, so memory stays
+flat however many calls are exported.
+"""
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.core import signing
+from django.db.models import Count, Max
+from django.utils import timezone
+
+from scheduler.models import Call
+
+from .calendar import OWNER_FIELDS
+
+FEED_SALT = "scheduler.calendar-feed"
+PAST_DAYS = 30
+FUTURE_DAYS = 90
+PRODID = "-//Nirvant//Mentor Calls//EN"
+
+ICAL_STATUS = {
+    "scheduled": "CONFIRMED",
+    "completed": "CONFIRMED",
+    "missed_student": "CANCELLED",
+    "missed_mentor": "CANCELLED",
+    "rescheduled": "CANCELLED",
+}
+
+
+def feed_token(kind, owner_id):
+    return signing.Signer(salt=FEED_SALT).sign(f"{kind}:{owner_id}")
+
+
+def parse_feed_token(token):
+    """(kind, owner_id) from a feed token, or None if it is forged or malformed"""
+    try:
+        kind, owner_id = signing.Signer(salt=FEED_SALT).unsign(token).split(":")
+        owner_id = int(owner_id)
+    except (signing.BadSignature, ValueError):
+        return None
+    if kind not in OWNER_FIELDS:
+        return None
+    return kind, owner_id
+
+
+def feed_window(now=None):
+    """Exported range; it only moves once a day so daily ETags stay stable"""
+    today = timezone.localdate(now or timezone.now())
+    return today - timedelta(days=PAST_DAYS), today + timedelta(days=FUTURE_DAYS)
+
+
+def _midnight(day):
+    return timezone.make_aware(datetime.combine(day, datetime.min.time()))
+
+
+def feed_calls(kind, owner_id, now=None):
+    start, end = feed_window(now)
+    return Call.objects.filter(
+        **{OWNER_FIELDS[kind]: owner_id},
+        start_time__gte=_midnight(start),
+        start_time__lt=_midnight(end),
+    )
+
+
+def feed_state(kind, owner_id, now=None):
+    """
+    What the feed's validators are derived from: count, highest id and
+    latest change of the exported calls. Adding, editing or deleting a call
+    changes at least one of them.
+    """
+    state = feed_calls(kind, owner_id, now).order_by().aggregate(
+        count=Count("id"), last_id=Max("id"), last_change=Max("updated_at")
+    )
+    state["window_start"] = feed_window(now)[0]
+    return state
+
+
+def feed_etag(kind, owner_id, state):
+    last_change = state["last_change"]
+    changed = last_change.strftime("%Y%m%d%H%M%S%f") if last_change else "0"
+    return f"{kind}-{owner_id}-{state['count']}-{state['last_id'] or 0}-{changed}-{state['window_start']:%Y%m%d}"
+
+
+def feed_last_modified(state):
+    """
+    Latest call change, or the day the window last moved if that is newer.
+    Deletions only show in the ETag, which clients send when they have one.
+    """
+    moments = [_midnight(state["window_start"] + timedelta(days=PAST_DAYS))]
+    if state["last_change"] is not None:
+        moments.append(state["last_change"])
+    return max(moments).astimezone(dt_timezone.utc).replace(microsecond=0)
+
+
+def _escape(text):
+    return (
+        str(text).replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,").replace("\n", "\\n")
+    )
+
+
+def _fold(line):
+    """Fold a content line at 75 octets (RFC 5545 3.1)"""
+    encoded = line.encode("utf-8")
+    if len(encoded) <= 75:
+        return line + "\r\n"
+    parts = []
+    limit = 75
+    while len(encoded) > limit:
+        cut = limit
+        # Do not split a multi-byte character
+        while (encoded[cut] & 0xC0) == 0x80:
+            cut -= 1
+        parts.append(encoded[:cut].decode("utf-8"))
+        encoded = encoded[cut:]
+        limit = 74  # continuation lines start with a space
+    parts.append(encoded.decode("utf-8"))
+    return "\r\n ".join(parts) + "\r\n"
+
+
+def _utc(moment):
+    return moment.astimezone(dt_timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+
+
+def iter_ical(kind, owner_id, join_url=None, now=None, chunk_size=500):
+    """
+    Yield the feed line by line. join_url(call_id) -> absolute URL of the
+    call page, included as URL when given.
+    """
+    calls = feed_calls(kind, owner_id, now).select_related("mentor__user", "student").order_by("start_time", "id")
+
+    yield "BEGIN:VCALENDAR\r\n"
+    yield "VERSION:2.0\r\n"
+    yield f"PRODID:{PRODID}\r\n"
+    yield "CALSCALE:GREGORIAN\r\n"
+    yield "METHOD:PUBLISH\r\n"
+    yield _fold(f"X-WR-CALNAME:{_escape('Nirvant calls')}")
+
+    for call in calls.iterator(chunk_size=chunk_size):
+        if kind == "mentor":
+            other = call.student.get_full_name() or call.student.username
+        else:
+            other = call.mentor.user.get_full_name() or call.mentor.user.username
+
+        yield "BEGIN:VEVENT\r\n"
+        yield f"UID:call-{call.id}@nirvant\r\n"
+        yield f"DTSTAMP:{_utc(call.created_at)}\r\n"
+        yield f"DTSTART:{_utc(call.start_time)}\r\n"
+        yield f"DTEND:{_utc(call.end_time)}\r\n"
+        yield _fold(f"SUMMARY:{_escape(f'{call.get_call_type_display()} call with {other}')}")
+        yield _fold(f"DESCRIPTION:{_escape(call.get_status_display())}")
+        yield f"STATUS:{ICAL_STATUS.get(call.status, 'CONFIRMED')}\r\n"
+        if join_url:
+            yield _fold(f"URL:{join_url(call.id)}")
+        yield "END:VEVENT\r\n"
+
+    yield "END:VCALENDAR\r\n"
@@ -0,0 +1,68 @@
+"""
+Double-booking guard for calls.
+
+The database refuses two overlapping scheduled calls for the same mentor
+or the same student (see migration 0004_call_overlap_guard):
+
+  - PostgreSQL: exclusion constraints on tstzrange(start_time, end_time)
+    per mentor and per student (btree_gist);
+  - SQLite: BEFORE INSERT/UPDATE triggers doing one probe of the
+    (mentor, start_time) / (student, start_time) index.
+
+Ranges are half-open, so back-to-back calls are allowed. Because the
+database enforces this, concurrent writers in different workers cannot
+both book the same slot; the loser gets CallOverlapError.
+"""
+from contextlib import contextmanager
+
+from django.db import IntegrityError
+from django.db.models import Q
+
+from scheduler.models import Call
+
+from .engine import SchedulingError
+
+MENTOR_CONSTRAINT = "call_mentor_no_overlap"
+STUDENT_CONSTRAINT = "call_student_no_overlap"
+
+
+class CallOverlapError(SchedulingError):
+    pass
+
+
+def overlapping_calls(start, end, mentor_id=None, student_id=None, exclude_id=None):
+    """Scheduled calls of the mentor or student that overlap [start, end)"""
+    who = Q()
+    if mentor_id is not None:
+        who |= Q(mentor_id=mentor_id)
+    if student_id is not None:
+        who |= Q(student_id=student_id)
+    if not who:
+        return Call.objects.none()
+
+    calls = Call.objects.filter(who, status="scheduled", start_time__lt=end, end_time__gt=start)
+    if exclude_id is not None:
+        calls = calls.exclude(id=exclude_id)
+    return calls
+
+
+def has_conflict(call):
+    """True if saving call as scheduled would double-book its mentor or student"""
+    return overlapping_calls(
+        call.start_time, call.end_time,
+        mentor_id=call.mentor_id, student_id=call.student_id, exclude_id=call.pk
+    ).exists()
+
+
+@contextmanager
+def overlap_guard():
+    """Turn a violated overlap constraint into CallOverlapError"""
+    try:
+        yield
+    except IntegrityError as e:
+        message = str(e)
+        if MENTOR_CONSTRAINT in message:
+            raise CallOverlapError("Mentor already has a call at that time") from e
+        if STUDENT_CONSTRAINT in message:
+            raise CallOverlapError("Student already has a call at that time") from e
+        raise
@@ -0,0 +1,76 @@
+from datetime import datetime, timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from scheduler.models import Call
+
+from .calendar import invalidate_all_calendars, suspend_invalidation
+from .engine import DAYS
+from .overlap import overlap_guard
+from .slot_generator import to_minutes
+
+BATCH_SIZE = 1000
+
+
+def get_next_monday():
+    today = timezone.now().date()
+    return today + timedelta(days=7 - today.weekday())
+
+
+def week_bounds(week_start):
+    """Aware [start, end) datetimes covering the 7 days from week_start (a date)"""
+    start = timezone.make_aware(datetime.combine(week_start, datetime.min.time()))
+    return start, start + timedelta(days=7)
+
+
+def build_call_objects(calls, week_start):
+    """
+    Unsaved Call instances for scheduler output. Datetimes are computed once
+    per distinct (day, time) instead of once per row.
+    """
+    week_begin, _ = week_bounds(week_start)
+    day_offset = {day: timedelta(days=i) for i, day in enumerate(DAYS)}
+    moments = {}
+
+    def moment(day, time_str):
+        key = (day, time_str)
+        if key not in moments:
+            # "24:00" rolls over to midnight of the next day
+            moments[key] = week_begin + day_offset[day] + timedelta(minutes=to_minutes(time_str))
+        return moments[key]
+
+    return [
+        Call(
+            student_id=c["student"],
+            mentor_id=c["mentor"],
+            call_type=c["type"],
+            start_time=moment(c["day"], c["start"]),
+            end_time=moment(c["day"], c["end"]),
+            status="scheduled"
+        )
+        for c in calls
+    ]
+
+
+def replace_week_calls(calls, week_start, batch_size=BATCH_SIZE):
+    """
+    Atomically swap the scheduled calls of one week for a new schedule.
+    Completed/missed calls and other weeks are left alone.
+    Returns (deleted, created).
+    """
+    start, end = week_bounds(week_start)
+    objects = build_call_objects(calls, week_start)
+
+    with transaction.atomic(), suspend_invalidation():
+        deleted, _ = Call.objects.filter(
+            start_time__gte=start,
+            start_time__lt=end,
+            status="scheduled"
+        ).delete()
+        with overlap_guard():
+            Call.objects.bulk_create(objects, batch_size=batch_size)
+        # Nearly every calendar changed; one generation bump beats per-owner keys
+        invalidate_all_calendars()
+
+    return deleted, len(objects)
@@ -0,0 +1,173 @@
+"""
+Incremental rescheduling of individual calls.
+
+Instead of regenerating the whole week, each affected call gets the
+earliest free slot of a mentor of the same call type. Mentor occupancy and
+the student's booked days are read with one range query over the search
+window; the slot grid comes from the cached weekly templates. Nothing but
+the affected calls and their replacements is written, and everything runs
+in one transaction, so either all calls are rescheduled or none are.
+"""
+from datetime import datetime, timedelta
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from scheduler.models import Call, MentorScheduleConfig
+
+from .calendar import invalidate_calendars
+from .engine import DAYS, SchedulingError
+from .overlap import overlap_guard
+from .slot_templates import config_to_mentor, template_key, weekly_template
+
+ACTIVE_STATUSES = ("scheduled", "completed")
+RESCHEDULABLE_STATUSES = ("scheduled", "missed_student", "missed_mentor")
+HORIZON_DAYS = 7
+
+
+class Occupancy:
+    """Live bookings inside the search window"""
+
+    def __init__(self, rows):
+        self.mentor_busy = {}
+        self.mentor_load = {}
+        self.student_days = {}
+        for mentor_id, student_id, start, end in rows:
+            self.book(mentor_id, student_id, start, end)
+
+    def book(self, mentor_id, student_id, start, end):
+        self.mentor_busy.setdefault(mentor_id, []).append((start, end))
+        self.mentor_load[mentor_id] = self.mentor_load.get(mentor_id, 0) + 1
+        self.student_days.setdefault(student_id, set()).add(timezone.localdate(start))
+
+    def is_free(self, mentor_id, start, end):
+        return all(
+            end <= busy_start or busy_end <= start
+            for busy_start, busy_end in self.mentor_busy.get(mentor_id, ())
+        )
+
+
+def find_slot(call, mentors, occupancy, not_before, horizon_days):
+    """
+    Earliest free (mentor_id, start, end) for call. Ties prefer the call's
+    own mentor, then the least-loaded one. Returns None if nothing fits.
+    """
+    taken_days = occupancy.student_days.get(call.student_id, set())
+    first_day = timezone.localdate(not_before)
+
+    for offset in range(horizon_days + 1):
+        day = first_day + timedelta(days=offset)
+        if day in taken_days:
+            continue
+        midnight = timezone.make_aware(datetime.combine(day, datetime.min.time()))
+        weekday = DAYS[day.weekday()]
+
+        best = None
+        for mentor_id, template in mentors:
+            for slot_start, slot_end in template[weekday]:
+                start = midnight + timedelta(minutes=slot_start)
+                if start < not_before:
+                    continue
+                if best is not None and start > best[0][0]:
+                    break
+                end = midnight + timedelta(minutes=slot_end)
+                if not occupancy.is_free(mentor_id, start, end):
+                    continue
+                rank = (start, mentor_id != call.mentor_id, occupancy.mentor_load.get(mentor_id, 0))
+                if best is None or rank < best[0]:
+                    best = (rank, mentor_id, start, end)
+                break
+        if best is not None:
+            return best[1:]
+    return None
+
+
+def reschedule_calls(call_ids, status=None, not_before=None, horizon_days=HORIZON_DAYS):
+    """
+    Book a replacement for each call in call_ids.
+
+    status marks why the original call is being moved (missed_student or
+    missed_mentor); by default scheduled calls become "rescheduled" and
+    missed calls keep their status. Replacements are searched from
+    not_before (default: now) for horizon_days days.
+
+    Returns [(original, replacement)]. Raises SchedulingError, and writes
+    nothing, if any call cannot be placed (CallOverlapError if a slot was
+    taken concurrently; retrying will pick another one).
+    """
+    if status not in (None, "missed_student", "missed_mentor", "rescheduled"):
+        raise SchedulingError(f"Invalid status {status!r} for a rescheduled call")
+
+    not_before = not_before or timezone.now()
+    window_start = timezone.make_aware(
+        datetime.combine(timezone.localdate(not_before), datetime.min.time())
+    )
+    window_end = window_start + timedelta(days=horizon_days + 1)
+
+    with transaction.atomic():
+        calls = list(
+            Call.objects.select_for_update().filter(id__in=call_ids).order_by("start_time", "id")
+        )
+        if len(calls) != len(set(call_ids)):
+            raise SchedulingError("Some calls do not exist")
+        for call in calls:
+            if call.status not in RESCHEDULABLE_STATUSES:
+                raise SchedulingError(f"Call {call.id} is {call.status} and cannot be rescheduled")
+
+        call_types = {call.call_type for call in calls}
+        templates = {}
+        for config in MentorScheduleConfig.objects.filter(
+            call_type__in=call_types, mentor__is_available=True
+        ).order_by("mentor_id"):
+            template = weekly_template(template_key(config_to_mentor(config)))
+            templates.setdefault(config.call_type, []).append((config.mentor_id, template))
+
+        occupancy = Occupancy(
+            Call.objects.filter(
+                start_time__lt=window_end,
+                end_time__gt=window_start,
+                status__in=ACTIVE_STATUSES,
+            ).filter(
+                Q(mentor__schedule_config__call_type__in=call_types, mentor__is_available=True)
+                | Q(student_id__in={call.student_id for call in calls})
+            ).exclude(
+                id__in=[call.id for call in calls]
+            ).values_list("mentor_id", "student_id", "start_time", "end_time")
+        )
+
+        pairs = []
+        changed_at = timezone.now()
+        for call in calls:
+            found = find_slot(call, templates.get(call.call_type, []), occupancy, not_before, horizon_days)
+            if found is None:
+                raise SchedulingError(f"No free {call.call_type} slot for call {call.id}")
+            mentor_id, start, end = found
+            occupancy.book(mentor_id, call.student_id, start, end)
+
+            if status:
+                call.status = status
+            elif call.status == "scheduled":
+                call.status = "rescheduled"
+            call.updated_at = changed_at  # bulk_update does not apply auto_now
+            pairs.append((call, Call(
+                student_id=call.student_id,
+                mentor_id=mentor_id,
+                call_type=call.call_type,
+                start_time=start,
+                end_time=end,
+                status="scheduled",
+            )))
+
+        # Another worker may have booked a chosen slot since the occupancy read
+        with overlap_guard():
+            Call.objects.bulk_update([call for call, _ in pairs], ["status", "updated_at"])
+            Call.objects.bulk_create([replacement for _, replacement in pairs])
+
+        # bulk_update/bulk_create send no signals
+        invalidate_calendars(
+            mentor_ids=[c.mentor_id for pair in pairs for c in pair],
+            student_ids=[call.student_id for call, _ in pairs],
+        )
+
+    return pairs
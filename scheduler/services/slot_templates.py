@@ -0,0 +1,123 @@
+"""
+Precompiled weekly slot templates.
+
+A mentor's availability (weekday window, Sunday windows, breaks, gap) is
+turned into slot start/end minutes once and cached by the hash of that
+configuration. Mentors with identical hours share a single template, so
+building availability for thousands of mentors is mostly cache hits.
+
+Within a window, slots are an arithmetic progression restarted at the
+end of every break. This is the same sequence the original per-minute
+loop produced, but each free segment is generated with one np.arange.
+"""
+from functools import lru_cache
+
+import numpy as np
+
+from .slot_generator import to_minutes
+
+WEEKDAYS = ["mon", "tue", "wed", "thu", "fri", "sat"]
+CALL_DURATION = 20
+
+
+def merge_breaks(breaks):
+    """Sort and merge overlapping (start, end) minute ranges"""
+    merged = []
+    for start, end in sorted(breaks):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def compile_window(start, end, breaks, call_duration=CALL_DURATION, gap=5):
+    """
+    Slots for one window as a tuple of (start, end) minutes.
+    breaks must already be merged (see merge_breaks).
+    """
+    step = call_duration + gap
+    starts = []
+    segment_start = start
+
+    for b_start, b_end in breaks + [[end, end]]:
+        if b_end <= segment_start:
+            continue
+        segment_end = min(b_start, end)
+        next_start = b_end
+        if segment_end - segment_start >= call_duration:
+            segment = np.arange(segment_start, segment_end - call_duration + 1, step)
+            starts.append(segment)
+            # A break shorter than the gap can be stepped over without a jump
+            next_start = max(b_end, int(segment[-1]) + step)
+        segment_start = max(segment_start, next_start)
+        if segment_start >= end:
+            break
+
+    if not starts:
+        return ()
+    slot_starts = np.concatenate(starts)
+    return tuple(zip(slot_starts.tolist(), (slot_starts + call_duration).tolist()))
+
+
+@lru_cache(maxsize=1024)
+def weekly_template(key):
+    """
+    key = (weekday_window, sunday_windows, breaks, gap, call_duration) with
+    every time already in minutes. Returns {day: tuple of slots}.
+    """
+    weekday_window, sunday_windows, breaks, gap, call_duration = key
+    merged = merge_breaks(breaks)
+
+    weekday = compile_window(weekday_window[0], weekday_window[1], merged, call_duration, gap)
+    sunday = tuple(
+        slot
+        for window in sunday_windows
+        for slot in compile_window(window[0], window[1], merged, call_duration, gap)
+    )
+
+    week = dict.fromkeys(WEEKDAYS, weekday)
+    week["sun"] = sunday
+    return week
+
+
+def template_key(mentor, call_duration=CALL_DURATION):
+    """Hashable cache key for a scheduler mentor dict"""
+    return (
+        tuple(map(to_minutes, mentor["weekday_window"])),
+        tuple(tuple(map(to_minutes, window)) for window in mentor["sunday_windows"]),
+        tuple(tuple(map(to_minutes, b)) for b in mentor["breaks"]),
+        mentor["gap_minutes"],
+        call_duration,
+    )
+
+
+def format_time(value, is_end=False):
+    """datetime.time -> "HH:MM"; a midnight end becomes "24:00" """
+    if is_end and value.hour == 0 and value.minute == 0:
+        return "24:00"
+    return f"{value.hour:02d}:{value.minute:02d}"
+
+
+def config_to_mentor(config, call_type=None):
+    """Scheduler mentor dict from a MentorScheduleConfig row"""
+    sunday_windows = []
+    for start, end in (
+        (config.sunday_morning_start, config.sunday_morning_end),
+        (config.sunday_evening_start, config.sunday_evening_end),
+    ):
+        if start and end is not None:
+            sunday_windows.append((format_time(start), format_time(end, is_end=True)))
+
+    breaks = []
+    if config.dinner_start and config.dinner_end:
+        breaks.append((format_time(config.dinner_start), format_time(config.dinner_end, is_end=True)))
+
+    return {
+        "mentor_id": config.mentor_id,
+        "type": call_type or config.call_type,
+        "weekday_window": (format_time(config.weekday_start), format_time(config.weekday_end, is_end=True)),
+        "sunday_windows": sunday_windows,
+        "breaks": breaks,
+        "gap_minutes": config.gap_minutes,
+    }
@@ -0,0 +1,24 @@
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from .models import Call
+from .services.calendar import invalidate_calendars
+
+
+@receiver(post_init, sender=Call)
+def remember_call_owners(sender, instance, **kwargs):
+    # Owners as loaded, so a reassigned call also leaves its old calendars
+    if instance.pk is not None and not {'mentor_id', 'student_id'} & instance.get_deferred_fields():
+        instance._saved_owners = (instance.mentor_id, instance.student_id)
+
+
+@receiver(post_save, sender=Call)
+@receiver(post_delete, sender=Call)
+def invalidate_call_calendars(sender, instance, **kwargs):
+    mentor_ids, student_ids = [instance.mentor_id], [instance.student_id]
+    saved = getattr(instance, '_saved_owners', None)
+    if saved is not None:
+        mentor_ids.append(saved[0])
+        student_ids.append(saved[1])
+    invalidate_calendars(mentor_ids=mentor_ids, student_ids=student_ids)
+    instance._saved_owners = (instance.mentor_id, instance.student_id)
@@ -1,3 +1,444 @@
-from django.test import TestCase
+from collections import Counter
+from datetime import date, datetime, time, timedelta
+from io import StringIO
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import transaction
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from dashboard.models import MentorProfile
+from scheduler.models import Call, MentorScheduleConfig
+
+from scheduler.management.commands.benchmark_scheduler import build_dummy_mentors
+from scheduler.services.slot_generator import to_time
+from scheduler.services.slot_templates import config_to_mentor
+from scheduler.services.weekly_scheduler import SchedulingError, build_weekly_slots, schedule_week
+
+
+class ScheduleWeekTests(SimpleTestCase):
+    """Invariants of the weekly scheduling engine"""
+
+    def test_invariants(self):
+        students = [{"user_id": i} for i in range(1, 1401)]
+        calls = schedule_week(students, build_dummy_mentors(100))
+
+        self.assertEqual(len(calls), 3 * len(students))
+
+        by_student = {}
+        for call in calls:
+            by_student.setdefault(call["student"], []).append(call)
+        for student_calls in by_student.values():
+            self.assertEqual(Counter(c["type"] for c in student_calls), {"normal": 2, "academic": 1})
+            self.assertEqual(len({c["day"] for c in student_calls}), 3)
+
+        slots = Counter((c["mentor"], c["day"], c["start"]) for c in calls)
+        self.assertEqual(max(slots.values()), 1)
+
+    def test_least_loaded_mentor_first(self):
+        mentors = build_dummy_mentors(10)
+        calls = schedule_week([{"user_id": i} for i in range(1, 8)], mentors)
+        normal_load = Counter(c["mentor"] for c in calls if c["type"] == "normal")
+        self.assertEqual(sorted(normal_load.values()), [2, 2, 2, 2, 2, 2, 2])
+
+    def test_raises_when_out_of_slots(self):
+        with self.assertRaises(SchedulingError):
+            schedule_week([{"user_id": i} for i in range(1, 500)], build_dummy_mentors(10))
+
+
+class BalancedScheduleTests(SimpleTestCase):
+    """mode="balanced" finds feasible schedules the greedy engine misses"""
+
+    # Greedy gives early students Mon/Tue normal calls, which leaves later
+    # students without a day for the one academic slot per weekday
+    MENTORS = [
+        {"mentor_id": 1, "type": "academic", "weekday_window": ("19:00", "19:20"),
+         "sunday_windows": [], "breaks": [], "gap_minutes": 5},
+        {"mentor_id": 2, "type": "normal", "weekday_window": ("19:00", "19:45"),
+         "sunday_windows": [("10:00", "10:20")], "breaks": [], "gap_minutes": 5},
+    ]
+
+    def assert_valid(self, calls, students):
+        self.assertEqual(len(calls), 3 * len(students))
+        for student in students:
+            student_calls = [c for c in calls if c["student"] == student["user_id"]]
+            self.assertEqual(Counter(c["type"] for c in student_calls), {"normal": 2, "academic": 1})
+            self.assertEqual(len({c["day"] for c in student_calls}), 3)
+        slots = Counter((c["mentor"], c["day"], c["start"]) for c in calls)
+        self.assertEqual(max(slots.values()), 1)
+
+    def test_feasible_where_greedy_fails(self):
+        students = [{"user_id": i} for i in range(1, 6)]
+        with self.assertRaises(SchedulingError):
+            schedule_week(students, self.MENTORS)
+
+        calls = schedule_week(students, self.MENTORS, mode="balanced")
+        self.assert_valid(calls, students)
+
+    def test_infeasible_raises(self):
+        students = [{"user_id": i} for i in range(1, 8)]
+        with self.assertRaises(SchedulingError):
+            schedule_week(students, self.MENTORS, mode="balanced")
+
+    def test_loads_are_balanced(self):
+        students = [{"user_id": i} for i in range(1, 141)]
+        calls = schedule_week(students, build_dummy_mentors(10), mode="balanced")
+        self.assert_valid(calls, students)
+
+        for call_type in ("normal", "academic"):
+            loads = Counter(c["mentor"] for c in calls if c["type"] == call_type).values()
+            self.assertLessEqual(max(loads) - min(loads), 1)
+
+    def test_heap_fallback_for_large_networks(self):
+        students = [{"user_id": i} for i in range(1, 141)]
+        calls = schedule_week(students, build_dummy_mentors(10), mode="balanced", max_flow_arcs=0)
+        self.assert_valid(calls, students)
+
+
+class SlotTemplateTests(SimpleTestCase):
+    """Compiled slot templates"""
+
+    MENTOR = {
+        "mentor_id": 1,
+        "type": "normal",
+        "weekday_window": ("19:00", "24:00"),
+        "sunday_windows": [("10:00", "12:00"), ("19:00", "24:00")],
+        "breaks": [("21:00", "22:00")],
+        "gap_minutes": 5,
+    }
+
+    def test_weekday_slots_skip_break(self):
+        week = build_weekly_slots(self.MENTOR)
+        starts = [to_time(start) for start, _ in week["mon"]]
+        self.assertEqual(starts, [
+            "19:00", "19:25", "19:50", "20:15", "20:40",
+            "22:00", "22:25", "22:50", "23:15", "23:40",
+        ])
+        self.assertEqual(week["mon"], week["sat"])
+        self.assertEqual(len(week["sun"]), 5 + len(week["mon"]))
+
+    def test_break_inside_gap_does_not_restart_progression(self):
+        mentor = dict(self.MENTOR, weekday_window=("19:00", "20:00"), breaks=[("19:21", "19:23")])
+        starts = [to_time(start) for start, _ in build_weekly_slots(mentor)["mon"]]
+        self.assertEqual(starts, ["19:00", "19:25"])
+
+    def test_returned_lists_are_independent(self):
+        build_weekly_slots(self.MENTOR)["mon"].pop(0)
+        self.assertEqual(len(build_weekly_slots(self.MENTOR)["mon"]), 10)
+
+    def test_config_to_mentor(self):
+        class Config:
+            mentor_id = 1
+            weekday_start, weekday_end = time(19, 0), time(0, 0)
+            sunday_morning_start, sunday_morning_end = time(10, 0), time(12, 0)
+            sunday_evening_start, sunday_evening_end = time(19, 0), time(0, 0)
+            dinner_start, dinner_end = time(21, 0), time(22, 0)
+            gap_minutes = 5
+
+        self.assertEqual(config_to_mentor(Config, "normal"), self.MENTOR)
+
+
+class ScheduleWeekCommandTests(TestCase):
+    """schedule_week management command"""
+
+    WEEK_START = date(2030, 1, 7)  # a Monday
+
+    def setUp(self):
+        for i in range(10):
+            user = User.objects.create_user(username=f"mentor_{i}")
+            profile = user.studentprofile
+            profile.user_type = "mentor"
+            profile.save()
+            MentorScheduleConfig.objects.create(
+                mentor=MentorProfile.objects.create(user=user),
+                call_type="normal" if i < 7 else "academic",
+                weekday_start=time(19, 0),
+                weekday_end=time(0, 0),
+                sunday_morning_start=time(10, 0),
+                sunday_morning_end=time(12, 0),
+                sunday_evening_start=time(19, 0),
+                sunday_evening_end=time(0, 0),
+                dinner_start=time(21, 0),
+                dinner_end=time(22, 0),
+            )
+        self.students = [User.objects.create_user(username=f"student_{i}") for i in range(140)]
+        self.mentor = MentorProfile.objects.first()
+
+    def make_call(self, when, status="scheduled"):
+        return Call.objects.create(
+            student=self.students[0], mentor=self.mentor, call_type="normal",
+            start_time=when, end_time=when + timedelta(minutes=20), status=status
+        )
+
+    def run_command(self, *args):
+        out = StringIO()
+        call_command("schedule_week", "--week-start", self.WEEK_START.isoformat(), *args, stdout=out)
+        return out.getvalue()
+
+    def test_replaces_only_target_week(self):
+        week_begin = timezone.make_aware(datetime.combine(self.WEEK_START, time(19, 0)))
+        stale = self.make_call(week_begin)
+        completed = self.make_call(week_begin + timedelta(hours=1), status="completed")
+        next_week = self.make_call(week_begin + timedelta(days=7))
+
+        self.run_command()
+
+        self.assertFalse(Call.objects.filter(id=stale.id).exists())
+        self.assertTrue(Call.objects.filter(id__in=[completed.id, next_week.id]).count() == 2)
+        scheduled = Call.objects.filter(status="scheduled", start_time__lt=week_begin + timedelta(days=7))
+        self.assertEqual(scheduled.count(), 3 * len(self.students))
+        self.assertEqual(
+            scheduled.filter(call_type="academic").values("student").distinct().count(),
+            len(self.students)
+        )
+
+        last = scheduled.order_by("-end_time").first()
+        self.assertLessEqual(last.end_time, week_begin.replace(hour=0) + timedelta(days=7))
+
+    def test_dry_run_writes_nothing(self):
+        output = self.run_command("--dry-run")
+        self.assertIn("420 calls would be created", output)
+        self.assertFalse(Call.objects.exists())
+
+
+class RescheduleCallsTests(TestCase):
+    """Incremental rescheduling via services.rescheduler"""
+
+    MONDAY = date(2030, 1, 7)
+
+    def setUp(self):
+        self.mentors = []
+        for i in range(2):
+            user = User.objects.create_user(username=f"mentor_{i}")
+            mentor = MentorProfile.objects.create(user=user)
+            MentorScheduleConfig.objects.create(
+                mentor=mentor, call_type="normal",
+                weekday_start=time(19, 0), weekday_end=time(20, 0),
+            )
+            self.mentors.append(mentor)
+        self.student = User.objects.create_user(username="student")
+        self.other_student = User.objects.create_user(username="other")
+
+    def at(self, day_offset, hour, minute=0):
+        return timezone.make_aware(
+            datetime.combine(self.MONDAY + timedelta(days=day_offset), time(hour, minute))
+        )
+
+    def make_call(self, mentor, start, student=None, status="scheduled"):
+        return Call.objects.create(
+            student=student or self.student, mentor=mentor, call_type="normal",
+            start_time=start, end_time=start + timedelta(minutes=20), status=status
+        )
+
+    def test_missed_call_moves_to_next_free_day(self):
+        from scheduler.services.rescheduler import reschedule_calls
+
+        missed = self.make_call(self.mentors[0], self.at(0, 19), status="missed_student")
+        tuesday = self.make_call(self.mentors[0], self.at(1, 19))
+        # Mentor 0 is busy at 19:00 on Wednesday, mentor 1 is free
+        self.make_call(self.mentors[0], self.at(2, 19), student=self.other_student)
+
+        [(original, replacement)] = reschedule_calls([missed.id], not_before=self.at(0, 20))
+
+        self.assertEqual(original.status, "missed_student")
+        self.assertEqual(replacement.start_time, self.at(2, 19))
+        self.assertEqual(replacement.mentor, self.mentors[1])
+        tuesday.refresh_from_db()
+        self.assertEqual((tuesday.status, tuesday.start_time), ("scheduled", self.at(1, 19)))
+
+    def test_scheduled_call_prefers_same_mentor(self):
+        from scheduler.services.rescheduler import reschedule_calls
+
+        call = self.make_call(self.mentors[1], self.at(0, 19))
+
+        [(original, replacement)] = reschedule_calls([call.id], not_before=self.at(0, 19, 10))
+
+        original.refresh_from_db()
+        self.assertEqual(original.status, "rescheduled")
+        # Same day is free again once the original call is moved
+        self.assertEqual(replacement.start_time, self.at(0, 19, 25))
+        self.assertEqual(replacement.mentor, self.mentors[1])
+
+    def test_no_slot_rolls_back(self):
+        from scheduler.services.rescheduler import reschedule_calls
+        from scheduler.services.weekly_scheduler import SchedulingError
+
+        first = self.make_call(self.mentors[0], self.at(0, 19))
+        second = self.make_call(self.mentors[1], self.at(1, 19))
+        self.make_call(self.mentors[0], self.at(2, 19))
+
+        with self.assertRaises(SchedulingError):
+            # first fits on Tuesday, then second has no free day left
+            reschedule_calls([first.id, second.id], not_before=self.at(0, 19, 30), horizon_days=1)
+
+        self.assertEqual(Call.objects.count(), 3)
+        self.assertEqual(Call.objects.filter(status="scheduled").count(), 3)
+
+
+class CallQueriesTests(TestCase):
+    """Bounded keyset pagination in services.call_queries"""
+
+    def setUp(self):
+        self.mentor = MentorProfile.objects.create(user=User.objects.create_user(username="mentor"))
+        self.student = User.objects.create_user(username="student")
+        self.now = timezone.make_aware(datetime(2030, 1, 7, 12, 0))
+
+    def make_call(self, start, status="scheduled"):
+        return Call.objects.create(
+            student=self.student, mentor=self.mentor, call_type="normal",
+            start_time=start, end_time=start + timedelta(minutes=20), status=status
+        )
+
+    def test_pages_cover_window_once(self):
+        from scheduler.services.call_queries import upcoming_calls_page
+
+        self.make_call(self.now - timedelta(hours=1))
+        self.make_call(self.now + timedelta(days=30))
+        # Three calls share a start time, so the cursor must break ties by id
+        expected = [
+            self.make_call(self.now + timedelta(days=d // 3), status="scheduled" if d % 3 == 0 else "completed")
+            for d in range(7)
+        ]
+
+        seen, after = [], None
+        queryset = Call.objects.filter(student=self.student)
+        while True:
+            calls, after = upcoming_calls_page(queryset, after=after, now=self.now, page_size=2)
+            seen.extend(calls)
+            if after is None:
+                break
+
+        self.assertEqual([c.id for c in seen], [c.id for c in expected])
+
+    def test_malformed_cursor_restarts(self):
+        from scheduler.services.call_queries import upcoming_calls_page
+
+        call = self.make_call(self.now + timedelta(hours=1))
+        calls, after = upcoming_calls_page(Call.objects.all(), after="garbage", now=self.now)
+        self.assertEqual((calls, after), ([call], None))
+
+
+class CallOverlapGuardTests(TestCase):
+    """Database-level double-booking guard (migration 0004)"""
+
+    def setUp(self):
+        self.mentor = MentorProfile.objects.create(user=User.objects.create_user(username="mentor"))
+        self.other_mentor = MentorProfile.objects.create(user=User.objects.create_user(username="mentor_2"))
+        self.student = User.objects.create_user(username="student")
+        self.other_student = User.objects.create_user(username="student_2")
+        self.start = timezone.make_aware(datetime(2030, 1, 7, 19, 0))
+
+    def make_call(self, mentor, student, start, status="scheduled"):
+        return Call.objects.create(
+            student=student, mentor=mentor, call_type="normal",
+            start_time=start, end_time=start + timedelta(minutes=20), status=status
+        )
+
+    def test_overlapping_calls_are_rejected(self):
+        from scheduler.services.overlap import CallOverlapError, overlap_guard
+
+        self.make_call(self.mentor, self.student, self.start)
+
+        with self.assertRaisesMessage(CallOverlapError, "Mentor"), overlap_guard(), transaction.atomic():
+            self.make_call(self.mentor, self.other_student, self.start + timedelta(minutes=10))
+        with self.assertRaisesMessage(CallOverlapError, "Student"), overlap_guard(), transaction.atomic():
+            self.make_call(self.other_mentor, self.student, self.start - timedelta(minutes=10))
+
+    def test_back_to_back_and_inactive_calls_are_allowed(self):
+        from scheduler.services.overlap import has_conflict
+
+        call = self.make_call(self.mentor, self.student, self.start)
+        self.make_call(self.mentor, self.other_student, self.start + timedelta(minutes=20))
+        self.make_call(self.mentor, self.other_student, self.start, status="missed_student")
+
+        self.assertFalse(has_conflict(call))
+
+    def test_update_into_overlap_is_rejected(self):
+        from scheduler.services.overlap import CallOverlapError, overlap_guard
+
+        self.make_call(self.mentor, self.student, self.start)
+        missed = self.make_call(self.mentor, self.other_student, self.start, status="missed_mentor")
+
+        missed.status = "scheduled"
+        with self.assertRaises(CallOverlapError), overlap_guard(), transaction.atomic():
+            missed.save()
+
+
+class CalendarCacheTests(TestCase):
+    """Cached calendars in services.calendar"""
+
+    def setUp(self):
+        cache.clear()
+        self.mentor = MentorProfile.objects.create(user=User.objects.create_user(username="mentor"))
+        self.student = User.objects.create_user(username="student")
+        self.now = timezone.make_aware(datetime(2030, 1, 9, 12, 0))  # a Wednesday
+
+    def make_call(self, start):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Call.objects.create(
+                student=self.student, mentor=self.mentor, call_type="normal",
+                start_time=start, end_time=start + timedelta(minutes=20)
+            )
+
+    def test_hit_does_not_query(self):
+        from scheduler.services.calendar import upcoming_calendar_page
+
+        call = self.make_call(self.now + timedelta(days=1))
+        upcoming_calendar_page("mentor", self.mentor.id, now=self.now)
+
+        with self.assertNumQueries(0):
+            calls, _ = upcoming_calendar_page("mentor", self.mentor.id, now=self.now)
+        self.assertEqual([c.id for c in calls], [call.id])
+        self.assertEqual(calls[0].student_name, "student")
+
+    def test_call_writes_invalidate(self):
+        from scheduler.services.calendar import upcoming_calendar_page, weekly_calendar
+
+        first = self.make_call(self.now - timedelta(days=1))
+        weekly_calendar("mentor", self.mentor.id, self.now - timedelta(days=7), self.now, now=self.now)
+        upcoming_calendar_page("student", self.student.id, now=self.now)
+
+        second = self.make_call(self.now + timedelta(hours=2))
+        upcoming, completed = weekly_calendar(
+            "mentor", self.mentor.id, self.now - timedelta(days=7), self.now + timedelta(days=7), now=self.now
+        )
+        self.assertEqual([c.id for c in completed["Week 2"]], [first.id])
+        self.assertEqual([c.id for c in upcoming["Week 2"]], [second.id])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+        calls, _ = upcoming_calendar_page("student", self.student.id, now=self.now)
+        self.assertEqual(calls, [])
+
+    def test_week_replacement_invalidates_everyone(self):
+        from scheduler.services.calendar import upcoming_calendar_page
+        from scheduler.services.persistence import replace_week_calls
+
+        self.assertEqual(upcoming_calendar_page("student", self.student.id, now=self.now)[0], [])
+
+        new_calls = [{
+            "student": self.student.id, "mentor": self.mentor.id,
+            "day": "thu", "start": "19:00", "end": "19:20", "type": "normal"
+        }]
+        with self.captureOnCommitCallbacks(execute=True):
+            replace_week_calls(new_calls, date(2030, 1, 7))
+
+        calls, _ = upcoming_calendar_page("student", self.student.id, now=self.now)
+        self.assertEqual(len(calls), 1)
+
+    def test_reassigned_call_leaves_old_mentor_calendar(self):
+        from scheduler.services.calendar import upcoming_calendar_page
+
+        call = self.make_call(self.now + timedelta(days=1))
+        other = MentorProfile.objects.create(user=User.objects.create_user(username="other-mentor"))
+        self.assertEqual(len(upcoming_calendar_page("mentor", self.mentor.id, now=self.now)[0]), 1)
+
+        call = Call.objects.get(pk=call.pk)
+        call.mentor = other
+        with self.captureOnCommitCallbacks(execute=True):
+            call.save()
+
+        self.assertEqual(upcoming_calendar_page("mentor", self.mentor.id, now=self.now)[0], [])
+        self.assertEqual(len(upcoming_calendar_page("mentor", other.id, now=self.now)[0]), 1)